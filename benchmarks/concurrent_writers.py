@@ -0,0 +1,93 @@
+"""
+Stress benchmark for concurrent writers.
+
+Starts N writer processes that each commit M task start/stop pairs to the
+same logfile and reports the throughput. Afterwards the logfile is checked
+for lost, duplicated or corrupted records.
+
+Usage: python benchmarks/concurrent_writers.py [-n WRITERS] [-m COMMITS]
+"""
+from datetime import datetime, timedelta, timezone
+from multiprocessing import Process
+from pathlib import Path
+import argparse
+import sys
+import tempfile
+import time
+
+from worklog.log import Log
+import worklog.constants as wc
+
+
+def writer(fp: str, writer_id: int, commits: int) -> None:
+    log = Log(fp)
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    for i in range(commits):
+        identifier = f"w{writer_id}-{i}"
+        log_dt = start + timedelta(seconds=i)
+        log.append(wc.TOKEN_TASK, wc.TOKEN_START, log_dt, identifier=identifier)
+        log.append(wc.TOKEN_TASK, wc.TOKEN_STOP, log_dt, identifier=identifier)
+
+
+def verify(fp: str, writers: int, commits: int) -> bool:
+    expected = {
+        (f"w{w}-{i}", type_)
+        for w in range(writers)
+        for i in range(commits)
+        for type_ in (wc.TOKEN_START, wc.TOKEN_STOP)
+    }
+    seen = set()
+    ok = True
+    with open(fp, "r") as fh:
+        for n, line in enumerate(fh, 1):
+            fields = line.rstrip("\n").split("|")
+            if len(fields) != 5 or fields[2] != wc.TOKEN_TASK:
+                sys.stderr.write(f"Corrupted record in line {n}: {line!r}\n")
+                ok = False
+                continue
+            key = (fields[4], fields[3])
+            if key in seen:
+                sys.stderr.write(f"Duplicated record in line {n}: {line!r}\n")
+                ok = False
+            seen.add(key)
+    missing = expected - seen
+    if missing:
+        sys.stderr.write(f"{len(missing)} records are missing\n")
+        ok = False
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("-n", "--writers", type=int, default=8)
+    parser.add_argument("-m", "--commits", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fp = Path(tmpdir, "worklog").as_posix()
+        Path(fp).touch()
+
+        processes = [
+            Process(target=writer, args=(fp, w, args.commits))
+            for w in range(args.writers)
+        ]
+        t0 = time.perf_counter()
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+        elapsed = time.perf_counter() - t0
+
+        records = args.writers * args.commits * 2
+        print(f"Writers:    {args.writers}")
+        print(f"Records:    {records}")
+        print(f"Wall time:  {elapsed:.2f} s")
+        print(f"Throughput: {records / elapsed:.0f} records/s")
+
+        if not verify(fp, args.writers, args.commits):
+            sys.exit(1)
+        print("No record has been lost or corrupted.")
+
+
+if __name__ == "__main__":
+    main()
@@ -31,8 +31,12 @@ setuptools.setup(
         "Programming Language :: Python :: 3",
         "Topic :: Office/Business",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     install_requires=requirements,
-    extras_require={"develop": requirements_develop},
+    extras_require={
+        "develop": requirements_develop,
+        "zstd": ["zstandard"],
+        "arrow": ["pyarrow"],
+    },
     entry_points={"console_scripts": ["wl=worklog:run",]},
 )
@@ -1,29 +1,49 @@
 import os
+import sys
 from configparser import ConfigParser
 from io import StringIO
 import json
-import pkg_resources
 
-from worklog.breaks import AutoBreak
+from worklog.breaks import AutoBreak, parse_weekday_rules
 import worklog.constants as wc
-from worklog.log import Log
+from worklog.completion import COMPLETE_ARG, complete, get_script
 from worklog.parser import get_arg_parser
-from worklog.utils.time import calc_log_time
+from worklog.utils.ids import read_index, write_task_list
 from worklog.utils.logger import configure_logger
-from worklog.dispatcher import dispatch
 
+# Note: Modules that depend on pandas are imported within `run`, so that
+# shell completion and listing tasks do not have to load them.
 
-try:
-    __version__ = pkg_resources.get_distribution("dcs-" + __name__).version
-except Exception:
-    __version__ = "unknown"
+
+def __getattr__(name: str):
+    # Resolved lazily, because looking up the distribution is slow.
+    if name == "__version__":
+        import pkg_resources
+
+        try:
+            return pkg_resources.get_distribution("dcs-" + __name__).version
+        except Exception:
+            return "unknown"
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _read_config() -> ConfigParser:
+    cfg = ConfigParser()
+    cfg.read(wc.CONFIG_FILES)
+    return cfg
 
 
 def run() -> None:
     """ Main method """
-    logger = configure_logger()
     parser = get_arg_parser()
 
+    if sys.argv[1:2] == [COMPLETE_ARG]:
+        worklog_fp = os.path.expanduser(_read_config().get("worklog", "path"))
+        complete(parser, sys.argv[2:], worklog_fp)
+        return
+
+    logger = configure_logger()
+
     cli_args = parser.parse_args()
     log_level = wc.LOG_LEVELS[min(cli_args.verbosity, len(wc.LOG_LEVELS) - 1)]
     logger.setLevel(log_level)
@@ -35,8 +55,11 @@ def run() -> None:
         parser.print_help()
         return
 
-    cfg = ConfigParser()
-    cfg.read(wc.CONFIG_FILES)
+    if cli_args.subcmd == wc.SUBCMD_COMPLETION:
+        sys.stdout.write(get_script(cli_args.shell))
+        return
+
+    cfg = _read_config()
 
     with StringIO() as ss:
         cfg.write(ss)
@@ -44,11 +67,28 @@ def run() -> None:
         logger.debug(f"Config content:\n{ss.read()}\nEOF")
 
     worklog_fp = os.path.expanduser(cfg.get("worklog", "path"))
-    log = Log(worklog_fp)
+
+    if cli_args.subcmd == wc.SUBCMD_TASK and cli_args.type == "list":
+        # Served from the identifier index if it is up to date, otherwise
+        # the index is rebuilt by the log.
+        index = read_index(worklog_fp)
+        if index is not None:
+            write_task_list(index, sort=cli_args.sort, limit=cli_args.limit)
+            return
+
+    from worklog.dispatcher import dispatch
+    from worklog.log import Log
+
+    log = Log(worklog_fp, journal=cfg.getboolean("worklog", "journal"))
 
     limits = json.loads(cfg.get("workday", "auto_break_limit_minutes"))
     durations = json.loads(cfg.get("workday", "auto_break_duration_minutes"))
-    log.auto_break = AutoBreak(limits, durations)
+    weekday_rules = json.loads(
+        cfg.get("workday", "auto_break_weekday_rules", fallback="{}")
+    )
+    log.auto_break = AutoBreak(limits, durations, parse_weekday_rules(weekday_rules))
+    log.break_mode = cfg.get("workday", "breaks", fallback=wc.BREAKS_AUTO)
+    log.task_separator = cfg.get("worklog", "task_separator")
 
     dispatch(log, parser, cli_args, cfg)
 
@@ -0,0 +1,132 @@
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+from concurrent.futures import Executor
+from datetime import date, datetime
+from functools import partial
+import asyncio
+import logging
+import os
+
+import pandas as pd  # type: ignore
+
+from worklog.breaks import AutoBreak
+from worklog.log import Log
+from worklog.results import StatusResult, ReportResult, TaskReportResult
+from worklog.utils.recovery import get_file_id, get_tail, is_rewritten
+
+
+class AsyncLog(object):
+    """
+    asyncio facade of `Log`.
+
+    Blocking file I/O and pandas computations are run in an executor, such
+    that many concurrent requests can share a single loaded log. Queries,
+    commits and refreshes are serialized with an asyncio lock, such that no
+    query sees the in-memory log while it is being replaced.
+    """
+
+    _log: Optional[Log] = None
+
+    def __init__(
+        self,
+        fp: str,
+        separator: str = "|",
+        logger: Optional[logging.Logger] = None,
+        auto_break: Optional[AutoBreak] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self._fp = fp
+        self._separator = separator
+        self._logger = logger
+        self._auto_break = auto_break
+        self._executor = executor
+        self._lock = asyncio.Lock()
+
+    @property
+    def log(self) -> Log:
+        if self._log is None:
+            raise RuntimeError("Log has not been loaded. Call 'load' first.")
+        return self._log
+
+    async def load(self) -> Log:
+        """
+        Read the logfile. `Log` reads the logfile on first access, which is
+        done here while holding the lock, such that queries do not read it.
+        """
+        async with self._lock:
+            log = await self._run(
+                Log, self._fp, separator=self._separator, logger=self._logger
+            )
+            await self._run(log.refresh)
+            if self._auto_break is not None:
+                log.auto_break = self._auto_break
+            self._log = log
+        return self._log
+
+    async def commit(
+        self,
+        category: str,
+        type_: str,
+        log_dt: datetime,
+        identifier: str = None,
+        force: bool = False,
+    ) -> None:
+        """Append a session/task change to the logfile. See `Log.append`."""
+        async with self._lock:
+            await self._run(
+                self.log.append, category, type_, log_dt, identifier, force
+            )
+
+    async def refresh(self) -> pd.DataFrame:
+        """Ingest records appended by other processes. See `Log.refresh`."""
+        async with self._lock:
+            return await self._run(self.log.refresh)
+
+    async def status(
+        self, hours_target: float, hours_max: float, query_date: date
+    ) -> StatusResult:
+        return await self._query(
+            self.log.get_status, hours_target, hours_max, query_date
+        )
+
+    async def report(self, date_from: datetime, date_to: datetime) -> ReportResult:
+        return await self._query(self.log.get_report, date_from, date_to)
+
+    async def task_report(self, task_id: str) -> TaskReportResult:
+        return await self._query(self.log.get_task_report, task_id)
+
+    async def follow(
+        self, poll_interval: float = 1.0, offset: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields records that are appended to the logfile, starting at byte
+        position `offset` (default: the end of the file).
+        The in-memory log is not modified, call `refresh` to ingest the new
+        records. If the logfile is rewritten, e.g. by 'wl compact' or
+        'wl archive', all of its records are yielded again.
+        """
+        if offset is None:
+            offset = await self._run(os.path.getsize, self._fp)
+        file_id, tail = await self._run(self._get_position, offset)
+        while True:
+            if await self._run(is_rewritten, self._fp, offset, file_id, tail):
+                # The file has been rewritten, start from scratch.
+                offset = 0
+                file_id, tail = await self._run(self._get_position, offset)
+            size = await self._run(os.path.getsize, self._fp)
+            if size != offset:
+                df, offset = await self._run(self.log.read_records, offset)
+                tail = await self._run(get_tail, self._fp, offset)
+                for record in df.to_dict(orient="records"):
+                    yield record
+            await asyncio.sleep(poll_interval)
+
+    def _get_position(self, offset: int) -> Tuple[Tuple[int, int], bytes]:
+        return get_file_id(self._fp), get_tail(self._fp, offset)
+
+    async def _query(self, fn: Callable, *args, **kwargs) -> Any:
+        async with self._lock:
+            return await self._run(fn, *args, **kwargs)
+
+    async def _run(self, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
@@ -1,35 +1,115 @@
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from datetime import timedelta
 
+# Names of the weekdays in the configuration, index 0 is Monday
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
 
 class AutoBreak(object):
     _durations: List[int] = []
     _limits: List[int] = []
+    # Limits and durations that replace the default ones on single weekdays
+    _weekday_rules: Dict[int, Tuple[List[int], List[int]]] = {}
 
-    def __init__(self, limits: List[int] = [], durations: List[int] = []):
-        if len(limits) != len(durations):
-            raise ValueError("limits and durations must have the same shape.")
+    def __init__(
+        self,
+        limits: List[int] = [],
+        durations: List[int] = [],
+        weekday_rules: Optional[Dict[int, Tuple[List[int], List[int]]]] = None,
+    ):
+        rules = [(limits, durations)] + list((weekday_rules or {}).values())
+        for rule_limits, rule_durations in rules:
+            if len(rule_limits) != len(rule_durations):
+                raise ValueError("limits and durations must have the same shape.")
 
         self._limits = limits
         self._durations = durations
+        self._weekday_rules = dict(weekday_rules or {})
 
     @property
     def active(self):
-        return len(self._durations) > 0
+        return len(self._durations) > 0 or any(
+            len(durations) > 0 for _, durations in self._weekday_rules.values()
+        )
+
+    def _get_rule(self, weekday: Optional[int]) -> Tuple[List[int], List[int]]:
+        if weekday is not None and weekday in self._weekday_rules:
+            return self._weekday_rules[weekday]
+        return self._limits, self._durations
 
-    def get_duration(self, td: timedelta):
-        """Calculate the break duration for a given timedelta."""
-        if not self.active:
+    def get_duration(self, td: timedelta, weekday: Optional[int] = None):
+        """Calculate the break duration for a given timedelta. `weekday` (0
+        is Monday) selects the rule of that weekday, if there is one."""
+        limits, durations = self._get_rule(weekday)
+        if len(durations) == 0:
             return timedelta(minutes=0)
 
         full_minutes: int = int(td.total_seconds()) // 60
 
         break_duration = 0
 
-        for i, limit in enumerate(self._limits):
+        for i, limit in enumerate(limits):
             if limit > full_minutes:
                 break
-            break_duration = self._durations[i]
+            break_duration = durations[i]
 
         return timedelta(minutes=break_duration)
 
+    def get_durations(self, totals, weekdays=None, taken=None):
+        """
+        Calculate the break durations for a Series of working times at once,
+        e.g. the totals of all days of a report. Returns a Series of
+        timedelta64 values with the index of `totals`.
+        `weekdays` are the weekdays of the working times (0 is Monday) that
+        select the weekday rules. Breaks that have already been `taken`,
+        e.g. gaps between sessions, count towards the automatic break, such
+        that only the missing time is applied.
+        Limits must be in ascending order.
+        """
+        # Imported here, the module is loaded by shell completion
+        import numpy as np  # type: ignore
+        import pandas as pd  # type: ignore
+
+        seconds = pd.to_timedelta(totals).dt.total_seconds().fillna(0).to_numpy()
+        full_minutes = np.floor_divide(seconds, 60)
+
+        minutes = _lookup(full_minutes, self._limits, self._durations)
+        if weekdays is not None and len(self._weekday_rules) > 0:
+            weekdays = np.asarray(weekdays)
+            for weekday, (limits, durations) in self._weekday_rules.items():
+                mask = weekdays == weekday
+                minutes[mask] = _lookup(full_minutes[mask], limits, durations)
+
+        breaks = pd.Series(
+            pd.to_timedelta(minutes, unit="m"), index=totals.index, dtype="m8[ns]"
+        )
+        if taken is not None:
+            missing = breaks - pd.to_timedelta(taken).fillna(pd.Timedelta(0))
+            breaks = missing.clip(lower=pd.Timedelta(0))
+        return breaks
+
+
+def _lookup(full_minutes, limits: List[int], durations: List[int]):
+    """Durations of the highest limits that are reached, 0 below all limits."""
+    import numpy as np  # type: ignore
+
+    if len(limits) == 0:
+        return np.zeros(len(full_minutes))
+    pos = np.searchsorted(limits, full_minutes, side="right") - 1
+    return np.where(pos >= 0, np.take(durations, np.maximum(pos, 0)), 0).astype(float)
+
+
+def parse_weekday_rules(
+    rules: Dict[str, Dict[str, List[int]]]
+) -> Dict[int, Tuple[List[int], List[int]]]:
+    """
+    Weekday rules of the configuration, e.g.
+    {"fri": {"limits": [0, 300], "durations": [0, 15]}}.
+    Raises `ValueError` for unknown weekdays.
+    """
+    parsed = {}
+    for name, rule in rules.items():
+        if name.lower() not in WEEKDAYS:
+            raise ValueError(f"Unknown weekday: {name}")
+        parsed[WEEKDAYS.index(name.lower())] = (rule["limits"], rule["durations"])
+    return parsed
@@ -0,0 +1,139 @@
+from typing import List, Optional, Tuple
+import argparse
+import os
+import sys
+
+from worklog.utils.ids import build_index, read_ranked_ids, rank_ids, write_index
+from worklog.utils.recovery import get_tail
+
+# Hidden first argument that lets the completion scripts ask for candidates.
+COMPLETE_ARG = "__complete"
+
+# The scripts pass the words after the program name up to the cursor, the
+# last one being the (possibly empty) word that is completed.
+_SCRIPTS = {
+    "bash": """_wl_complete() {
+    local IFS=$'\\n'
+    COMPREPLY=($(%(prog)s %(arg)s "${COMP_WORDS[@]:1:COMP_CWORD}" 2>/dev/null))
+}
+complete -F _wl_complete %(prog)s
+""",
+    "zsh": """#compdef %(prog)s
+_wl_complete() {
+    local -a candidates
+    candidates=(${(f)"$(%(prog)s %(arg)s "${(@)words[2,CURRENT]}" 2>/dev/null)"})
+    compadd -Q -V worklog -a candidates
+}
+compdef _wl_complete %(prog)s
+""",
+    "fish": """function __wl_complete
+    set -l words (commandline -opc) (commandline -ct)
+    %(prog)s %(arg)s $words[2..-1] 2>/dev/null
+end
+complete -c %(prog)s -f -a '(__wl_complete)'
+""",
+}
+
+
+def get_script(shell: str, prog: str = "wl") -> str:
+    """Returns the completion script for a shell."""
+    return _SCRIPTS[shell] % dict(prog=prog, arg=COMPLETE_ARG)
+
+
+def get_task_ids(log_fp: str, prefix: str = "") -> List[str]:
+    """
+    Known task identifiers starting with `prefix`, ranked by frequency and
+    recency. They are read from the identifier index of the logfile, which
+    is rebuilt if it is missing or outdated.
+    """
+    if not os.path.exists(log_fp):
+        return []
+    task_ids = read_ranked_ids(log_fp, prefix)
+    if task_ids is not None:
+        return task_ids
+
+    # Importing the archive helpers loads pandas, which is only acceptable
+    # on this rare path.
+    from worklog.utils.archive import get_rollup_fp, list_segments
+
+    size = os.path.getsize(log_fp)
+    rollup_fps = [get_rollup_fp(log_fp, year) for year, _ in list_segments(log_fp)]
+    index = build_index(log_fp, size, rollup_fps=rollup_fps)
+    write_index(log_fp, index, size, get_tail(log_fp, size))
+    return [task_id for task_id in rank_ids(index) if task_id.startswith(prefix)]
+
+
+def _get_positionals(parser: argparse.ArgumentParser) -> List[argparse.Action]:
+    return [action for action in parser._actions if not action.option_strings]
+
+
+def _find_option(
+    parser: argparse.ArgumentParser, word: str
+) -> Optional[argparse.Action]:
+    for action in parser._actions:
+        if word in action.option_strings:
+            return action
+    return None
+
+
+def _walk(
+    parser: argparse.ArgumentParser, words: List[str]
+) -> Tuple[argparse.ArgumentParser, List[argparse.Action], Optional[argparse.Action]]:
+    """
+    Follow completed words through the parser tree. Returns the innermost
+    parser, its positional arguments that are still to be filled and the
+    option that expects a value next, if any.
+    """
+    positionals = _get_positionals(parser)
+    pending = None
+    for word in words:
+        if pending is not None:
+            pending = None
+        elif word.startswith("-") and len(word) > 1:
+            action = _find_option(parser, word)
+            if action is not None and action.nargs != 0:
+                pending = action
+        elif len(positionals) > 0:
+            action = positionals[0]
+            if isinstance(action, argparse._SubParsersAction):
+                if word not in action.choices:
+                    return parser, [], None
+                parser = action.choices[word]
+                positionals = _get_positionals(parser)
+            elif action.nargs not in ["*", "+"]:
+                positionals = positionals[1:]
+    return parser, positionals, pending
+
+
+def get_candidates(
+    parser: argparse.ArgumentParser, words: List[str], log_fp: str
+) -> List[str]:
+    """
+    Completion candidates for the last of `words`, given the words before it.
+    Subcommands, options and choices are taken from the argument parser.
+    """
+    *completed, current = words if len(words) > 0 else [""]
+    parser, positionals, pending = _walk(parser, completed)
+
+    if pending is not None:
+        candidates = [str(choice) for choice in pending.choices or []]
+    elif current.startswith("-"):
+        candidates = [
+            option for action in parser._actions for option in action.option_strings
+        ]
+    elif len(positionals) == 0:
+        candidates = []
+    elif isinstance(positionals[0], argparse._SubParsersAction):
+        candidates = list(positionals[0].choices)
+    elif getattr(positionals[0], "complete_task_ids", False):
+        return get_task_ids(log_fp, current)
+    else:
+        candidates = [str(choice) for choice in positionals[0].choices or []]
+    return [c for c in candidates if c.startswith(current)]
+
+
+def complete(parser: argparse.ArgumentParser, words: List[str], log_fp: str) -> None:
+    """Write the completion candidates to STDOUT, one per line."""
+    candidates = get_candidates(parser, words, log_fp)
+    if len(candidates) > 0:
+        sys.stdout.write("\n".join(candidates) + "\n")
@@ -21,6 +21,13 @@ SUBCMD_TASK = "task"
 SUBCMD_STATUS = "status"
 SUBCMD_LOG = "log"
 SUBCMD_REPORT = "report"
+SUBCMD_SERVE = "serve"
+SUBCMD_COMPACT = "compact"
+SUBCMD_ARCHIVE = "archive"
+SUBCMD_MERGE = "merge"
+SUBCMD_SYNC = "sync"
+SUBCMD_EXPORT = "export"
+SUBCMD_COMPLETION = "completion"
 
 COL_COMMIT_DATETIME = "commit_dt"
 COL_COMMIT_DATETIME_UTC = "commit_dt_utc"
@@ -35,3 +42,11 @@ TOKEN_STOP = "stop"
 TOKEN_SESSION = "session"
 TOKEN_TASK = "task"
 
+
+EXPORT_FORMATS = ["parquet", "arrow", "jsonl", "csv"]
+REPORT_FORMATS = ["text", "csv", "json"]
+# How breaks are deducted from the working time, see `Log.break_mode`
+BREAKS_AUTO = "auto"
+BREAKS_ACTUAL = "actual"
+BREAKS_MAX = "max"
+BREAK_MODES = [BREAKS_AUTO, BREAKS_ACTUAL, BREAKS_MAX]
@@ -1,12 +1,76 @@
+from typing import Dict, List, Optional
 from configparser import ConfigParser
 from argparse import ArgumentParser, Namespace
 from datetime import date, timedelta
 import json
+import sys
 
 import worklog.constants as wc
+from worklog.errors import WorklogError
 from worklog.log import Log
+from worklog.server import serve
+from worklog.utils.merge import merge_logs
 from worklog.utils.time import calc_log_time
 
+# Columns of the logfile that are read by the subcommands. Subcommands that
+# are not listed read all columns.
+_COMMIT_COLUMNS = [
+    wc.COL_LOG_DATETIME,
+    wc.COL_CATEGORY,
+    wc.COL_TYPE,
+    wc.COL_TASK_IDENTIFIER,
+    "date",
+]
+COLUMNS: Dict[str, List[str]] = {
+    wc.SUBCMD_SESSION: _COMMIT_COLUMNS,
+    f"{wc.SUBCMD_TASK} {wc.TOKEN_START}": _COMMIT_COLUMNS,
+    f"{wc.SUBCMD_TASK} {wc.TOKEN_STOP}": _COMMIT_COLUMNS,
+    f"{wc.SUBCMD_TASK} list": [wc.COL_CATEGORY, wc.COL_TASK_IDENTIFIER],
+    f"{wc.SUBCMD_TASK} report": [
+        wc.COL_LOG_DATETIME,
+        wc.COL_CATEGORY,
+        wc.COL_TYPE,
+        wc.COL_TASK_IDENTIFIER,
+    ],
+    wc.SUBCMD_STATUS: _COMMIT_COLUMNS + [wc.COL_LOG_DATETIME_UTC],
+    wc.SUBCMD_DOCTOR: _COMMIT_COLUMNS,
+    wc.SUBCMD_LOG: _COMMIT_COLUMNS + ["time"],
+    f"{wc.SUBCMD_TASK} tree": _COMMIT_COLUMNS,
+    f"{wc.SUBCMD_TASK} overlaps": _COMMIT_COLUMNS,
+    wc.SUBCMD_EXPORT: [
+        wc.COL_COMMIT_DATETIME,
+        wc.COL_LOG_DATETIME,
+        wc.COL_CATEGORY,
+        wc.COL_TYPE,
+        wc.COL_TASK_IDENTIFIER,
+    ],
+    wc.SUBCMD_REPORT: _COMMIT_COLUMNS,
+}
+
+
+def get_columns(cli_args: Namespace) -> Optional[List[str]]:
+    """Returns the columns of the logfile that a subcommand reads."""
+    key = cli_args.subcmd
+    if cli_args.subcmd == wc.SUBCMD_TASK:
+        key = f"{cli_args.subcmd} {cli_args.type}"
+    return COLUMNS.get(key)
+
+
+def _get_task_id(log: Log, task_id: str, fuzzy: bool) -> str:
+    """Returns the task identifier of the CLI arguments, resolved if fuzzy."""
+    if not fuzzy:
+        return task_id
+    try:
+        return log.resolve_task_id(task_id)
+    except WorklogError as err:
+        sys.stderr.write(str(err) + "\n")
+        sys.exit(err.exit_code)
+
+
+def _write_conflicts(conflicts: List[str]) -> None:
+    for conflict in conflicts:
+        sys.stderr.write(f"Conflict: {conflict}\n")
+
 
 def dispatch(
     log: Log, parser: ArgumentParser, cli_args: Namespace, cfg: ConfigParser
@@ -15,6 +79,8 @@ def dispatch(
     Dispatch request to Log instance based on CLI arguments and
     configuration values.
     """
+    log.project(get_columns(cli_args))
+
     if cli_args.subcmd == wc.SUBCMD_SESSION:
         if cli_args.type in [wc.TOKEN_START, wc.TOKEN_STOP]:
             log.commit(
@@ -26,6 +92,7 @@ def dispatch(
             )
     elif cli_args.subcmd == wc.SUBCMD_TASK:
         if cli_args.type in [wc.TOKEN_START, wc.TOKEN_STOP]:
+            task_id = _get_task_id(log, cli_args.id, cli_args.fuzzy)
             if cli_args.type == wc.TOKEN_START and cli_args.auto_stop:
                 commit_dt = calc_log_time(cli_args.offset_minutes, cli_args.time)
                 log.stop_active_tasks(commit_dt)
@@ -34,13 +101,26 @@ def dispatch(
                 cli_args.type,
                 cli_args.offset_minutes,
                 cli_args.time,
-                identifier=cli_args.id,
+                identifier=task_id,
             )
         elif cli_args.type == "list":
-            log.list_tasks()
+            log.list_tasks(sort=cli_args.sort, limit=cli_args.limit)
         elif cli_args.type == "report":
-            log.task_report(cli_args.id)
+            log.task_report(
+                [_get_task_id(log, t, cli_args.fuzzy) for t in cli_args.id],
+                regex=cli_args.regex,
+                date_from=cli_args.date_from,
+                date_to=cli_args.date_to,
+                combined=cli_args.combined,
+                fmt=cli_args.format,
+            )
+        elif cli_args.type == "tree":
+            log.task_tree(cli_args.date_from, cli_args.date_to, depth=cli_args.depth)
+        elif cli_args.type == "overlaps":
+            log.task_overlaps(cli_args.date_from, cli_args.date_to)
     elif cli_args.subcmd == wc.SUBCMD_STATUS:
+        if cli_args.breaks is not None:
+            log.break_mode = cli_args.breaks
         hours_target = float(cfg.get("workday", "hours_target"))
         hours_max = float(cfg.get("workday", "hours_max"))
         fmt = cli_args.fmt
@@ -49,9 +129,19 @@ def dispatch(
             query_date -= timedelta(days=1)
         elif cli_args.date:
             query_date = cli_args.date.date()
-        log.status(hours_target, hours_max, query_date=query_date, fmt=fmt)
+        if cli_args.watch is not None:
+            log.watch_status(
+                hours_target,
+                hours_max,
+                # Follow the current day, also across midnight
+                query_date=query_date if cli_args.yesterday or cli_args.date else None,
+                fmt=fmt,
+                interval=cli_args.watch,
+            )
+        else:
+            log.status(hours_target, hours_max, query_date=query_date, fmt=fmt)
     elif cli_args.subcmd == wc.SUBCMD_DOCTOR:
-        log.doctor()
+        log.doctor(full=cli_args.full)
     elif cli_args.subcmd == wc.SUBCMD_LOG:
         n = cli_args.number
         no_pager_max_entries = int(cfg.get("worklog", "no_pager_max_entries"))
@@ -62,4 +152,81 @@ def dispatch(
         else:
             log.log(-1, use_pager, categories)
     elif cli_args.subcmd == wc.SUBCMD_REPORT:
-        log.report(cli_args.date_from, cli_args.date_to)
+        if cli_args.breaks is not None:
+            log.break_mode = cli_args.breaks
+        log.split_overlap = cli_args.split_overlap
+        windows = cli_args.window or cli_args.windows
+        if windows:
+            log.window_report(
+                windows,
+                task_depth=cli_args.task_depth,
+                fmt=cli_args.format,
+                coverage=cli_args.coverage,
+            )
+        elif cli_args.logs is not None:
+            if cli_args.coverage:
+                parser.error("--coverage is not available with --logs")
+            log.team_report(
+                cli_args.logs,
+                cli_args.date_from,
+                cli_args.date_to,
+                task_depth=cli_args.task_depth,
+                processes=cli_args.processes,
+                fmt=cli_args.format,
+            )
+        else:
+            log.report(
+                cli_args.date_from,
+                cli_args.date_to,
+                task_depth=cli_args.task_depth,
+                fmt=cli_args.format,
+                coverage=cli_args.coverage,
+            )
+    elif cli_args.subcmd == wc.SUBCMD_SERVE:
+        hours_target = float(cfg.get("workday", "hours_target"))
+        hours_max = float(cfg.get("workday", "hours_max"))
+        serve(log, cli_args.port, hours_target, hours_max)
+    elif cli_args.subcmd == wc.SUBCMD_COMPACT:
+        result = log.compact()
+        sys.stdout.write(
+            f"Compacted worklog: {result.records} entries, "
+            f"{result.duplicates} duplicates removed\n"
+        )
+    elif cli_args.subcmd == wc.SUBCMD_ARCHIVE:
+        try:
+            result = log.archive(cli_args.before)
+        except WorklogError as err:
+            sys.stderr.write(str(err) + "\n")
+            sys.exit(err.exit_code)
+        years = ", ".join(str(year) for year in result.years) or "-"
+        sys.stdout.write(f"Archived {result.records} entries, years: {years}\n")
+    elif cli_args.subcmd == wc.SUBCMD_MERGE:
+        result = merge_logs(cli_args.logs, cli_args.output)
+        _write_conflicts(result.conflicts)
+        sys.stdout.write(
+            f"Merged {len(cli_args.logs)} worklogs: {result.records} entries, "
+            f"{result.duplicates} duplicates removed\n"
+        )
+    elif cli_args.subcmd == wc.SUBCMD_EXPORT:
+        try:
+            result = log.export(
+                cli_args.output,
+                fmt=cli_args.format,
+                date_from=cli_args.date_from,
+                date_to=cli_args.date_to,
+                categories=[cli_args.category] if cli_args.category else None,
+            )
+        except WorklogError as err:
+            sys.stderr.write(str(err) + "\n")
+            sys.exit(err.exit_code)
+        sys.stdout.write(
+            f"Exported {result.events} entries and {result.intervals} intervals "
+            f"to {', '.join(result.fps)}\n"
+        )
+    elif cli_args.subcmd == wc.SUBCMD_SYNC:
+        result = log.sync(cli_args.peer)
+        _write_conflicts(result.conflicts)
+        sys.stdout.write(
+            f"Synced {result.read} new entries of {cli_args.peer}: "
+            f"{result.records} added, {result.duplicates} duplicates skipped\n"
+        )
@@ -1,3 +1,4 @@
+from typing import List
 from enum import Enum
 
 
@@ -27,3 +28,101 @@ class ErrMsg(Enum):
         "Fatal. Cannot stop, because tasks are still running. "
         "Stop running tasks first: {active_tasks:} or use --force flag."
     )
+    UNKNOWN_TASK = (
+        "Task ID {task_id} is unknown. See 'wl task list' to list all known tasks."
+    )
+    AMBIGUOUS_TASK = (
+        "Task ID {task_id} is ambiguous, it matches {candidates}. "
+        "Use a longer identifier."
+    )
+    ARCHIVE_OPEN_ENTRIES = (
+        "Cannot archive entries before {year}, because a session or task is "
+        "still running at the end of {last_year}. Add the missing stop entries "
+        "first, see 'wl doctor'."
+    )
+    NO_LOGFILES = "No logfiles found for {pattern}."
+    EXPORT_DEPENDENCY_MISSING = (
+        "Exporting to {fmt} requires the '{module}' package. "
+        "Install it with 'pip install dcs-worklog[{extra}]'."
+    )
+    ARCHIVE_CODEC_MISSING = (
+        "Cannot read archive segment {fp}. Install the '{module}' package."
+    )
+
+
+class WorklogError(Exception):
+    """Base class of all errors raised by the library API of worklog."""
+
+    # Exit code used by the CLI if the error is not handled otherwise.
+    exit_code: int = 1
+
+
+class EmptyLogError(WorklogError):
+    def __init__(self) -> None:
+        super().__init__(ErrMsg.EMPTY_LOG_DATA.value)
+
+
+class EmptyLogDateError(WorklogError):
+    def __init__(self, query_date) -> None:
+        super().__init__(
+            ErrMsg.EMPTY_LOG_DATA_FOR_DATE.value.format(query_date=query_date)
+        )
+        self.query_date = query_date
+
+
+class UnknownTaskError(WorklogError):
+    def __init__(self, task_id: str) -> None:
+        super().__init__(ErrMsg.UNKNOWN_TASK.value.format(task_id=task_id))
+        self.task_id = task_id
+
+
+class AmbiguousTaskError(WorklogError):
+    def __init__(self, task_id: str, candidates: List[str]) -> None:
+        shown = ", ".join(candidates[:5]) + (", ..." if len(candidates) > 5 else "")
+        super().__init__(
+            ErrMsg.AMBIGUOUS_TASK.value.format(task_id=task_id, candidates=shown)
+        )
+        self.task_id = task_id
+        self.candidates = candidates
+
+
+class NoLogfilesError(WorklogError):
+    def __init__(self, pattern: str) -> None:
+        super().__init__(ErrMsg.NO_LOGFILES.value.format(pattern=pattern))
+        self.pattern = pattern
+
+
+class ActiveTasksError(WorklogError):
+    def __init__(self, active_tasks) -> None:
+        super().__init__(
+            ErrMsg.STOP_SESSION_TASKS_RUNNING.value.format(active_tasks=active_tasks)
+        )
+        self.active_tasks = active_tasks
+
+
+class ArchiveOpenEntriesError(WorklogError):
+    def __init__(self, year: int) -> None:
+        super().__init__(
+            ErrMsg.ARCHIVE_OPEN_ENTRIES.value.format(year=year, last_year=year - 1)
+        )
+        self.year = year
+
+
+class ArchiveCodecError(WorklogError):
+    def __init__(self, fp: str, module: str) -> None:
+        super().__init__(
+            ErrMsg.ARCHIVE_CODEC_MISSING.value.format(fp=fp, module=module)
+        )
+        self.fp = fp
+        self.module = module
+
+
+class ExportDependencyError(WorklogError):
+    def __init__(self, fmt: str, module: str, extra: str = "arrow") -> None:
+        super().__init__(
+            ErrMsg.EXPORT_DEPENDENCY_MISSING.value.format(
+                fmt=fmt, module=module, extra=extra
+            )
+        )
+        self.fmt = fmt
+        self.module = module
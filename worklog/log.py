@@ -1,13 +1,18 @@
+import json
 import logging
+import os
 import subprocess
 import sys
 import tempfile
 from datetime import date, datetime, timedelta, timezone
-from io import StringIO
+from io import BytesIO
 from math import floor
+from time import sleep
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 
 import numpy as np  # type: ignore
 import pandas as pd  # type: ignore
@@ -15,30 +20,159 @@ import pandas as pd  # type: ignore
 from worklog.breaks import AutoBreak
 import worklog.constants as wc
 from worklog.utils.pager import get_pager
-from worklog.utils.time import now_localtz, calc_log_time, extract_date_and_time
+from worklog.utils.time import (
+    DERIVED_COLS,
+    now_localtz,
+    calc_log_time,
+    extract_date_and_time,
+)
 from worklog.utils.schema import empty_df_from_schema, get_datetime_cols_from_schema
-from worklog.utils.formatting import format_timedelta
+from worklog.utils.formatting import (
+    REPORT_FIELD_NAMES,
+    REPORT_FIELDS,
+    ReportWriter,
+    format_timedeltas,
+    to_json,
+)
 from worklog.utils.tasks import (
     calc_task_durations,
     extract_intervals,
+    extract_intervals_by_task,
     get_active_task_ids,
     get_all_task_ids_with_duration,
+    match_task_ids,
+)
+from worklog.utils.lock import append_bytes, atomic_write, file_lock
+from worklog.utils.compact import compact_df
+from worklog.utils.archive import (
+    compute_rollups,
+    get_rollup_fp,
+    get_segment_fp,
+    list_segments,
+    open_segment,
+    read_rollups,
+    write_rollups,
+    write_segment,
+)
+from worklog.utils.recovery import (
+    get_file_id,
+    get_journal_fp,
+    get_quarantine_fp,
+    get_tail,
+    has_torn_tail,
+    is_complete_record,
+    is_rewritten,
+    open_prefix,
+    quarantine_from,
+    quarantine_tail,
+    read_journal,
+    remove_journal,
+    write_journal,
+)
+from worklog.utils.fuzzy import (
+    TrigramFile,
+    add_trigrams,
+    read_trigram_count,
+    remove_trigrams,
+    write_trigrams,
+)
+from worklog.utils.export import (
+    ChunkWriter,
+    IntervalBuilder,
+    check_export_format,
+    get_export_fp,
+    to_export_events,
+)
+from worklog.utils.merge import (
+    Record,
+    RecordMerger,
+    RecordReader,
+    read_sync_offset,
+    write_sync_offset,
+)
+from worklog.utils.team import (
+    COL_PERSON,
+    find_logs,
+    get_person_names,
+    merge_reports,
+)
+from worklog.utils.tree import TaskNode, build_tree, iter_tree, rollup_tree
+from worklog.utils.ids import (
+    TaskStats,
+    build_index,
+    rank_ids,
+    read_index,
+    read_index_count,
+    read_ranked_ids,
+    remove_index,
+    update_index,
+    write_index,
+    write_task_list,
+)
+from worklog.utils.state import (
+    ActiveState,
+    read_state,
+    remove_state,
+    state_from_df,
+    update_state,
+    write_state,
 )
 from worklog.utils.session import (
     check_order_session,
     sentinel_datetime,
     is_active_session,
+    session_gaps,
+    extract_session_intervals,
+)
+from worklog.utils.sweep import (
+    COVERAGE_COLS,
+    calc_coverage,
+    find_overlaps,
+    split_overlaps,
+)
+from worklog.errors import (
+    ErrMsg,
+    WorklogError,
+    EmptyLogError,
+    EmptyLogDateError,
+    UnknownTaskError,
+    AmbiguousTaskError,
+    ActiveTasksError,
+    ArchiveOpenEntriesError,
+    NoLogfilesError,
+)
+from worklog.results import (
+    ArchiveResult,
+    CompactResult,
+    ExportResult,
+    MultiTaskReportResult,
+    OverlapResult,
+    StatusResult,
+    ReportResult,
+    SyncResult,
+    TeamReportResult,
+    TaskReportResult,
+    WindowReportResult,
 )
-from worklog.errors import ErrMsg
 
 
 class Log(object):
-    # In-memory representation of log
-    _log_df: pd.DataFrame = None
+    # In-memory representation of log, read on first access
+    _df: Optional[pd.DataFrame] = None
 
     # Backend file config
     _log_fp: Optional[str] = None
+    # Number of bytes of the backend file that have been read
+    _offset: int = 0
+    # Device and inode of the backend file that has been read
+    _file_id: Optional[Tuple[int, int]] = None
+    # Nesting depth of the advisory lock held by this instance
+    _lock_depth: int = 0
     _separator: Optional[str] = None
+    # Columns that are read from the backend file, None reads all columns
+    _columns: Optional[List[str]] = None
+    # Number of records parsed at once when streaming archived segments
+    _archive_chunksize: int = 50000
     _schema: List[Tuple[str, str]] = [
         (wc.COL_COMMIT_DATETIME, "datetime64[ns]",),
         (wc.COL_LOG_DATETIME, "datetime64[ns]",),
@@ -52,20 +186,58 @@ class Log(object):
     _err_msg_session_active_tasks = ()
 
     auto_break: AutoBreak = AutoBreak()
+    # How breaks are deducted, one of `wc.BREAK_MODES`: 'auto' deducts the
+    # automatic break, 'actual' only the gaps between sessions and 'max' the
+    # automatic break where the gaps fall short of it
+    break_mode: str = wc.BREAKS_AUTO
+    # Divide the time of tasks running in parallel between them instead of
+    # counting it for each task
+    split_overlap: bool = False
+    # Separates the levels of the task hierarchy in task identifiers
+    task_separator: str = "/"
 
     def __init__(
-        self, fp: str, separator: str = "|", logger: Optional[logging.Logger] = None
+        self,
+        fp: str,
+        separator: str = "|",
+        logger: Optional[logging.Logger] = None,
+        journal: bool = False,
     ) -> None:
         self._log_fp = fp
         self._separator = separator
+        self._journal = journal
 
         Path(self._log_fp).touch(mode=0o660)
-        self._read()
         if logger is not None:
             self.logger = logger
         else:
             self.logger = logging.getLogger(wc.DEFAULT_LOGGER_NAME)
 
+    def project(self, columns: Optional[Iterable[str]]) -> None:
+        """
+        Only read the given columns from the logfile. Derived columns
+        ("date", "time", "log_dt_utc", "commit_dt_utc") are only calculated
+        if they are listed. Reading fewer columns is faster and uses less
+        memory on large logfiles. Pass None to read all columns.
+        """
+        columns = list(columns) if columns is not None else None
+        if self._df is not None and (
+            columns is None or not set(columns) <= set(self._df.columns)
+        ):
+            # Read again on next access
+            self._df = None
+        self._columns = columns
+
+    @property
+    def _log_df(self) -> pd.DataFrame:
+        if self._df is None:
+            self._read()
+        return self._df
+
+    @_log_df.setter
+    def _log_df(self, df: pd.DataFrame) -> None:
+        self._df = df
+
     def commit(
         self,
         category: str,
@@ -77,36 +249,123 @@ class Log(object):
     ) -> None:
         """Commit a session/task change to the logfile."""
         log_date = calc_log_time(offset_min, time)
-        self._commit(category, type_, log_date, identifier, force)
+        try:
+            self.append(category, type_, log_date, identifier, force)
+        except ActiveTasksError as err:
+            sys.stderr.write(str(err) + "\n")
+            sys.exit(err.exit_code)
 
-    def doctor(self) -> None:
-        """Test if the logfile is consistent."""
-        mask_session = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_SESSION
-        mask_task = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK
+    def append(
+        self,
+        category: str,
+        type_: str,
+        log_dt: datetime,
+        identifier: str = None,
+        force: bool = False,
+    ) -> None:
+        """
+        Append a session/task change to the logfile.
+        Raises `ActiveTasksError` if a session should be stopped while tasks
+        are still running and `force` is not set.
+        """
+        self._commit(category, type_, log_dt, identifier, force)
+
+    def doctor(self, full: bool = False) -> None:
+        """
+        Test if the logfile is consistent. If `full` is set, the archived
+        segments are tested as well, one segment at a time.
+        """
+        if full:
+            for _, fp in list_segments(self._log_fp):
+                self._check_order(pd.concat(self._iter_segment(fp, self._columns)))
+        self._check_order(self._log_df)
+
+    def _check_order(self, df: pd.DataFrame) -> None:
+        mask_session = df[wc.COL_CATEGORY] == wc.TOKEN_SESSION
+        mask_task = df[wc.COL_CATEGORY] == wc.TOKEN_TASK
 
         # sessions only
-        self._log_df[mask_session].groupby(["date"]).apply(
+        df[mask_session].groupby(["date"]).apply(
             lambda group: check_order_session(group, self.logger)
         )
 
         # tasks only
-        self._log_df[mask_task].groupby(["date", "identifier"]).apply(
+        df[mask_task].groupby(["date", "identifier"]).apply(
             lambda group: check_order_session(
                 group, self.logger, task_id=group[wc.COL_TASK_IDENTIFIER].iloc[0]
             )
         )
 
-    def list_tasks(self):
+    def list_tasks(self, sort: str = "name", limit: Optional[int] = None):
         """List all known tasks, i.e. tasks that have been used previously
-        and are stored in the logfile."""
-        mask_task = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK
-        task_df = self._log_df[mask_task]
-        task_counter = Counter(task_df[wc.COL_TASK_IDENTIFIER])
+        and are stored in the logfile.
+        Tasks can be sorted by name, count (most entries first), recent
+        (latest entry first) or time (most time spent first)."""
+        write_task_list(self.get_task_index(), sort=sort, limit=limit)
+
+    def get_task_counts(self) -> Dict[str, int]:
+        """Returns the number of log entries per known task identifier."""
+        return Counter(
+            {task_id: stats.count for task_id, stats in self.get_task_index().items()}
+        )
+
+    def get_task_index(self) -> Dict[str, TaskStats]:
+        """
+        Returns usage statistics per known task identifier, including
+        archived years. The statistics are read from the identifier index
+        next to the logfile, which is rebuilt by a streaming scan of the
+        logfile if it is missing or outdated. No DataFrame is built.
+        """
+        size = os.path.getsize(self._log_fp)
+        index = read_index(self._log_fp, size=size)
+        if index is None:
+            index = self._build_task_index(size)
+        return index
+
+    def _build_task_index(self, size: int) -> Dict[str, TaskStats]:
+        """
+        Build and write the identifier index of the first `size` bytes of
+        the logfile and the archived years.
+        """
+        rollup_fps = [
+            get_rollup_fp(self._log_fp, year) for year, _ in list_segments(self._log_fp)
+        ]
+        index = build_index(self._log_fp, size, self._separator, rollup_fps)
+        write_index(self._log_fp, index, size, get_tail(self._log_fp, size))
+        return index
 
-        sys.stdout.write("These tasks are listed in the log:\n")
-        for task in sorted(task_counter.keys()):
-            count = task_counter[task]
-            sys.stdout.write(f"{task} ({count})\n")
+    def resolve_task_id(self, query: str) -> str:
+        """
+        Resolve a partial or misspelled task identifier to a known one.
+        Known identifiers are returned as is. Otherwise the identifiers that
+        start with the query, contain it or are similar to it are looked up
+        in this order (ignoring case) and the first non-empty group must
+        consist of a single identifier.
+        Raises `UnknownTaskError` if nothing matches and `AmbiguousTaskError`
+        if several identifiers match.
+        The identifiers are looked up in the trigram file next to the
+        logfile, which is kept up to date by commits. It is only rebuilt from
+        the identifier index if it does not match that index.
+        """
+        count = read_index_count(self._log_fp)
+        if count is None:
+            count = len(self.get_task_index())
+        if read_trigram_count(self._log_fp) != count:
+            write_trigrams(self._log_fp, self.get_task_index())
+
+        trigram_index = TrigramFile(
+            self._log_fp, lambda: read_ranked_ids(self._log_fp) or []
+        )
+        matches = trigram_index.search(query)
+        if query in matches:
+            # Known identifiers start with themselves
+            return query
+        if len(matches) == 0:
+            raise UnknownTaskError(query)
+        if len(matches) > 1:
+            raise AmbiguousTaskError(query, rank_ids(self.get_task_index(), matches))
+        self.logger.info(f"Resolved task '{query}' to '{matches[0]}'")
+        return matches[0]
 
     def log(
         self, n: int, use_pager: bool, filter_category: Optional[List[str]]
@@ -138,177 +397,792 @@ class Log(object):
                     process = subprocess.Popen([pager, fh.name])
                     process.wait()
 
-    def report(self, date_from: datetime, date_to: datetime):
+    def report(
+        self,
+        date_from: datetime,
+        date_to: datetime,
+        task_depth: Optional[int] = None,
+        fmt: str = "text",
+        coverage: bool = False,
+    ):
         """Generate a daily, weekly, monthly and task based report based on
-        the content in the logfile."""
-        self._check_nonempty_or_exit(None)
+        the content in the logfile. The report is written as text tables or
+        streamed row by row as CSV or JSON."""
+        try:
+            result = self.get_report(
+                date_from, date_to, task_depth=task_depth, coverage=coverage
+            )
+        except EmptyLogError as err:
+            self._exit_with_error(err, None)
 
-        session_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_SESSION
-        task_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK
-        time_mask = (self._log_df[wc.COL_LOG_DATETIME] >= date_from) & (
-            self._log_df[wc.COL_LOG_DATETIME] < date_to
-        )
+        if fmt == "text":
+            self._print_report(result)
+        else:
+            writer = ReportWriter(sys.stdout, fmt, self._report_fields(coverage))
+            writer.begin()
+            self._write_report(writer, result)
+            writer.end()
 
-        # Day aggregation
-        df_day = self._aggregate_time(time_mask & session_mask, resample="D")
-        df_day["break"] = df_day["agg_time"].map(self.auto_break.get_duration)
+    def window_report(
+        self,
+        windows: List[Tuple[datetime, datetime]],
+        task_depth: Optional[int] = None,
+        fmt: str = "text",
+        coverage: bool = False,
+    ):
+        """
+        Generate reports for several time windows at once, see
+        `get_window_reports`. Each window is written as a separate section,
+        as rows with the window in the first columns for CSV or as one JSON
+        object per line.
+        """
+        try:
+            results = self.get_window_reports(
+                windows, task_depth=task_depth, coverage=coverage
+            )
+        except EmptyLogError as err:
+            self._exit_with_error(err, None)
 
-        # Week aggregation
-        df_week = (
-            df_day.set_index(wc.COL_LOG_DATETIME).resample("W").sum().reset_index()
-        )
+        if fmt == "text":
+            for result in results:
+                headline = (
+                    f"Report {result.date_from.date()} - {result.date_to.date()}:"
+                )
+                print(headline)
+                print("=" * len(headline))
+                print()
+                self._print_report(result.report)
+            return
 
-        # Month aggregration
-        df_month = (
-            df_day.set_index(wc.COL_LOG_DATETIME).resample("M").sum().reset_index()
+        writer = ReportWriter(
+            sys.stdout,
+            fmt,
+            self._report_fields(coverage),
+            keys=["date_from", "date_to"],
         )
-
-        for df in (df_day, df_week, df_month):
-            df["agg_time_bookable"] = df["agg_time"] - df["break"]
-
-        # Task aggregation
-        df_tasks = self._aggregate_tasks(time_mask & task_mask)
-
+        for result in results:
+            writer.begin(
+                date_from=result.date_from.date(), date_to=result.date_to.date()
+            )
+            self._write_report(writer, result.report)
+            writer.end()
+
+    def _report_fields(self, coverage: bool = False) -> List[str]:
+        """Fields of CSV and JSON reports, see `ReportWriter`."""
+        fields = list(REPORT_FIELD_NAMES)
+        if self.break_mode != wc.BREAKS_AUTO:
+            fields += [REPORT_FIELDS["break_taken"]]
+        if coverage:
+            fields += COVERAGE_COLS
+        return fields
+
+    def _write_report(self, writer: ReportWriter, result: ReportResult) -> None:
+        writer.write("month", result.month, date_format="%Y-%m")
+        writer.write("week", result.week)
+        writer.write("day", result.day)
+        writer.write("tasks", result.tasks)
+        if result.coverage is not None:
+            writer.write("coverage", result.coverage)
+
+    def _print_report(self, result: ReportResult) -> None:
         print_cols = [wc.COL_LOG_DATETIME, "agg_time"]
         print_cols_labels = ["Date", "Total time"]
-        if self.auto_break.active:
+        if "break_taken" in result.day.columns:
+            print_cols += ["break_taken"]
+            print_cols_labels += ["Logged breaks"]
+        if result.auto_break:
             print_cols += ["break", "agg_time_bookable"]
             print_cols_labels += ["Break", "Bookable time"]
 
         def _formatters(date_type: str = "M"):
-            date_max_len = len("2000-01") if date_type == "M" else len("2000-01-01")
+            date_format = "%Y-%m" if date_type == "M" else "%Y-%m-%d"
             return {
-                wc.COL_LOG_DATETIME: lambda v: str(v.date())[:date_max_len],
-                "agg_time": format_timedelta,
-                "agg_time_bookable": format_timedelta,
-                "break": format_timedelta,
+                wc.COL_LOG_DATETIME: lambda s: s.dt.strftime(date_format),
+                "agg_time": format_timedeltas,
+                "agg_time_bookable": format_timedeltas,
+                "break": format_timedeltas,
+                "break_taken": format_timedeltas,
             }
 
         self._print_aggregation(
             "month",
-            df_month,
+            result.month,
             print_cols,
             print_cols_labels,
             formatters=_formatters("M"),
         )
         self._print_aggregation(
-            "week", df_week, print_cols, print_cols_labels, formatters=_formatters("D"),
+            "week",
+            result.week,
+            print_cols,
+            print_cols_labels,
+            formatters=_formatters("D"),
         )
         self._print_aggregation(
-            "day", df_day, print_cols, print_cols_labels, formatters=_formatters("D")
+            "day",
+            result.day,
+            print_cols,
+            print_cols_labels,
+            formatters=_formatters("D"),
         )
 
         print_cols = [wc.COL_TASK_IDENTIFIER, "agg_time"]
         print_cols_labels = ["Task name", "Total time"]
         self._print_aggregation(
             "tasks",
-            df_tasks,
+            result.tasks,
             print_cols,
             print_cols_labels,
             formatters=_formatters("D"),
         )
+        if result.coverage is not None:
+            self._print_coverage(result.coverage)
+
+    def _print_coverage(self, df: pd.DataFrame) -> None:
+        """Coverage of the sessions by tasks per day and in total."""
+        cols = [wc.COL_LOG_DATETIME] + COVERAGE_COLS
+        labels = ["Date", "Session time", "Task time", "Untracked", "Outside"]
+        if df.shape[0] > 0:
+            df = df[cols].assign(
+                **{wc.COL_LOG_DATETIME: df[wc.COL_LOG_DATETIME].dt.strftime("%Y-%m-%d")}
+            )
+            total = pd.DataFrame({col: [df[col].sum()] for col in COVERAGE_COLS})
+            df = pd.concat(
+                [df, total.assign(**{wc.COL_LOG_DATETIME: "Total"})],
+                ignore_index=True,
+            )
+        self._print_aggregation(
+            "day",
+            df,
+            cols,
+            labels,
+            formatters={col: format_timedeltas for col in COVERAGE_COLS},
+            headline="Coverage of sessions by tasks:",
+        )
+
+    def get_report(
+        self,
+        date_from: datetime,
+        date_to: datetime,
+        task_depth: Optional[int] = None,
+        coverage: bool = False,
+    ) -> ReportResult:
+        """
+        Aggregate the working time by day, week, month and task in the time
+        window [date_from, date_to). Archived years are aggregated from their
+        daily rollups.
+        With `task_depth` the tasks are aggregated on that level of the task
+        hierarchy, see `get_task_tree`. With `coverage` the report includes
+        how much session time had no task running and how much task time was
+        outside of sessions, see `calc_coverage`.
+        Raises `EmptyLogError` if the log does not contain any entries.
+        """
+        rollups, time_mask = self._select_window(date_from, date_to)
+        rollups_session_mask = rollups[wc.COL_CATEGORY] == wc.TOKEN_SESSION
+
+        session_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_SESSION
+        task_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK
+
+        # Day aggregation
+        df_day = self._aggregate_time(
+            time_mask & session_mask,
+            resample="D",
+            archived=rollups[rollups_session_mask],
+        )
+        df_day = self._add_breaks(df_day, self._get_gaps(time_mask & session_mask))
+
+        # Task aggregation
+        df_tasks = self._aggregate_tasks(
+            time_mask & task_mask, archived=rollups[~rollups_session_mask]
+        )
+        df_coverage = self._get_coverage(time_mask) if coverage else None
+        return self._build_report(
+            df_day, df_tasks, task_depth=task_depth, coverage=df_coverage
+        )
+
+    def get_window_reports(
+        self,
+        windows: List[Tuple[datetime, datetime]],
+        task_depth: Optional[int] = None,
+        coverage: bool = False,
+    ) -> List[WindowReportResult]:
+        """
+        Aggregate the working time like `get_report` for several time
+        windows [date_from, date_to) at once, e.g. for every month and week
+        of a year. The log is masked and the durations of sessions and tasks
+        are calculated only once for the span of all windows, each window is
+        sliced from these durations. Intervals are counted in the window in
+        which they end, also if they start before.
+        Raises `EmptyLogError` if the log does not contain any entries.
+        """
+        date_from = min(window_from for window_from, _ in windows)
+        date_to = max(window_to for _, window_to in windows)
+        rollups, time_mask = self._select_window(date_from, date_to)
+        rollups_session_mask = rollups[wc.COL_CATEGORY] == wc.TOKEN_SESSION
+
+        session_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_SESSION
+        task_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK
+
+        # Durations of the intervals, sliced and aggregated for each window
+        df_times = self._time_durations(
+            time_mask & session_mask, archived=rollups[rollups_session_mask]
+        )
+        gaps = self._get_gaps(time_mask & session_mask)
+        df_coverage = self._get_coverage(time_mask) if coverage else None
+        df_task_times = self._task_durations(
+            time_mask & task_mask, archived=rollups[~rollups_session_mask]
+        )
+
+        results = []
+        for window_from, window_to in windows:
+            times_dts = df_times[wc.COL_LOG_DATETIME]
+            df_day = self._resample_time(
+                df_times[(times_dts >= window_from) & (times_dts < window_to)]
+            )
+            df_day = self._add_breaks(df_day, gaps)
+            task_dts = df_task_times[wc.COL_LOG_DATETIME]
+            df_tasks = self._sum_tasks(
+                df_task_times[(task_dts >= window_from) & (task_dts < window_to)]
+            )
+            df_window_coverage = None
+            if df_coverage is not None:
+                days = df_coverage[wc.COL_LOG_DATETIME]
+                df_window_coverage = df_coverage[
+                    (days >= window_from) & (days < window_to)
+                ].reset_index(drop=True)
+            report = self._build_report(
+                df_day, df_tasks, task_depth=task_depth, coverage=df_window_coverage
+            )
+            results.append(
+                WindowReportResult(
+                    date_from=window_from, date_to=window_to, report=report
+                )
+            )
+        return results
+
+    def _get_gaps(self, mask) -> Optional[pd.Series]:
+        """
+        Logged breaks per day of the session entries in `mask`, see
+        `session_gaps`. None if breaks are not taken into account by the
+        break mode. Archived years only keep the worked time per day, their
+        days have no logged breaks.
+        """
+        if self.break_mode == wc.BREAKS_AUTO:
+            return None
+        return session_gaps(self._log_df[mask])
+
+    def _add_breaks(
+        self, df_day: pd.DataFrame, gaps: Optional[pd.Series]
+    ) -> pd.DataFrame:
+        """
+        Add the deducted breaks to a daily aggregation and, unless in 'auto'
+        break mode, the logged breaks of each day from `gaps`.
+        """
+        weekdays = df_day[wc.COL_LOG_DATETIME].dt.weekday
+        if gaps is None:
+            df_day["break"] = self.auto_break.get_durations(
+                df_day["agg_time"], weekdays=weekdays
+            )
+            return df_day
+
+        days = df_day[wc.COL_LOG_DATETIME].dt.date
+        taken = gaps.reindex(days).fillna(pd.Timedelta(0)).to_numpy()
+        df_day["break_taken"] = pd.Series(taken, index=df_day.index, dtype="m8[ns]")
+        if self.break_mode == wc.BREAKS_MAX:
+            df_day["break"] = self.auto_break.get_durations(
+                df_day["agg_time"], weekdays=weekdays, taken=df_day["break_taken"]
+            )
+        else:
+            # The gaps are not part of the sessions, nothing is deducted
+            df_day["break"] = pd.Series(
+                pd.Timedelta(0), index=df_day.index, dtype="m8[ns]"
+            )
+        return df_day
+
+    def _get_coverage(self, mask) -> pd.DataFrame:
+        """
+        Coverage of the sessions by tasks per day for the entries in `mask`,
+        see `calc_coverage`. Intervals are paired like in `_aggregate_base` and
+        `extract_intervals_by_task`, open ones are skipped. Archived years
+        only keep the worked time per day and have no coverage.
+        """
+        df = self._log_df[mask]
+        sessions = extract_session_intervals(
+            df[df[wc.COL_CATEGORY] == wc.TOKEN_SESSION]
+        )
+        tasks = extract_intervals_by_task(df[df[wc.COL_CATEGORY] == wc.TOKEN_TASK])
+        return calc_coverage(sessions, tasks, self._get_tz())
+
+    def _build_report(
+        self,
+        df_day: pd.DataFrame,
+        df_tasks: Optional[pd.DataFrame],
+        task_depth: Optional[int] = None,
+        coverage: Optional[pd.DataFrame] = None,
+    ) -> ReportResult:
+        """Weekly and monthly aggregations of the daily working times."""
+        df_day = df_day.copy()
+
+        # Week aggregation
+        df_week = (
+            df_day.set_index(wc.COL_LOG_DATETIME).resample("W").sum().reset_index()
+        )
+
+        # Month aggregration
+        df_month = (
+            df_day.set_index(wc.COL_LOG_DATETIME).resample("M").sum().reset_index()
+        )
+
+        for df in (df_day, df_week, df_month):
+            df["agg_time_bookable"] = df["agg_time"] - df["break"]
+
+        if task_depth is not None and df_tasks is not None:
+            tree = build_tree(
+                zip(df_tasks[wc.COL_TASK_IDENTIFIER], df_tasks["agg_time"]),
+                self.task_separator,
+            )
+            df_tasks = pd.DataFrame(
+                rollup_tree(tree, task_depth),
+                columns=[wc.COL_TASK_IDENTIFIER, "agg_time"],
+            )
+
+        return ReportResult(
+            day=df_day,
+            week=df_week,
+            month=df_month,
+            tasks=df_tasks,
+            auto_break=self.auto_break.active and self.break_mode != wc.BREAKS_ACTUAL,
+            coverage=coverage,
+        )
+
+    def team_report(
+        self,
+        logs: str,
+        date_from: datetime,
+        date_to: datetime,
+        task_depth: Optional[int] = None,
+        processes: Optional[int] = None,
+        fmt: str = "text",
+    ) -> None:
+        """
+        Generate a report of a team based on the logfiles of its members.
+        `logs` is a directory or a glob pattern of the logfiles. The report
+        is written as text tables or streamed row by row as CSV or JSON.
+        """
+        try:
+            fps = find_logs(logs)
+            if len(fps) == 0:
+                raise NoLogfilesError(logs)
+            result = self.get_team_report(
+                fps, date_from, date_to, task_depth=task_depth, processes=processes
+            )
+        except (EmptyLogError, NoLogfilesError) as err:
+            self._exit_with_error(err, None)
+
+        if fmt != "text":
+            writer = ReportWriter(sys.stdout, fmt, [COL_PERSON] + self._report_fields())
+            writer.begin()
+            self._write_report(writer, result.team)
+            writer.write("people", result.people)
+            writer.write("person_tasks", result.person_tasks)
+            writer.end()
+            return
+
+        self._print_report(result.team)
+
+        print_cols = [COL_PERSON, "agg_time"]
+        print_cols_labels = ["Person", "Total time"]
+        if "break_taken" in result.people.columns:
+            print_cols += ["break_taken"]
+            print_cols_labels += ["Logged breaks"]
+        if result.team.auto_break:
+            print_cols += ["break", "agg_time_bookable"]
+            print_cols_labels += ["Break", "Bookable time"]
+        formatters = {
+            "agg_time": format_timedeltas,
+            "agg_time_bookable": format_timedeltas,
+            "break": format_timedeltas,
+            "break_taken": format_timedeltas,
+        }
+        self._print_aggregation(
+            "person", result.people, print_cols, print_cols_labels, formatters
+        )
+        self._print_aggregation(
+            "person and task",
+            result.person_tasks,
+            [COL_PERSON, wc.COL_TASK_IDENTIFIER, "agg_time"],
+            ["Person", "Task name", "Total time"],
+            formatters,
+        )
+
+    def get_team_report(
+        self,
+        fps: List[str],
+        date_from: datetime,
+        date_to: datetime,
+        task_depth: Optional[int] = None,
+        processes: Optional[int] = None,
+    ) -> TeamReportResult:
+        """
+        Aggregate the working time of several logfiles, e.g. one per team
+        member, like `get_report` and merge the results. Each logfile is
+        read and aggregated in a separate worker process, at most
+        `processes` at a time (default: number of CPUs). The auto break
+        rules, the break mode, the splitting of overlapping tasks, the task
+        separator and the projected columns of this log are applied to all
+        logfiles. Empty logfiles are skipped.
+        Raises `EmptyLogError` if all logfiles are empty.
+        """
+        names = get_person_names(fps)
+        args = [
+            (
+                fp,
+                self._columns,
+                self.auto_break,
+                self.break_mode,
+                self.split_overlap,
+                self.task_separator,
+                date_from,
+                date_to,
+                task_depth,
+            )
+            for fp in fps
+        ]
+        if len(fps) > 1 and processes != 1:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = list(executor.map(_get_report_of, args))
+        else:
+            results = [_get_report_of(a) for a in args]
+
+        reports = {}
+        for name, fp, result in zip(names, fps, results):
+            if result is None:
+                self.logger.warning(f"Logfile {fp} is empty. Skip logfile.")
+            else:
+                reports[name] = result
+        if len(reports) == 0:
+            raise EmptyLogError()
+        return merge_reports(reports)
+
+    def task_tree(
+        self,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        depth: Optional[int] = None,
+    ) -> None:
+        """Display the time spent on tasks along the task hierarchy."""
+        try:
+            tree = self.get_task_tree(date_from, date_to)
+        except EmptyLogError as err:
+            self._exit_with_error(err, None)
+
+        headline = "Task tree:"
+        print(headline)
+        print("-" * len(headline))
+        nodes = list(iter_tree(tree, max_depth=depth))
+        if len(nodes) == 0:
+            print("Aggregation not available")
+            return
+        labels = ["  " * (node_depth - 1) + node.name for node_depth, node in nodes]
+        totals = format_timedeltas([node.total for _, node in nodes])
+        width = max(len(label) for label in labels)
+        for label, total in zip(labels, totals):
+            print(f"{label:<{width}}  {total}")
+
+    def get_task_tree(
+        self, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
+    ) -> TaskNode:
+        """
+        Aggregate the time spent on tasks along the hierarchy encoded in the
+        task identifiers, e.g. 'client/project/ticket' with the separator
+        '/' (see `task_separator`). Each node holds the total time of itself
+        and all tasks below it. Only the time window [date_from, date_to) is
+        considered, by default all entries.
+        Raises `EmptyLogError` if the log does not contain any entries.
+        """
+        rollups, time_mask = self._select_window(date_from, date_to)
+        task_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK
+        df_tasks = self._aggregate_tasks(
+            time_mask & task_mask,
+            archived=rollups[rollups[wc.COL_CATEGORY] == wc.TOKEN_TASK],
+        )
+        if df_tasks is None:
+            return TaskNode()
+        return build_tree(
+            zip(df_tasks[wc.COL_TASK_IDENTIFIER], df_tasks["agg_time"]),
+            self.task_separator,
+        )
+
+    def task_overlaps(
+        self, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
+    ) -> None:
+        """Display the periods in which several tasks were running in parallel."""
+        try:
+            result = self.get_task_overlaps(date_from, date_to)
+        except EmptyLogError as err:
+            self._exit_with_error(err, None)
+
+        print(f"Max. concurrency: {result.max_concurrency}")
+        print(f"Overlapping time: {format_timedeltas([result.overlap])[0]}")
+        print()
+        date_format = "%Y-%m-%d %H:%M:%S"
+        self._print_aggregation(
+            "overlap",
+            result.periods,
+            ["start", "stop", "duration", "concurrency", "tasks"],
+            ["Start", "Stop", "Duration", "Concurrency", "Tasks"],
+            formatters={
+                "start": lambda s: s.dt.strftime(date_format),
+                "stop": lambda s: s.dt.strftime(date_format),
+                "duration": format_timedeltas,
+            },
+            headline="Overlapping periods:",
+        )
+
+    def get_task_overlaps(
+        self, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
+    ) -> OverlapResult:
+        """
+        Find the periods in which several tasks were running at the same time
+        in the time window [date_from, date_to), by default all entries. The
+        intervals of all tasks are swept at once, see `find_overlaps`.
+        Archived years only keep the time per day and task and are skipped.
+        Raises `EmptyLogError` if the log does not contain any entries.
+        """
+        _, time_mask = self._select_window(date_from, date_to)
+        task_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK
+        intervals = extract_intervals_by_task(self._log_df[time_mask & task_mask])
+        periods = find_overlaps(intervals, self._get_tz())
+
+        if periods.shape[0] > 0:
+            max_concurrency = int(periods["concurrency"].max())
+            overlap = periods["duration"].sum().to_pytimedelta()
+        else:
+            # A single task at a time, if any
+            max_concurrency = int((intervals["interval"] > timedelta(0)).any())
+            overlap = timedelta(0)
+        return OverlapResult(
+            max_concurrency=max_concurrency, overlap=overlap, periods=periods
+        )
+
+    def _select_window(
+        self, date_from: Optional[datetime], date_to: Optional[datetime]
+    ) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Returns the archived rollups and the mask of the in-memory log that
+        fall into the time window [date_from, date_to). Both bounds are
+        optional. Raises `EmptyLogError` if the log is entirely empty.
+        """
+        years = None
+        if date_from is not None and date_to is not None:
+            years = range(date_from.year, date_to.year + 1)
+        rollups = read_rollups(self._log_fp, years=years)
+
+        rollups_mask = pd.Series(True, index=rollups.index)
+        time_mask = pd.Series(True, index=self._log_df.index)
+        if date_from is not None:
+            rollups_mask &= rollups[wc.COL_LOG_DATETIME] >= date_from
+            time_mask &= self._log_df[wc.COL_LOG_DATETIME] >= date_from
+        if date_to is not None:
+            rollups_mask &= rollups[wc.COL_LOG_DATETIME] < date_to
+            time_mask &= self._log_df[wc.COL_LOG_DATETIME] < date_to
+
+        rollups = rollups[rollups_mask]
+        if rollups.shape[0] == 0:
+            self._check_nonempty()
+        return rollups, time_mask
 
     def status(
         self, hours_target: float, hours_max: float, query_date: date, fmt: str = None,
     ) -> None:
         """Display the current working status, e.g. total time worked at this
         day, remaining time, etc."""
-        self._check_nonempty_or_exit(fmt)
+        try:
+            result = self.get_status(hours_target, hours_max, query_date)
+        except (EmptyLogError, EmptyLogDateError) as err:
+            self._exit_with_error(err, fmt)
+
+        self._write_status(result, fmt)
+
+    def get_status(
+        self, hours_target: float, hours_max: float, query_date: date
+    ) -> StatusResult:
+        """
+        Calculate the working status of a given day.
+        Raises `EmptyLogError` if the log does not contain any entries and
+        `EmptyLogDateError` if there are no session entries for the day.
+        """
+        base = self._get_status_base(query_date)
+        return self._get_status_from_base(base, hours_target, hours_max)
+
+    def watch_status(
+        self,
+        hours_target: float,
+        hours_max: float,
+        query_date: Optional[date] = None,
+        fmt: str = None,
+        interval: float = 5.0,
+        max_ticks: Optional[int] = None,
+    ) -> None:
+        """
+        Display the working status periodically until interrupted.
+        If no query date is given, the current day is used on each tick.
+        The logfile is only re-read if it has been changed and then only the
+        appended records are ingested. The time dependent facts are
+        recalculated on each tick.
+        """
+        version = None
+        base = None
+        tick = 0
+        while max_ticks is None or tick < max_ticks:
+            stat = os.stat(self._log_fp)
+            if version is not None and version != (stat.st_size, stat.st_mtime_ns):
+                # A rewritten logfile, e.g. by 'wl compact', may have fewer
+                # records than before, even none at all.
+                rewritten = is_rewritten(self._log_fp, self._offset, self._file_id)
+                if self.refresh().shape[0] > 0 or rewritten:
+                    base = None
+            version = (stat.st_size, stat.st_mtime_ns)
+
+            day = query_date or date.today()
+            try:
+                if base is None or base[0] != day:
+                    base = self._get_status_base(day)
+                result = self._get_status_from_base(base, hours_target, hours_max)
+            except (EmptyLogError, EmptyLogDateError) as err:
+                if fmt is None:
+                    sys.stderr.write(str(err) + "\n")
+                else:
+                    sys.stdout.write(ErrMsg.NA.value + "\n")
+            else:
+                if fmt is None:
+                    if sys.stdout.isatty():
+                        # Clear terminal and move cursor to the top
+                        sys.stdout.write("\033[2J\033[H")
+                    self._write_status(result, None)
+                else:
+                    self._write_status(result, fmt)
+                    sys.stdout.write("\n")
+            sys.stdout.flush()
+
+            tick += 1
+            if max_ticks is None or tick < max_ticks:
+                sleep(interval)
+
+    def _get_status_base(self, query_date: date):
+        """
+        Extract the facts of a day that only change if the log changes.
+        """
+        self._check_nonempty()
 
         df_day = self._filter_date_category_limit_cols(query_date)
         self.logger.debug(f"Query date: {query_date}")
 
         if df_day.shape[0] == 0:
-            if fmt is None:
-                msg = ErrMsg.EMPTY_LOG_DATA_FOR_DATE.value.format(query_date=query_date)
-                sys.stderr.write(msg + "\n")
-                sys.exit(1)
-            else:
-                sys.stdout.write(ErrMsg.NA.value)
-                sys.exit(0)
+            raise EmptyLogDateError(query_date)
 
         is_active = is_active_session(df_day)
         self.logger.debug(f"Is active: {is_active}")
 
-        df_day = self._add_sentinel(query_date, df_day)
-        facts = self._calc_facts(df_day, hours_target, hours_max)
-
         date_mask = self._log_df["date"] == query_date
         task_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK
         sel_task_mask = date_mask & task_mask
         touched_tasks = get_all_task_ids_with_duration(self._log_df[sel_task_mask])
         active_tasks = get_active_task_ids(self._log_df[sel_task_mask])
 
-        lines = [
-            ("Status", "Tracking {tracking_status}"),
-            ("Total time", "{total_time} ({percentage_done:3}%)"),
-            ("Remaining time", "{remaining_time} ({percentage_remaining:3}%)"),
-            ("Overtime", "{overtime} ({percentage_overtime:3}%)"),
-            ("Break Duration", "{break_duration}"),
-            ("Touched tasks", "{touched_tasks_stats}",),
-            ("Active tasks", "{active_tasks_stats}",),
-        ]
+        return query_date, df_day, is_active, touched_tasks, active_tasks
 
-        if is_active and date == "today":
-            lines += [("End of work", "{eow}",)]
+    def _get_status_from_base(
+        self, base: Tuple, hours_target: float, hours_max: float
+    ) -> StatusResult:
+        """Calculate the time dependent facts of a day."""
+        query_date, df_day, is_active, touched_tasks, active_tasks = base
 
-        key_max_len = max([len(line[0]) for line in lines])
-        fmt_string = "{:" + str(key_max_len + 1) + "s}: {}"
-
-        stdout_fmt = "\n".join(fmt_string.format(*line) for line in lines) + "\n"
+        df_day = self._add_sentinel(query_date, df_day).assign(date=query_date)
+        facts = self._calc_facts(
+            df_day, hours_target, hours_max, weekday=query_date.weekday()
+        )
 
-        sys.stdout.write(
-            (stdout_fmt if fmt is None else fmt).format(
-                **facts,
-                active_tasks=", ".join(active_tasks),
-                active_tasks_stats=f"({len(active_tasks)}) ["
-                + ", ".join(active_tasks)
-                + "]",
-                touched_tasks=", ".join(touched_tasks.keys()),
-                touched_tasks_stats=f"({len(touched_tasks)}) ["
-                + ", ".join(
-                    [f"{k} ({format_timedelta(v)})" for k, v in touched_tasks.items()]
-                )
-                + "]",
-                tracking_status="on" if is_active else "off",
-            )
+        return StatusResult(
+            query_date=query_date,
+            is_active=is_active,
+            touched_tasks=touched_tasks,
+            active_tasks=active_tasks,
+            **facts,
         )
 
     def stop_active_tasks(self, log_dt: datetime):
         """Stop all active tasks by commiting changes to the logfile."""
-        query_date = log_dt.date()
-        task_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK
-        date_mask = self._log_df["date"] == query_date
-        mask = task_mask & date_mask
-        active_task_ids = get_active_task_ids(self._log_df[mask])
-        for task_id in active_task_ids:
-            self._commit(wc.TOKEN_TASK, wc.TOKEN_STOP, log_dt, identifier=task_id)
-
-    def task_report(self, task_id):
-        """Generate a report of a given task."""
-        task_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK
-        task_id_mask = self._log_df[wc.COL_TASK_IDENTIFIER] == task_id
-        mask = task_mask & task_id_mask
-        task_df = self._log_df[mask]
+        with self._locked():
+            self._sync()
+            active_task_ids = self._get_active_task_ids(log_dt.date())
+            entries = [
+                (wc.TOKEN_TASK, wc.TOKEN_STOP, task_id) for task_id in active_task_ids
+            ]
+            if len(entries) > 0:
+                self._append_entries(log_dt, entries)
+
+    def task_report(
+        self,
+        task_id: Union[str, List[str]],
+        regex: bool = False,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        combined: bool = False,
+        fmt: str = "text",
+    ):
+        """
+        Generate a report of one or more tasks. `task_id` can also be a list
+        of identifiers and patterns, see `get_task_reports`. The report is
+        written as text, one section per task or a single combined section,
+        or as CSV or JSON.
+        """
+        patterns = [task_id] if isinstance(task_id, str) else task_id
+        try:
+            result = self.get_task_reports(
+                patterns, regex=regex, date_from=date_from, date_to=date_to
+            )
+        except UnknownTaskError as err:
+            self._exit_with_error(err, None)
 
-        if task_df.shape[0] == 0:
-            sys.stderr.write(
-                (
-                    f"Task ID {task_id} is unknown. "
-                    "See 'wl task list' to list all known tasks.\n"
+        if fmt == "csv":
+            intervals = result.intervals.assign(
+                interval=result.intervals["interval"].map(
+                    lambda td: pd.Timedelta(td).total_seconds()
                 )
             )
-            exit(1)
-
-        intervals = extract_intervals(task_df, logger=self.logger)
-
-        intervals_detailed = intervals[["date", "start", "stop", "interval"]].rename(
-            columns={
-                "date": "Date",
-                "start": "Start",
-                "stop": "Stop",
-                "interval": "Duration",
-            }
+            sys.stdout.write(intervals.to_csv(index=False))
+        elif fmt == "json":
+            content = result._asdict() if combined else [
+                task_result._asdict() for task_result in result.per_task()
+            ]
+            sys.stdout.write(json.dumps(content, default=to_json) + "\n")
+        elif combined:
+            self._print_task_report(result)
+        else:
+            task_results = result.per_task()
+            for i, task_result in enumerate(task_results):
+                if len(task_results) > 1:
+                    headline = f"Task {task_result.task_id}:"
+                    print(("\n" if i > 0 else "") + headline)
+                    print("=" * len(headline))
+                self._print_task_report(task_result)
+
+    def _print_task_report(
+        self, result: Union[TaskReportResult, MultiTaskReportResult]
+    ) -> None:
+        cols = {
+            wc.COL_TASK_IDENTIFIER: "Task",
+            "date": "Date",
+            "start": "Start",
+            "stop": "Stop",
+            "interval": "Duration",
+        }
+        intervals_detailed = result.intervals[
+            [col for col in cols if col in result.intervals.columns]
+        ].rename(columns=cols)
+        intervals_detailed["Duration"] = format_timedeltas(
+            intervals_detailed["Duration"]
         )
         print("Log entries:\n")
         print(
@@ -317,53 +1191,591 @@ class Log(object):
                 formatters={
                     "Start": lambda x: x.strftime("%H:%M:%S"),
                     "Stop": lambda x: x.strftime("%H:%M:%S"),
-                    "Duration": lambda x: format_timedelta(
-                        timedelta(microseconds=int(x) / 1e3)
-                    ),
                 },
             )
         )
 
         print("---")
         print("Daily aggregated:\n")
-        intervals_daily = intervals.groupby(by="date")[["interval"]].sum()
-        intervals_daily.index.name = "Date"
-        intervals_daily = intervals_daily.rename(columns={"interval": "Duration"})
+        intervals_daily = result.daily.rename_axis("Date").rename(
+            columns={"interval": "Duration"}
+        )
         print(intervals_daily.to_string())
 
-        print(f"---\nTotal: {intervals_detailed['Duration'].sum()}")
+        print(f"---\nTotal: {result.total}")
+
+    def get_task_report(self, task_id: str) -> TaskReportResult:
+        """
+        Extract all intervals of a given task. Archived segments that contain
+        the task are decompressed and filtered on the fly.
+        Raises `UnknownTaskError` if the task is not part of the log.
+        """
+        task_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK
+        task_id_mask = self._log_df[wc.COL_TASK_IDENTIFIER] == task_id
+        mask = task_mask & task_id_mask
+        task_df = self._log_df[mask]
+
+        archived_df = self._read_archived_tasks({task_id})
+        if archived_df.shape[0] > 0:
+            task_df = pd.concat(
+                [d for d in (archived_df, task_df) if d.shape[0] > 0]
+            ).sort_values(by=[wc.COL_LOG_DATETIME], kind="mergesort")
+
+        if task_df.shape[0] == 0:
+            raise UnknownTaskError(task_id)
+
+        intervals = extract_intervals(task_df, logger=self.logger)
+        intervals_daily = intervals.groupby(by="date")[["interval"]].sum()
+
+        return TaskReportResult(
+            task_id=task_id,
+            intervals=intervals,
+            daily=intervals_daily,
+            total=intervals["interval"].sum(),
+        )
+
+    def get_task_reports(
+        self,
+        patterns: List[str],
+        regex: bool = False,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> MultiTaskReportResult:
+        """
+        Extract the intervals of several tasks in one pass over the log.
+        Patterns are task identifiers, glob patterns such as 'PROJ-12*' or,
+        with `regex`, regular expressions that are searched within the
+        identifiers. Only intervals starting in [date_from, date_to) are
+        included, by default all of them.
+        Raises `UnknownTaskError` if an identifier without wildcards is
+        unknown or if no task matches at all.
+        """
+        known = self.get_task_index()
+        task_ids = match_task_ids(known, patterns, regex=regex)
+        if not regex:
+            for pattern in patterns:
+                if not set(pattern) & set("*?[") and pattern not in known:
+                    raise UnknownTaskError(pattern)
+        if len(task_ids) == 0:
+            raise UnknownTaskError(", ".join(patterns))
+
+        selected = set(task_ids)
+        mask = (self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK) & self._log_df[
+            wc.COL_TASK_IDENTIFIER
+        ].isin(selected)
+        task_df = self._log_df[mask]
+        years = None
+        if date_from is not None and date_to is not None:
+            years = set(range(date_from.year, date_to.year + 1))
+        archived_df = self._read_archived_tasks(selected, years=years)
+        if archived_df.shape[0] > 0:
+            task_df = pd.concat(
+                [d for d in (archived_df, task_df) if d.shape[0] > 0]
+            ).sort_values(by=[wc.COL_LOG_DATETIME], kind="mergesort")
+
+        intervals = extract_intervals_by_task(task_df, logger=self.logger)
+        if date_from is not None:
+            intervals = intervals[intervals["start"] >= date_from]
+        if date_to is not None:
+            intervals = intervals[intervals["start"] < date_to]
+        intervals = intervals.reset_index(drop=True)
+        total = intervals["interval"].sum() if intervals.shape[0] else timedelta(0)
+
+        return MultiTaskReportResult(
+            task_ids=task_ids,
+            intervals=intervals,
+            daily=intervals.groupby(by="date")[["interval"]].sum(),
+            total=total,
+        )
+
+    def export(
+        self,
+        out_dir: str,
+        fmt: str = "csv",
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        categories: Optional[List[str]] = None,
+    ) -> ExportResult:
+        """
+        Export the records of the log and the intervals derived from them
+        into the files 'events.<ext>' and 'intervals.<ext>' of `out_dir`.
+        Formats are parquet, arrow (IPC file format), jsonl and csv.
+        Timestamps are exported in UTC, durations in seconds.
+        Only records in [date_from, date_to) and intervals starting in it
+        are exported, optionally limited to the given categories. Archived
+        segments are streamed chunk by chunk, followed by the logfile.
+        Raises `ExportDependencyError` if the format requires `pyarrow`,
+        but it is not installed.
+        """
+        check_export_format(fmt)
+        os.makedirs(out_dir, exist_ok=True)
+        writers = [
+            ChunkWriter(get_export_fp(out_dir, table, fmt), fmt, table)
+            for table in ["events", "intervals"]
+        ]
+        builder = IntervalBuilder()
+
+        def window_mask(df: pd.DataFrame, col: str) -> pd.Series:
+            mask = pd.Series(True, index=df.index)
+            if date_from is not None:
+                mask &= df[col] >= date_from
+            if date_to is not None:
+                mask &= df[col] < date_to
+            if categories is not None:
+                mask &= df[wc.COL_CATEGORY].isin(categories)
+            return mask
+
+        try:
+            for chunk in self._iter_chunks(date_from, date_to):
+                intervals = builder.add(chunk)
+                writers[0].write(
+                    to_export_events(chunk[window_mask(chunk, wc.COL_LOG_DATETIME)])
+                )
+                writers[1].write(intervals[window_mask(intervals, "start")])
+        finally:
+            for writer in writers:
+                writer.close()
+
+        return ExportResult(
+            events=writers[0].rows,
+            intervals=writers[1].rows,
+            fps=[writer.fp for writer in writers],
+        )
+
+    def _iter_chunks(
+        self, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Iterate over all records in chunks ordered by log time: the archived
+        segments of the years in [date_from, date_to), then the logfile.
+        Neither of them is read into memory at once.
+        """
+        cols = [col for col, _ in self._schema]
+        for year, fp in list_segments(self._log_fp):
+            if date_from is not None and year < date_from.year:
+                continue
+            if date_to is not None and year > date_to.year:
+                continue
+            for chunk in self._iter_segment(fp, cols):
+                yield self._sort(chunk)
+
+        for chunk in self._iter_logfile(cols):
+            if chunk.shape[0] > 0:
+                yield self._sort(chunk)
+
+    def archive(self, before: int) -> ArchiveResult:
+        """
+        Move all records before the year `before` out of the logfile into
+        compressed segments, one per year. Together with each segment the
+        worked time per day and task is stored, which is used by reports
+        instead of the raw records.
+        Raises `ArchiveOpenEntriesError` if a session or task is still
+        running at the end of the archived period.
+        """
+        cols = [col for col, _ in self._schema]
+        with self._locked():
+            self._recover()
+            df, _ = self.read_records(0)
+            archived_mask = df["date"] < date(before, 1, 1)
+            archived = df[archived_mask].sort_values(
+                by=[wc.COL_LOG_DATETIME], kind="mergesort"
+            )
+            if archived.shape[0] == 0:
+                return ArchiveResult(years=[], records=0)
+
+            state = state_from_df(archived)
+            if state.session is not None or len(state.tasks) > 0:
+                raise ArchiveOpenEntriesError(before)
+
+            archived_years = archived["date"].map(lambda d: d.year)
+            years = sorted(archived_years.unique())
+            for year in years:
+                year_df = archived[archived_years == year]
+                segment_fp = get_segment_fp(self._log_fp, year)
+                if os.path.exists(segment_fp):
+                    # Entries have been backdated into an archived year
+                    existing = pd.concat(self._iter_segment(segment_fp))
+                    year_df = pd.concat((existing, year_df))
+                year_df, _ = compact_df(year_df, cols)
+
+                # Rollups are written first, segments without rollups would
+                # be invisible to reports.
+                write_rollups(self._log_fp, year, compute_rollups(year_df))
+                data = year_df[cols].to_csv(
+                    sep=self._separator, index=False, header=False
+                ).encode()
+                write_segment(self._log_fp, year, data)
+
+            self._rewrite(df[~archived_mask])
+
+        return ArchiveResult(years=years, records=archived.shape[0])
+
+    def compact(self) -> CompactResult:
+        """
+        Rewrite the logfile atomically: records are sorted by log time, exact
+        duplicates are dropped and all timestamps are written in the same
+        format. Readers skip sorting the rewritten file as long as only
+        in-order records are appended. Sidecar files are rebuilt.
+        """
+        with self._locked():
+            self._recover()
+            df, size = self.read_records(0)
+            cols = [col for col, _ in self._schema]
+            compacted, duplicates = compact_df(df, cols)
+            reordered = not df[wc.COL_LOG_DATETIME].is_monotonic_increasing
+            new_size = self._rewrite(compacted)
+
+        self.logger.debug(
+            f"Compacted logfile: {size} bytes -> {new_size} bytes, "
+            f"{duplicates} duplicates removed"
+        )
+        return CompactResult(
+            records=compacted.shape[0], duplicates=duplicates, reordered=reordered
+        )
+
+    def sync(self, peer_fp: str) -> SyncResult:
+        """
+        Append the records of the logfile of a peer, e.g. the worklog of
+        another machine, that are missing in this logfile. Only the part of
+        the peer's logfile that has been written since the last sync is read,
+        the position is remembered per peer in a sidecar file.
+        Duplicates are skipped. Session entries that conflict with the
+        session state of the merged records are reported, but appended.
+        """
+        # All columns are needed to detect duplicates and to append records
+        self.project(None)
+        with self._locked():
+            self._sync()
+            offset = read_sync_offset(self._log_fp, peer_fp)
+            reader = RecordReader(peer_fp, offset, self._separator)
+            new_records = sorted(reader, key=lambda record: record.log_dt)
+
+            merger = RecordMerger()
+            appended: List[Record] = []
+            if len(new_records) > 0:
+                # Only own records from the first new record on can be
+                # duplicates of the new records.
+                df = self._log_df
+                window_mask = df[wc.COL_LOG_DATETIME] >= new_records[0].log_dt
+                sessions = df[~window_mask & (df[wc.COL_CATEGORY] == wc.TOKEN_SESSION)]
+                merger = RecordMerger(
+                    session_active=sessions.shape[0] > 0
+                    and sessions[wc.COL_TYPE].iloc[-1] == wc.TOKEN_START
+                )
+                own_records = self._to_records(df[window_mask])
+                appended = [
+                    record
+                    for record in merger.merge([own_records, new_records])
+                    if record.line is not None
+                ]
+            if len(appended) > 0:
+                self._append_records(
+                    self._parse(b"".join(record.line for record in appended))
+                )
+            write_sync_offset(self._log_fp, peer_fp, reader.offset)
+
+        return SyncResult(
+            read=len(new_records),
+            records=len(appended),
+            duplicates=merger.duplicates,
+            conflicts=merger.conflicts,
+        )
+
+    def _to_records(self, df: pd.DataFrame) -> List[Record]:
+        # Same time zone as the records parsed from other logfiles
+        def _to_utc(value) -> datetime:
+            return pd.Timestamp(value).to_pydatetime().astimezone(timezone.utc)
+
+        return [
+            Record(
+                commit_dt=_to_utc(commit_dt),
+                log_dt=_to_utc(log_dt),
+                category=category,
+                type=type_,
+                identifier=identifier if isinstance(identifier, str) else "",
+            )
+            for commit_dt, log_dt, category, type_, identifier in zip(
+                df[wc.COL_COMMIT_DATETIME],
+                df[wc.COL_LOG_DATETIME],
+                df[wc.COL_CATEGORY],
+                df[wc.COL_TYPE],
+                df[wc.COL_TASK_IDENTIFIER],
+            )
+        ]
+
+    def _rewrite(self, df: pd.DataFrame) -> int:
+        """
+        Atomically replace the content of the logfile with the given records
+        and rebuild the sidecar files. Returns the new size of the logfile.
+        Must be called while holding the lock.
+        """
+        cols = [col for col, _ in self._schema]
+        data = df[cols].to_csv(sep=self._separator, index=False, header=False)
+        data_bytes = data.encode()
+
+        mode = os.stat(self._log_fp).st_mode
+        atomic_write(self._log_fp, data_bytes)
+        os.chmod(self._log_fp, mode)
+
+        self._log_df = self._sort(df[self._columns] if self._columns else df)
+        self._offset = len(data_bytes)
+        self._file_id = self._get_file_id()
+        remove_state(self._log_fp)
+        self.get_active_state()
+        # Rebuilt while holding the lock, such that the next reader does not
+        # have to rebuild them.
+        index = self._build_task_index(len(data_bytes))
+        write_trigrams(self._log_fp, index)
+        return len(data_bytes)
+
+    def refresh(self) -> pd.DataFrame:
+        """
+        Ingest records that have been appended to the logfile since it has
+        been read, e.g. by another process. Returns the new records.
+        """
+        if self._df is None or is_rewritten(self._log_fp, self._offset, self._file_id):
+            # Not read yet or the file has been rewritten, start from scratch.
+            self._read()
+            return self._log_df
+
+        df, self._offset = self.read_records(self._offset, self._columns)
+        if df.shape[0] > 0:
+            self._log_df = self._sort(pd.concat((self._log_df, df)))
+        return df
+
+    def read_records(
+        self, offset: int = 0, columns: Optional[List[str]] = None
+    ) -> Tuple[pd.DataFrame, int]:
+        """
+        Read all records of the logfile starting at byte position `offset`.
+        Only the given columns are read, all columns if `columns` is not set.
+        Returns the records and the byte position up to which the file has
+        been consumed.
+        """
+        with open(self._log_fp, "rb") as fh:
+            fh.seek(offset)
+            data = fh.read()
+        if data and not data.endswith(b"\n"):
+            head, sep, tail = data.rpartition(b"\n")
+            if not is_complete_record(tail, self._separator):
+                # The last record is still being written or has been torn.
+                data = head + sep
+        return self._parse(data, columns), offset + len(data)
 
     def _read(self) -> None:
         """
         Read data from input file.
         This method uses `pandas.read_csv` to parse the data.
         """
-        date_cols = get_datetime_cols_from_schema(self._schema)
-        header = [col for col, _ in self._schema]
+        if self._needs_recovery():
+            with self._locked():
+                self._recover()
+
+        self._file_id = self._get_file_id()
+        df, self._offset = self.read_records(0, self._columns)
+        self._log_df = self._sort(df)
+
+    def _sort(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Sort records by log time. Use a stable sort, such that entries with
+        the same time keep the order in which they have been committed.
+        """
+        if wc.COL_LOG_DATETIME not in df.columns:
+            # Order is irrelevant for the selected columns
+            return df
+        if df[wc.COL_LOG_DATETIME].is_monotonic_increasing:
+            # E.g. a compacted logfile with only in-order records appended
+            return df
+        return df.sort_values(by=[wc.COL_LOG_DATETIME], kind="mergesort")
+
+    def _get_file_id(self) -> Tuple[int, int]:
+        return get_file_id(self._log_fp)
+
+    def _parse(self, data: bytes, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Parse raw bytes of the logfile into a DataFrame."""
         try:
-            self._log_df = pd.read_csv(
-                self._log_fp,
-                sep=self._separator,
-                parse_dates=date_cols,
-                header=None,
-                names=header,
-                comment="#",
-            ).sort_values(by=[wc.COL_LOG_DATETIME])
+            df = self._read_csv(BytesIO(data), columns)
         except pd.errors.EmptyDataError:
-            self._log_df = empty_df_from_schema(self._schema)
+            usecols = self._get_usecols(columns)
+            df = empty_df_from_schema([x for x in self._schema if x[0] in usecols])
+        return self._add_derived_cols(df, columns)
+
+    def _iter_segment(
+        self, fp: str, columns: Optional[List[str]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """Parse an archived segment chunk by chunk while decompressing it."""
+        with open_segment(fp) as fh:
+            chunks = self._read_csv(fh, columns, chunksize=self._archive_chunksize)
+            for chunk in chunks:
+                yield self._add_derived_cols(chunk, columns)
+
+    def _iter_logfile(
+        self, columns: Optional[List[str]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Parse the logfile chunk by chunk. Records that are appended while
+        the logfile is being read are ignored.
+        """
+        with self._locked():
+            if self._needs_recovery():
+                self._recover()
+            # Records are appended under the lock, so the logfile ends with
+            # a complete record.
+            size = os.path.getsize(self._log_fp)
+        with open_prefix(self._log_fp, size) as fh:
+            chunks = self._read_csv(fh, columns, chunksize=self._archive_chunksize)
+            for chunk in chunks:
+                yield self._add_derived_cols(chunk, columns)
+
+    def _read_archived_tasks(
+        self, task_ids: Set[str], years: Optional[Set[int]] = None
+    ) -> pd.DataFrame:
+        """
+        Returns the archived records of the given tasks. Only segments of
+        years in which one of the tasks has been used are read, each of them
+        once. The years can be restricted further with `years`.
+        """
+        rollups = read_rollups(self._log_fp)
+        rollups = rollups[
+            (rollups[wc.COL_CATEGORY] == wc.TOKEN_TASK)
+            & (rollups[wc.COL_TASK_IDENTIFIER].isin(task_ids))
+        ]
+        task_years = set(d.year for d in rollups["date"])
+        if years is not None:
+            task_years &= years
+
+        dfs = []
+        for year, fp in list_segments(self._log_fp):
+            if year not in task_years:
+                continue
+            for chunk in self._iter_segment(fp, self._columns):
+                mask = (chunk[wc.COL_CATEGORY] == wc.TOKEN_TASK) & (
+                    chunk[wc.COL_TASK_IDENTIFIER].isin(task_ids)
+                )
+                dfs.append(chunk[mask])
+        if len(dfs) == 0:
+            return self._parse(b"", self._columns)
+        df = pd.concat(dfs)
+        # Segments may have other UTC offsets than the in-memory log, e.g.
+        # summer time, concatenating them would mix the offsets of a column.
+        for col in (wc.COL_COMMIT_DATETIME, wc.COL_LOG_DATETIME):
+            if col in df.columns:
+                df[col] = self._align_tz(df[col])
+        return df
+
+    def _get_usecols(self, columns: Optional[List[str]]) -> List[str]:
+        """Returns the schema columns needed to provide the given columns."""
+        header = [col for col, _ in self._schema]
+        if columns is None:
+            return header
+        needed = set(columns) | {
+            source for col, source in DERIVED_COLS.items() if col in columns
+        }
+        return [col for col in header if col in needed]
+
+    def _read_csv(
+        self, fh, columns: Optional[List[str]] = None, chunksize: Optional[int] = None
+    ):
+        usecols = self._get_usecols(columns)
+        date_cols = [
+            col for col in get_datetime_cols_from_schema(self._schema) if col in usecols
+        ]
+        header = [col for col, _ in self._schema]
+        return pd.read_csv(
+            fh,
+            sep=self._separator,
+            parse_dates=date_cols,
+            header=None,
+            names=header,
+            usecols=usecols,
+            comment="#",
+            chunksize=chunksize,
+        )
 
-        self._log_df["date"] = None
-        self._log_df["time"] = None
-        self._log_df[wc.COL_LOG_DATETIME_UTC] = None
-        self._log_df[wc.COL_COMMIT_DATETIME_UTC] = None
+    def _add_derived_cols(
+        self, df: pd.DataFrame, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        derived = [col for col in DERIVED_COLS if columns is None or col in columns]
+        if len(derived) == 0:
+            return df
 
-        self._log_df.update(extract_date_and_time(self._log_df))
+        for col in derived:
+            df[col] = None
+        df.update(extract_date_and_time(df, derived))
+        return df
 
-    def _persist(self, df: pd.DataFrame, mode="a") -> None:
+    def _persist(self, df: pd.DataFrame) -> None:
+        """
+        Append records to the logfile. Must be called while holding the lock.
+        """
         cols = [col for col, _ in self._schema]
-        df[cols].to_csv(
-            self._log_fp, mode=mode, sep=self._separator, index=False, header=False
+        data = df[cols].to_csv(sep=self._separator, index=False, header=False)
+        data_bytes = data.encode()
+
+        size = os.path.getsize(self._log_fp)
+        if size > 0 and not self._ends_with_newline(size):
+            # The last line has been written by hand w/o a trailing newline
+            data_bytes = b"\n" + data_bytes
+
+        state = read_state(self._log_fp, size=size)
+        index = read_index(self._log_fp, size=size)
+        if self._journal and df.shape[0] > 1:
+            write_journal(self._log_fp, size, data_bytes)
+        start = append_bytes(self._log_fp, data_bytes)
+        end = start + len(data_bytes)
+        if self._journal and df.shape[0] > 1:
+            remove_journal(self._log_fp)
+        if start != size:
+            # Another program has written to the file without holding the lock
+            state = None
+            index = None
+
+        # Only skip the written bytes on the next refresh if no other process
+        # has appended to the file in the meantime.
+        if start == self._offset:
+            self._offset = end
+
+        records = list(
+            zip(
+                df[wc.COL_LOG_DATETIME].map(lambda x: pd.Timestamp(x).to_pydatetime()),
+                df[wc.COL_CATEGORY],
+                df[wc.COL_TYPE],
+                df[wc.COL_TASK_IDENTIFIER],
+            )
         )
+        tail = get_tail(self._log_fp, end)
+
+        new_ids = set()
+        if index is not None:
+            new_ids = {
+                identifier
+                for _, category, _, identifier in records
+                if category == wc.TOKEN_TASK and identifier not in index
+            }
+            index = update_index(index, records)
+        if index is not None:
+            write_index(self._log_fp, index, end, tail)
+            add_trigrams(self._log_fp, new_ids, len(index))
+        else:
+            # Rebuilt by the next reader
+            remove_index(self._log_fp)
+            remove_trigrams(self._log_fp)
+
+        if state is not None:
+            state = update_state(state, records)
+        if state is None and self._df is not None and self._offset == end:
+            state = state_from_df(self._df)
+        if state is not None:
+            write_state(self._log_fp, state, end, tail)
+        else:
+            # The state can not be updated cheaply, it will be rebuilt by
+            # the next reader.
+            remove_state(self._log_fp)
+
+    def _ends_with_newline(self, size: int) -> bool:
+        with open(self._log_fp, "rb") as fh:
+            fh.seek(size - 1)
+            return fh.read(1) == b"\n"
 
     def _commit(
         self,
@@ -382,59 +1794,220 @@ class Log(object):
                 f'Type must be one of {", ".join([wc.TOKEN_START, wc.TOKEN_STOP])}'
             )
 
+        # Other processes may append to the logfile concurrently. The checks
+        # and the append must see the same content of the logfile.
+        with self._locked():
+            self._sync()
+
+            entries = []
+            # Test if there are running tasks
+            if category == wc.TOKEN_SESSION:
+                active_tasks = self._get_active_task_ids(log_dt.date())
+                if len(active_tasks) > 0:
+                    if not force:
+                        raise ActiveTasksError(active_tasks)
+                    else:
+                        entries += [
+                            (wc.TOKEN_TASK, wc.TOKEN_STOP, task_id)
+                            for task_id in active_tasks
+                        ]
+            entries.append((category, type_, identifier))
+
+            self._append_entries(log_dt, entries)
+
+    def _append_entries(
+        self, log_dt: datetime, entries: List[Tuple[str, str, Optional[str]]]
+    ) -> None:
+        """
+        Append entries (category, type, identifier) with the same log time as
+        a single batch. Must be called while holding the lock.
+        """
         commit_dt = now_localtz()
 
-        # Test if there are running tasks
-        if category == wc.TOKEN_SESSION:
-            date_mask = self._log_df["date"] == log_dt.date()
-            task_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK
-            mask = date_mask & task_mask
-            active_tasks = get_active_task_ids(self._log_df[mask])
-            if len(active_tasks) > 0:
-                if not force:
-                    msg = ErrMsg.STOP_SESSION_TASKS_RUNNING.value.format(
-                        active_tasks=active_tasks
-                    )
-                    sys.stderr.write(msg + "\n")
-                    sys.exit(1)
-                else:
-                    for task_id in active_tasks:
-                        self._commit(wc.TOKEN_TASK, wc.TOKEN_STOP, log_dt, task_id)
-
         cols = [col for col, _ in self._schema]
-        values = [
-            pd.to_datetime(commit_dt),
-            pd.to_datetime(log_dt),
-            category,
-            type_,
-            identifier,
-        ]
-
-        record = pd.DataFrame(dict(zip(cols, values)), index=[0],)
+        record = pd.DataFrame(
+            [
+                [pd.to_datetime(commit_dt), pd.to_datetime(log_dt), c, t, i]
+                for c, t, i in entries
+            ],
+            columns=cols,
+        )
         record_t = pd.concat([record, extract_date_and_time(record)], axis=1)
+        self._append_records(record_t)
 
-        # append record to in-memory log
-        self._log_df = pd.concat((self._log_df, record_t))
+    def _append_records(self, df: pd.DataFrame) -> None:
+        """
+        Append records with all columns, including the derived ones, to the
+        in-memory log and the logfile. Must be called while holding the lock.
+        """
+        # append record to in-memory log, if it has been read already
+        if self._df is not None:
+            # Because we allow for time offsets sorting is not guaranteed at
+            # this point. Update sorting of values in-memory.
+            projected = df[list(self._log_df.columns)]
+            self._log_df = self._sort(pd.concat((self._log_df, projected)))
         # and persist to disk
-        self._persist(record_t, mode="a")
+        self._persist(df)
+
+    def _sync(self) -> None:
+        """
+        Recover interrupted writes and ingest records that have been appended
+        since the log has been read. Must be called while holding the lock.
+        """
+        self._recover()
+        if self._df is not None:
+            self.refresh()
+
+    def _needs_recovery(self) -> bool:
+        return os.path.exists(get_journal_fp(self._log_fp)) or has_torn_tail(
+            self._log_fp, self._separator
+        )
+
+    def _recover(self) -> None:
+        """
+        Complete or roll back an interrupted batch commit and quarantine a
+        partial record at the end of the logfile. A commit is completed if a
+        part of it has been written, and rolled back if nothing has been
+        written or the logfile does not continue with its records. Rolling
+        back moves everything after the position of the commit into the
+        quarantine file. Only the tail of the logfile is read.
+        Must be called while holding the lock.
+        """
+        journal = read_journal(self._log_fp)
+        if journal is not None:
+            offset, data = journal
+            size = os.path.getsize(self._log_fp)
+            with open(self._log_fp, "rb") as fh:
+                fh.seek(offset)
+                written = fh.read(len(data))
+            if written == data:
+                pass  # the commit has been completed
+            elif (
+                len(written) > 0
+                and size <= offset + len(data)
+                and data.startswith(written)
+            ):
+                append_bytes(self._log_fp, data[len(written) :])
+                self.logger.warning("Completed an interrupted commit.")
+            elif size <= offset:
+                self.logger.warning(
+                    "An interrupted commit has not been written, it has been "
+                    "discarded."
+                )
+            else:
+                quarantine_from(self._log_fp, offset)
+                self.logger.warning(
+                    "An interrupted commit could not be completed and has been "
+                    "rolled back. The content written after it started has "
+                    f"been moved to {get_quarantine_fp(self._log_fp)}."
+                )
+            remove_journal(self._log_fp)
+
+        if has_torn_tail(self._log_fp, self._separator):
+            tail = quarantine_tail(self._log_fp)
+            self.logger.warning(
+                f"Removed partial record at the end of the logfile: {tail!r}. "
+                f"It has been moved to {get_quarantine_fp(self._log_fp)}."
+            )
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """
+        Hold the advisory lock of the logfile. The lock is reentrant within
+        the same instance.
+        """
+        self._lock_depth += 1
+        try:
+            if self._lock_depth == 1:
+                with file_lock(self._log_fp):
+                    yield
+            else:
+                yield
+        finally:
+            self._lock_depth -= 1
+
+    def _write_status(self, result: StatusResult, fmt: Optional[str]) -> None:
+        lines = [
+            ("Status", "Tracking {tracking_status}"),
+            ("Total time", "{total_time} ({percentage_done:3}%)"),
+            ("Remaining time", "{remaining_time} ({percentage_remaining:3}%)"),
+            ("Overtime", "{overtime} ({percentage_overtime:3}%)"),
+            ("Break Duration", "{break_duration}"),
+        ]
+        if result.break_taken is not None:
+            lines += [("Logged breaks", "{break_taken}")]
+        lines += [
+            ("Touched tasks", "{touched_tasks_stats}",),
+            ("Active tasks", "{active_tasks_stats}",),
+        ]
+
+        if result.is_active and date == "today":
+            lines += [("End of work", "{eow}",)]
+
+        key_max_len = max([len(line[0]) for line in lines])
+        fmt_string = "{:" + str(key_max_len + 1) + "s}: {}"
+
+        stdout_fmt = "\n".join(fmt_string.format(*line) for line in lines) + "\n"
+
+        sys.stdout.write(
+            (stdout_fmt if fmt is None else fmt).format(**result.to_fmt_dict())
+        )
+
+    def get_active_state(self) -> ActiveState:
+        """
+        Returns the open session and the open tasks.
+        The state is read from the state file next to the logfile if it is
+        consistent with the logfile, otherwise it is derived from the log and
+        the state file is rebuilt.
+        """
+        state = read_state(self._log_fp)
+        if state is not None:
+            return state
+
+        self.refresh()
+        state = state_from_df(self._log_df)
+        if os.path.getsize(self._log_fp) == self._offset:
+            tail = get_tail(self._log_fp, self._offset)
+            write_state(self._log_fp, state, self._offset, tail)
+        return state
+
+    def _get_active_task_ids(self, query_date: date) -> List[str]:
+        """
+        Returns the identifiers of the tasks that are running on a given day.
+        Uses the state file unless the day is older than the latest log entry.
+        """
+        state = self.get_active_state()
+        if state.last_log_dt is None or query_date >= state.last_log_dt.date():
+            return sorted(
+                task_id
+                for task_id, start in state.tasks.items()
+                if start.date() == query_date
+            )
 
-        # Because we allow for time offsets sorting is not guaranteed at this point.
-        # Update sorting of values in-memory.
-        self._log_df = self._log_df.sort_values(by=[wc.COL_LOG_DATETIME])
+        date_mask = self._log_df["date"] == query_date
+        task_mask = self._log_df[wc.COL_CATEGORY] == wc.TOKEN_TASK
+        return get_active_task_ids(self._log_df[date_mask & task_mask])
 
-    def _check_nonempty_or_exit(self, fmt: Optional[str]):
+    def _check_nonempty(self) -> None:
         """
         Tests if the log file has at least a single value.
-        Exits with code 1 if no entry is available and no custom format has
-        been set. Always exits with code 0 if a custom format is set.
+        Raises `EmptyLogError` if no entry is available.
         """
         if self._log_df.shape[0] == 0:
-            if fmt is None:
-                sys.stderr.write(ErrMsg.EMPTY_LOG_DATA.value + "\n")
-                sys.exit(1)
-            else:
-                sys.stdout.write(ErrMsg.NA.value)
-                sys.exit(0)
+            raise EmptyLogError()
+
+    def _exit_with_error(self, err: WorklogError, fmt: Optional[str]) -> None:
+        """
+        Renders an error of the library API for the CLI and exits.
+        Exits with the exit code of the error if no custom format has been
+        set. Always exits with code 0 if a custom format is set.
+        """
+        if fmt is None:
+            sys.stderr.write(str(err) + "\n")
+            sys.exit(err.exit_code)
+        else:
+            sys.stdout.write(ErrMsg.NA.value)
+            sys.exit(0)
 
     def _filter_date_category_limit_cols(
         self,
@@ -475,7 +2048,13 @@ class Log(object):
             self.logger.warning(f"Set sentinel stop value: {sdt}")
         return ret
 
-    def _calc_facts(self, df: pd.DataFrame, hours_target: float, hours_max: float):
+    def _calc_facts(
+        self,
+        df: pd.DataFrame,
+        hours_target: float,
+        hours_max: float,
+        weekday: Optional[int] = None,
+    ):
         shifted_dt = df[wc.COL_LOG_DATETIME_UTC].shift(1)
         stop_mask = df[wc.COL_TYPE] == wc.TOKEN_STOP
 
@@ -483,11 +2062,17 @@ class Log(object):
         total_time = (
             df[stop_mask][wc.COL_LOG_DATETIME_UTC] - shifted_dt[stop_mask]
         ).sum()
-        total_time_str = format_timedelta(total_time)
 
         # calculate breaks
-        break_duration = self.auto_break.get_duration(total_time)
-        break_duration_str = format_timedelta(break_duration)
+        break_duration = self.auto_break.get_duration(total_time, weekday=weekday)
+        break_taken = None
+        if self.break_mode != wc.BREAKS_AUTO:
+            break_taken = session_gaps(df, col=wc.COL_LOG_DATETIME_UTC).sum()
+            break_taken = pd.Timedelta(break_taken).to_pytimedelta()
+            if self.break_mode == wc.BREAKS_MAX:
+                break_duration = max(break_duration - break_taken, timedelta(0))
+            else:
+                break_duration = timedelta(0)
         hours_target_dt = timedelta(hours=hours_target) + break_duration
         hours_max_dt = timedelta(hours=hours_max) + break_duration
 
@@ -498,13 +2083,10 @@ class Log(object):
             .replace(microsecond=0)
         )
         eow_dt = now + (hours_target_dt - total_time)
-        eow_str = eow_dt.strftime("%H:%M:%S")
         remaining_time = max(eow_dt - now, timedelta(minutes=0))
-        remaining_time_str = format_timedelta(remaining_time)
 
         # calculate overtime
         overtime = max(total_time - hours_target_dt, timedelta(minutes=0))
-        overtime_str = format_timedelta(overtime)
 
         # calculcate percentage values
         percentage_done = round(
@@ -520,23 +2102,16 @@ class Log(object):
             0,
         )
 
-        def _short_hours_str(value: str):
-            return value[: len("00:00")]
-
         return dict(
-            break_duration=break_duration_str,
-            break_duration_short=_short_hours_str(break_duration_str),
-            eow=eow_str,
-            eow_short=_short_hours_str(eow_str),
-            overtime=overtime_str,
-            overtime_short=_short_hours_str(overtime_str),
+            total_time=total_time,
+            break_duration=break_duration,
+            break_taken=break_taken,
+            remaining_time=remaining_time,
+            overtime=overtime,
+            eow=eow_dt,
             percentage_done=percentage_done,
-            percentage_overtime=percentage_overtime,
             percentage_remaining=percentage_remaining,
-            remaining_time=remaining_time_str,
-            remaining_time_short=_short_hours_str(remaining_time_str),
-            total_time=total_time_str,
-            total_time_short=_short_hours_str(total_time_str),
+            percentage_overtime=percentage_overtime,
         )
 
     def _aggregate_base(self, mask, keep_cols: List[str] = []):
@@ -549,8 +2124,23 @@ class Log(object):
         ret["agg_time"] = agg_time
         return ret
 
-    def _aggregate_time(self, mask, resample="D"):
+    def _aggregate_time(self, mask, resample="D", archived=None):
+        return self._resample_time(self._time_durations(mask, archived), resample)
+
+    def _time_durations(self, mask, archived=None):
         df = self._aggregate_base(mask, keep_cols=["date"])
+        if archived is not None and archived.shape[0] > 0:
+            df_archived = pd.DataFrame(
+                {
+                    wc.COL_LOG_DATETIME: self._align_tz(archived[wc.COL_LOG_DATETIME]),
+                    "date": archived["date"],
+                    "agg_time": archived["duration"],
+                }
+            )
+            df = pd.concat([d for d in (df_archived, df) if d.shape[0] > 0])
+        return df
+
+    def _resample_time(self, df, resample="D"):
         df_day = (
             df.set_index(wc.COL_LOG_DATETIME)
             .resample(resample)
@@ -560,13 +2150,48 @@ class Log(object):
         )
         return df_day
 
-    def _aggregate_tasks(self, mask):
-        df = calc_task_durations(
-            self._log_df[mask],
-            keep_cols=[wc.COL_LOG_DATETIME, wc.COL_TASK_IDENTIFIER, "time"],
+    def _aggregate_tasks(self, mask, archived=None):
+        return self._sum_tasks(self._task_durations(mask, archived))
+
+    def _task_durations(self, mask, archived=None):
+        if self.split_overlap:
+            df = self._split_task_durations(mask)
+        else:
+            df = calc_task_durations(
+                self._log_df[mask],
+                keep_cols=[wc.COL_LOG_DATETIME, wc.COL_TASK_IDENTIFIER, "time"],
+            )
+            df.rename(columns={"time": "agg_time"}, inplace=True)
+        if archived is not None and archived.shape[0] > 0:
+            df_archived = pd.DataFrame(
+                {
+                    wc.COL_LOG_DATETIME: self._align_tz(archived[wc.COL_LOG_DATETIME]),
+                    wc.COL_TASK_IDENTIFIER: archived[wc.COL_TASK_IDENTIFIER],
+                    "agg_time": archived["duration"],
+                }
+            )
+            df = pd.concat(
+                [d for d in (df_archived, df) if d.shape[0] > 0], ignore_index=True
+            )
+
+        return df
+
+    def _split_task_durations(self, mask):
+        """
+        Durations of the task intervals in `mask` with the time of tasks
+        running in parallel divided between them, see `split_overlaps`.
+        Archived years keep their durations as they are.
+        """
+        intervals = extract_intervals_by_task(self._log_df[mask])
+        return pd.DataFrame(
+            {
+                wc.COL_LOG_DATETIME: intervals["stop"],
+                wc.COL_TASK_IDENTIFIER: intervals[wc.COL_TASK_IDENTIFIER],
+                "agg_time": split_overlaps(intervals),
+            }
         )
-        df.rename(columns={"time": "agg_time"}, inplace=True)
 
+    def _sum_tasks(self, df):
         if len(df) == 0:
             return None
 
@@ -577,21 +2202,60 @@ class Log(object):
             .reset_index()
         )
 
-    def _print_aggregation(self, agg_label, df, cols, col_titles, formatters=None):
-        headline = f"Aggregated by {agg_label}:"
+    def _get_tz(self):
+        """Timezone of the log times of the in-memory log."""
+        tz = getattr(self._log_df[wc.COL_LOG_DATETIME].dtype, "tz", None)
+        return tz or wc.LOCAL_TIMEZONE
+
+    def _align_tz(self, s: pd.Series) -> pd.Series:
+        """
+        Convert archived log times to the timezone of the in-memory log. The
+        times may have different UTC offsets.
+        """
+        return pd.to_datetime(s, utc=True).dt.tz_convert(self._get_tz())
+
+    def _print_aggregation(
+        self, agg_label, df, cols, col_titles, formatters=None, headline=None
+    ):
+        """`formatters` format whole columns, not single values."""
+        headline = headline or f"Aggregated by {agg_label}:"
         print(headline)
         print("-" * len(headline))
         if df is None or df.empty:
             print("Aggregation not available")
         else:
-            print(
-                df.to_string(
-                    index=False,
-                    columns=cols,
-                    header=col_titles,
-                    formatters=formatters,
-                    col_space=20,
-                )
-            )
+            df = df[cols].copy()
+            for col, formatter in (formatters or {}).items():
+                if col in cols:
+                    df[col] = formatter(df[col])
+            print(df.to_string(index=False, header=col_titles, col_space=20))
 
         print()
+
+
+def _get_report_of(args: tuple) -> Optional[ReportResult]:
+    """
+    Report of a single logfile, see `Log.get_team_report`. Runs in a worker
+    process, hence a module level function. Returns None for empty logs.
+    """
+    (
+        fp,
+        columns,
+        auto_break,
+        break_mode,
+        split_overlap,
+        task_separator,
+        date_from,
+        date_to,
+        task_depth,
+    ) = args
+    log = Log(fp)
+    log.project(columns)
+    log.auto_break = auto_break
+    log.break_mode = break_mode
+    log.split_overlap = split_overlap
+    log.task_separator = task_separator
+    try:
+        return log.get_report(date_from, date_to, task_depth=task_depth)
+    except EmptyLogError:
+        return None
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional, Tuple
 from datetime import datetime, timezone, timedelta
 import re
 import argparse
@@ -27,6 +27,13 @@ def get_arg_parser() -> argparse.ArgumentParser:
     _add_doctor_parser(subparsers)
     _add_log_parser(subparsers)
     _add_report_parser(subparsers)
+    _add_serve_parser(subparsers)
+    _add_compact_parser(subparsers)
+    _add_archive_parser(subparsers)
+    _add_merge_parser(subparsers)
+    _add_sync_parser(subparsers)
+    _add_export_parser(subparsers)
+    _add_completion_parser(subparsers)
 
     return parser
 
@@ -66,9 +73,7 @@ def _add_task_parser(subparsers: argparse._SubParsersAction):
 
     # task start
     task_start_parser = task_parser_type.add_parser(wc.TOKEN_START)
-    task_start_parser.add_argument(
-        "id", type=str, help="Task identifier, can be freely chosen",
-    )
+    _add_task_id_args(task_start_parser, "Task identifier, can be freely chosen")
     task_start_parser.add_argument(
         "-as",
         "--auto-stop",
@@ -79,18 +84,122 @@ def _add_task_parser(subparsers: argparse._SubParsersAction):
 
     # task stop
     task_stop_parser = task_parser_type.add_parser(wc.TOKEN_STOP)
-    task_stop_parser.add_argument(
-        "id", type=str, help="Task identifier of a running task.",
-    )
+    _add_task_id_args(task_stop_parser, "Task identifier of a running task.")
     _add_timeshift_args(task_stop_parser)
 
     # task list
     task_list_parser = task_parser_type.add_parser("list")
+    task_list_parser.add_argument(
+        "--sort",
+        choices=["name", "count", "recent", "time"],
+        default="name",
+        help=(
+            "Sort order of the listed tasks: by identifier, number of entries, "
+            "most recent use or total time spent."
+        ),
+    )
+    task_list_parser.add_argument(
+        "--limit", type=_positive_int, help="Show only the first n tasks.",
+    )
 
     # task report
-    task_report_parser = task_parser_type.add_parser("report")
+    task_report_parser = task_parser_type.add_parser(
+        "report",
+        description=(
+            "Shows the log entries and the time spent on one or more tasks. "
+            "Glob patterns such as 'PROJ-12*' select all matching tasks."
+        ),
+    )
+    _add_task_id_args(
+        task_report_parser,
+        "Task identifiers or glob patterns of recorded tasks.",
+        nargs="+",
+    )
     task_report_parser.add_argument(
-        "id", type=str, help="Task identifier of a recorded task.",
+        "--regex",
+        action="store_true",
+        help="Treat the task identifiers as regular expressions.",
+    )
+    task_report_parser.add_argument(
+        "--date-from",
+        type=_combined_month_or_day_or_week_parser,
+        help=(
+            "Only include entries from this date on (inclusive). "
+            "Allowed input formats are YYYY-MM-DD, YYYY-MM and YYYY-WXX."
+        ),
+    )
+    task_report_parser.add_argument(
+        "--date-to",
+        type=_combined_month_or_day_or_week_parser,
+        help=(
+            "Only include entries before this date (exclusive). "
+            "Allowed input formats are YYYY-MM-DD, YYYY-MM and YYYY-WXX."
+        ),
+    )
+    task_report_parser.add_argument(
+        "--combined",
+        action="store_true",
+        help="Show all tasks in a single report instead of one per task.",
+    )
+    task_report_parser.add_argument(
+        "--format",
+        choices=wc.REPORT_FORMATS,
+        default="text",
+        help="Output format of the report.",
+    )
+
+    # task tree
+    task_tree_parser = task_parser_type.add_parser(
+        "tree",
+        description=(
+            "Shows the time spent on tasks along the hierarchy of the task "
+            "identifiers, e.g. 'client/project/ticket'. "
+            "The separator can be configured with 'worklog.task_separator'."
+        ),
+    )
+    task_tree_parser.add_argument(
+        "--date-from",
+        type=_combined_month_or_day_or_week_parser,
+        help=(
+            "Only include entries from this date on (inclusive). "
+            "Allowed input formats are YYYY-MM-DD, YYYY-MM and YYYY-WXX."
+        ),
+    )
+    task_tree_parser.add_argument(
+        "--date-to",
+        type=_combined_month_or_day_or_week_parser,
+        help=(
+            "Only include entries before this date (exclusive). "
+            "Allowed input formats are YYYY-MM-DD, YYYY-MM and YYYY-WXX."
+        ),
+    )
+    task_tree_parser.add_argument(
+        "--depth", type=_positive_int, help="Show only the first n levels.",
+    )
+
+    # task overlaps
+    task_overlaps_parser = task_parser_type.add_parser(
+        "overlaps",
+        description=(
+            "Shows the periods in which several tasks were running in parallel "
+            "and the highest number of tasks running at the same time."
+        ),
+    )
+    task_overlaps_parser.add_argument(
+        "--date-from",
+        type=_combined_month_or_day_or_week_parser,
+        help=(
+            "Only include entries from this date on (inclusive). "
+            "Allowed input formats are YYYY-MM-DD, YYYY-MM and YYYY-WXX."
+        ),
+    )
+    task_overlaps_parser.add_argument(
+        "--date-to",
+        type=_combined_month_or_day_or_week_parser,
+        help=(
+            "Only include entries before this date (exclusive). "
+            "Allowed input formats are YYYY-MM-DD, YYYY-MM and YYYY-WXX."
+        ),
     )
 
 
@@ -116,6 +225,20 @@ def _add_status_parser(subparsers: argparse._SubParsersAction):
     status_parser.add_argument(
         "--fmt", type=str, default=None, help="Use a custom formatted string"
     )
+    _add_breaks_arg(status_parser)
+    status_parser.add_argument(
+        "--watch",
+        type=_positive_float,
+        nargs="?",
+        const=5.0,
+        default=None,
+        metavar="INTERVAL",
+        help=(
+            "Keep running and refresh the status every INTERVAL seconds "
+            "(default: 5). "
+            "In combination with --fmt a single line is written per refresh."
+        ),
+    )
 
 
 def _add_doctor_parser(subparsers: argparse._SubParsersAction):
@@ -126,6 +249,11 @@ def _add_doctor_parser(subparsers: argparse._SubParsersAction):
             "It will report the following issues: non-closed working sessions"
         ),
     )
+    doctor_parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Check archived entries as well. See 'wl archive'.",
+    )
 
 
 def _add_log_parser(subparsers: argparse._SubParsersAction):
@@ -209,6 +337,216 @@ def _add_report_parser(subparsers: argparse._SubParsersAction):
             "XX referring to the week number, e.g. 35."
         ),
     )
+    report_parser.add_argument(
+        "--task-depth",
+        type=_positive_int,
+        help=(
+            "Aggregate tasks on this level of the task hierarchy, e.g. 1 for "
+            "'client' and 2 for 'client/project' if tasks are named "
+            "'client/project/ticket'."
+        ),
+    )
+    windows_grp = report_parser.add_mutually_exclusive_group()
+    windows_grp.add_argument(
+        "--logs",
+        metavar="DIR_OR_GLOB",
+        help=(
+            "Create a team report from the logfiles in a directory or matching "
+            "a glob pattern, e.g. one logfile per team member. "
+            "The logfiles are aggregated in parallel."
+        ),
+    )
+    windows_grp.add_argument(
+        "--window",
+        action="append",
+        type=_window_parser,
+        help=(
+            "Create a separate report for this time window, can be given "
+            "several times. The log is read only once for all windows. "
+            "Either FROM..TO with TO being exclusive, or a single month, week or "
+            "day, e.g. 2020-08, 2020-W35 or 2020-08-24. "
+            "Replaces --date-from and --date-to."
+        ),
+    )
+    windows_grp.add_argument(
+        "--windows",
+        metavar="FILE",
+        type=_windows_file_parser,
+        help=(
+            "Like --window, but read the time windows from a file, one per line. "
+            "Empty lines and lines starting with '#' are skipped."
+        ),
+    )
+    report_parser.add_argument(
+        "--processes",
+        type=_positive_int,
+        help=(
+            "Number of worker processes used with --logs. "
+            "Defaults to the number of CPUs."
+        ),
+    )
+    _add_breaks_arg(report_parser)
+    report_parser.add_argument(
+        "--split-overlap",
+        action="store_true",
+        help=(
+            "Divide the time of tasks running in parallel equally between them "
+            "instead of counting it for each task."
+        ),
+    )
+    report_parser.add_argument(
+        "--coverage",
+        action="store_true",
+        help=(
+            "Show per day how much session time had no task running and how much "
+            "task time was outside of sessions. Not available with --logs."
+        ),
+    )
+    report_parser.add_argument(
+        "--format",
+        choices=wc.REPORT_FORMATS,
+        default="text",
+        help=(
+            "Output format of the report. CSV and JSON are written row by row, "
+            "durations in seconds."
+        ),
+    )
+
+
+def _add_serve_parser(subparsers: argparse._SubParsersAction):
+    serve_parser = subparsers.add_parser(
+        wc.SUBCMD_SERVE,
+        description=(
+            "Starts a local HTTP server that answers JSON queries for the status, "
+            "reports and tasks. "
+            "The server only listens on localhost."
+        ),
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=_positive_int,
+        default=8765,
+        help="Port on which the server listens. Defaults to 8765.",
+    )
+
+
+def _add_compact_parser(subparsers: argparse._SubParsersAction):
+    subparsers.add_parser(
+        wc.SUBCMD_COMPACT,
+        description=(
+            "Rewrites the worklog file sorted by the date and time of the entries. "
+            "Duplicate entries are removed. "
+            "Sorted worklog files are read faster."
+        ),
+    )
+
+
+def _add_archive_parser(subparsers: argparse._SubParsersAction):
+    archive_parser = subparsers.add_parser(
+        wc.SUBCMD_ARCHIVE,
+        description=(
+            "Moves entries of past years out of the worklog file into compressed "
+            "archive files next to it. "
+            "Reports still include archived entries, but read precomputed daily "
+            "totals instead of the individual entries."
+        ),
+    )
+    archive_parser.add_argument(
+        "--before",
+        type=_year_parser,
+        required=True,
+        metavar="YYYY",
+        help="Archive all entries before the start of this year.",
+    )
+
+
+def _add_merge_parser(subparsers: argparse._SubParsersAction):
+    merge_parser = subparsers.add_parser(
+        wc.SUBCMD_MERGE,
+        description=(
+            "Merges worklog files, e.g. of different machines, into a single "
+            "worklog file sorted by the date and time of the entries. "
+            "Duplicate entries are removed. Session entries that contradict "
+            "each other are reported."
+        ),
+    )
+    merge_parser.add_argument("logs", nargs="+", help="Worklog files to merge.")
+    merge_parser.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        help="Path of the merged worklog file. An existing file is replaced.",
+    )
+
+
+def _add_sync_parser(subparsers: argparse._SubParsersAction):
+    sync_parser = subparsers.add_parser(
+        wc.SUBCMD_SYNC,
+        description=(
+            "Adds the entries of another worklog file, e.g. of another machine, "
+            "that are missing in the worklog file. Only entries that have been "
+            "added to the other file since the last sync are read."
+        ),
+    )
+    sync_parser.add_argument(
+        "--with",
+        dest="peer",
+        required=True,
+        metavar="PATH",
+        help="Path of the worklog file to sync with.",
+    )
+
+
+def _add_export_parser(subparsers: argparse._SubParsersAction):
+    export_parser = subparsers.add_parser(
+        wc.SUBCMD_EXPORT,
+        description=(
+            "Exports the entries of the worklog file and the time intervals of "
+            "sessions and tasks derived from them for further analysis. "
+            "Writes the files events.<format> and intervals.<format>. "
+            "Timestamps are written in UTC, durations in seconds. "
+            "The formats parquet and arrow require the 'pyarrow' package."
+        ),
+    )
+    export_parser.add_argument(
+        "-o", "--output", required=True, help="Directory of the exported files.",
+    )
+    export_parser.add_argument(
+        "--format", choices=wc.EXPORT_FORMATS, default="csv", help="Export format.",
+    )
+    export_parser.add_argument(
+        "--date-from",
+        type=_combined_month_or_day_or_week_parser,
+        help=(
+            "Only export entries from this date on (inclusive). "
+            "Allowed input formats are YYYY-MM-DD, YYYY-MM and YYYY-WXX."
+        ),
+    )
+    export_parser.add_argument(
+        "--date-to",
+        type=_combined_month_or_day_or_week_parser,
+        help=(
+            "Only export entries before this date (exclusive). "
+            "Allowed input formats are YYYY-MM-DD, YYYY-MM and YYYY-WXX."
+        ),
+    )
+    export_parser.add_argument(
+        "--category",
+        choices=[wc.TOKEN_SESSION, wc.TOKEN_TASK],
+        help="Only export entries of this category.",
+    )
+
+
+def _add_completion_parser(subparsers: argparse._SubParsersAction):
+    completion_parser = subparsers.add_parser(
+        wc.SUBCMD_COMPLETION,
+        description=(
+            "Prints the shell completion script for the given shell. "
+            "Add the output to the startup file of the shell, "
+            "e.g. 'eval \"$(wl completion bash)\"' in ~/.bashrc."
+        ),
+    )
+    completion_parser.add_argument("shell", choices=["bash", "zsh", "fish"])
 
 
 def _combined_month_or_day_or_week_parser(value: str) -> datetime:
@@ -221,6 +559,48 @@ def _combined_month_or_day_or_week_parser(value: str) -> datetime:
     raise argparse.ArgumentTypeError(f"{value} is not a valid format")
 
 
+def _window_parser(value: str) -> Tuple[datetime, datetime]:
+    if ".." in value:
+        date_from, date_to = value.split("..", 1)
+        window = (
+            _combined_month_or_day_or_week_parser(date_from),
+            _combined_month_or_day_or_week_parser(date_to),
+        )
+    else:
+        start = _combined_month_or_day_or_week_parser(value)
+        if re.match(r"^\d{4}\-\d{2}$", value):
+            year, month = divmod(start.month, 12)
+            end = start.replace(year=start.year + year, month=month + 1)
+        elif re.match(r"^\d{4}-W\d{2}$", value):
+            end = start + timedelta(days=7)
+        else:
+            end = start + timedelta(days=1)
+        window = (start, end)
+    if window[0] >= window[1]:
+        raise argparse.ArgumentTypeError(f"{value} is an empty time window")
+    return window
+
+
+def _windows_file_parser(value: str) -> List[Tuple[datetime, datetime]]:
+    try:
+        with open(value, "r") as fh:
+            lines = [line.strip() for line in fh]
+    except OSError as err:
+        raise argparse.ArgumentTypeError(f"can't open '{value}': {err}")
+    windows = [
+        _window_parser(line) for line in lines if line and not line.startswith("#")
+    ]
+    if len(windows) == 0:
+        raise argparse.ArgumentTypeError(f"{value} does not contain any time window")
+    return windows
+
+
+def _year_parser(value: str) -> int:
+    if not re.match(r"^\d{4}$", value):
+        raise argparse.ArgumentTypeError(f"{value} is not in the format YYYY")
+    return int(value)
+
+
 def _year_month_parser(value: str) -> datetime:
     if not re.match(r"^\d{4}\-\d{2}$", value):
         raise argparse.ArgumentTypeError(f"{value} is not in the format YYYY-MM")
@@ -249,6 +629,13 @@ def _positive_int(value: str) -> int:
     return value_int
 
 
+def _positive_float(value: str) -> float:
+    value_float = float(value)
+    if value_float <= 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive float value.")
+    return value_float
+
+
 def _add_timeshift_args(parser: argparse.ArgumentParser):
     timeshift_grp = parser.add_mutually_exclusive_group()
     timeshift_grp.add_argument(
@@ -264,3 +651,32 @@ def _add_timeshift_args(parser: argparse.ArgumentParser):
     )
     timeshift_grp.add_argument("-t", "--time", help=_help_time_arg)
 
+
+def _add_breaks_arg(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--breaks",
+        choices=wc.BREAK_MODES,
+        default=None,
+        help=(
+            "How breaks are deducted from the working time: 'auto' deducts the "
+            "automatic break, 'actual' takes the gaps between sessions of a day "
+            "as breaks, 'max' deducts the automatic break only where the gaps "
+            "fall short of it. Defaults to 'workday.breaks' of the configuration."
+        ),
+    )
+
+
+def _add_task_id_args(
+    parser: argparse.ArgumentParser, help: str, nargs: Optional[str] = None
+):
+    action = parser.add_argument("id", type=str, nargs=nargs, help=help)
+    # Completed with the known task identifiers, see worklog.completion
+    action.complete_task_ids = True
+    parser.add_argument(
+        "--fuzzy",
+        action="store_true",
+        help=(
+            "Resolve the task identifier to a known task that starts with it, "
+            "contains it or is similar to it. Fails if several tasks match."
+        ),
+    )
@@ -0,0 +1,203 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+from datetime import date, datetime, timedelta
+from pandas import DataFrame  # type: ignore
+
+import worklog.constants as wc
+from worklog.utils.formatting import format_timedelta
+
+
+def _short_hours_str(value: str) -> str:
+    return value[: len("00:00")]
+
+
+def _sum_intervals(intervals: DataFrame) -> timedelta:
+    if intervals.shape[0] == 0:
+        return timedelta(0)
+    return intervals["interval"].sum()
+
+
+class StatusResult(NamedTuple):
+    """Working status of a single day as returned by `Log.get_status`."""
+
+    query_date: date
+    is_active: bool
+    total_time: timedelta
+    break_duration: timedelta
+    remaining_time: timedelta
+    overtime: timedelta
+    eow: datetime
+    percentage_done: int
+    percentage_remaining: int
+    percentage_overtime: int
+    touched_tasks: Dict[str, timedelta]
+    active_tasks: List[str]
+    # Gaps between the sessions of the day, None in 'auto' break mode
+    break_taken: Optional[timedelta] = None
+
+    def to_fmt_dict(self) -> Dict[str, Any]:
+        """
+        Returns all facts as strings, ready to be used with the custom format
+        string of `wl status --fmt`.
+        """
+        total_time = format_timedelta(self.total_time)
+        break_duration = format_timedelta(self.break_duration)
+        break_taken = format_timedelta(self.break_taken or timedelta(0))
+        remaining_time = format_timedelta(self.remaining_time)
+        overtime = format_timedelta(self.overtime)
+        eow = self.eow.strftime("%H:%M:%S")
+
+        return dict(
+            active_tasks=", ".join(self.active_tasks),
+            active_tasks_stats=f"({len(self.active_tasks)}) ["
+            + ", ".join(self.active_tasks)
+            + "]",
+            break_duration=break_duration,
+            break_duration_short=_short_hours_str(break_duration),
+            break_taken=break_taken,
+            break_taken_short=_short_hours_str(break_taken),
+            eow=eow,
+            eow_short=_short_hours_str(eow),
+            overtime=overtime,
+            overtime_short=_short_hours_str(overtime),
+            percentage_done=self.percentage_done,
+            percentage_overtime=self.percentage_overtime,
+            percentage_remaining=self.percentage_remaining,
+            remaining_time=remaining_time,
+            remaining_time_short=_short_hours_str(remaining_time),
+            total_time=total_time,
+            total_time_short=_short_hours_str(total_time),
+            touched_tasks=", ".join(self.touched_tasks.keys()),
+            touched_tasks_stats=f"({len(self.touched_tasks)}) ["
+            + ", ".join(
+                [f"{k} ({format_timedelta(v)})" for k, v in self.touched_tasks.items()]
+            )
+            + "]",
+            tracking_status="on" if self.is_active else "off",
+        )
+
+
+class ReportResult(NamedTuple):
+    """Aggregated working times as returned by `Log.get_report`."""
+
+    day: DataFrame
+    week: DataFrame
+    month: DataFrame
+    tasks: Optional[DataFrame]
+    auto_break: bool
+    # Daily coverage of the sessions by tasks, see `worklog.utils.sweep`
+    coverage: Optional[DataFrame] = None
+
+
+class WindowReportResult(NamedTuple):
+    """Report of a time window as returned by `Log.get_window_reports`."""
+
+    date_from: datetime
+    date_to: datetime
+    report: ReportResult
+
+
+class TeamReportResult(NamedTuple):
+    """
+    Merged reports of several logfiles as returned by `Log.get_team_report`.
+    `team` holds the aggregations of all persons together, `people` the
+    total times per person and `person_tasks` the task times per person.
+    """
+
+    team: ReportResult
+    people: DataFrame
+    person_tasks: Optional[DataFrame]
+
+
+class TaskReportResult(NamedTuple):
+    """Intervals of a single task as returned by `Log.get_task_report`."""
+
+    task_id: str
+    intervals: DataFrame
+    daily: DataFrame
+    total: timedelta
+
+
+class MultiTaskReportResult(NamedTuple):
+    """
+    Intervals of several tasks as returned by `Log.get_task_reports`.
+    `intervals` holds the intervals of all tasks with their identifier,
+    `daily` and `total` the time of all tasks together.
+    """
+
+    task_ids: List[str]
+    intervals: DataFrame
+    daily: DataFrame
+    total: timedelta
+
+    def per_task(self) -> List[TaskReportResult]:
+        """Split into the reports of the single tasks."""
+        groups = dict(list(self.intervals.groupby(wc.COL_TASK_IDENTIFIER)))
+        results = []
+        for task_id in self.task_ids:
+            intervals = groups.get(task_id, self.intervals.iloc[:0])
+            intervals = intervals.drop(columns=[wc.COL_TASK_IDENTIFIER])
+            results.append(
+                TaskReportResult(
+                    task_id=task_id,
+                    intervals=intervals.reset_index(drop=True),
+                    daily=intervals.groupby(by="date")[["interval"]].sum(),
+                    total=_sum_intervals(intervals),
+                )
+            )
+        return results
+
+
+class OverlapResult(NamedTuple):
+    """
+    Tasks running in parallel as returned by `Log.get_task_overlaps`.
+    `max_concurrency` is the highest number of tasks running at the same
+    time, `periods` holds the periods in which several tasks were running.
+    """
+
+    max_concurrency: int
+    overlap: timedelta
+    periods: DataFrame
+
+
+class MergeResult(NamedTuple):
+    """Outcome of merging logfiles, see `worklog.utils.merge.merge_logs`."""
+
+    records: int
+    duplicates: int
+    # Session entries that contradict the merged session state
+    conflicts: List[str]
+
+
+class SyncResult(NamedTuple):
+    """Outcome of `Log.sync`."""
+
+    # Records read from the logfile of the peer since the last sync
+    read: int
+    # Records appended to the logfile
+    records: int
+    duplicates: int
+    conflicts: List[str]
+
+
+class CompactResult(NamedTuple):
+    """Outcome of `Log.compact`."""
+
+    records: int
+    duplicates: int
+    reordered: bool
+
+
+class ExportResult(NamedTuple):
+    """Outcome of `Log.export`."""
+
+    events: int
+    intervals: int
+    # Paths of the exported events and intervals
+    fps: List[str]
+
+
+class ArchiveResult(NamedTuple):
+    """Outcome of `Log.archive`."""
+
+    years: List[int]
+    records: int
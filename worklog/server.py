@@ -0,0 +1,177 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs, unquote
+import json
+import logging
+import os
+import threading
+
+import worklog.constants as wc
+from worklog.log import Log
+from worklog.utils.formatting import to_json
+from worklog.errors import WorklogError
+
+# The server must never be reachable from other machines.
+HOST = "127.0.0.1"
+
+
+class QueryCache(object):
+    """
+    In-memory cache of query responses, keyed by endpoint, parameters and
+    the version of the logfile. The cache is cleared whenever the logfile
+    changes, in which case the appended records are ingested into the log.
+    At most `max_size` responses are kept, the least recently used ones are
+    dropped first.
+    """
+
+    def __init__(self, log: Log, max_size: int = 128) -> None:
+        self._log = log
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._max_size = max_size
+        self._version = self._get_version()
+
+    def _get_version(self) -> Tuple[int, int]:
+        stat = os.stat(self._log._log_fp)
+        return stat.st_size, stat.st_mtime_ns
+
+    def get(
+        self,
+        endpoint: str,
+        params: Dict[str, str],
+        fn: Callable,
+        cacheable: bool = True,
+    ) -> bytes:
+        with self._lock:
+            version = self._get_version()
+            if version != self._version:
+                self._log.refresh()
+                self._cache.clear()
+                self._version = version
+
+            if not cacheable:
+                return json.dumps(fn(), default=to_json).encode()
+
+            key = (endpoint, tuple(sorted(params.items())), version)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            response = json.dumps(fn(), default=to_json).encode()
+            self._cache[key] = response
+            if len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+            return response
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def _parse_date(value: str) -> datetime:
+    """Dates without UTC offset are in local time."""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=wc.LOCAL_TIMEZONE)
+    return dt
+
+
+def create_server(
+    log: Log,
+    port: int,
+    hours_target: float,
+    hours_max: float,
+    logger: Optional[logging.Logger] = None,
+) -> HTTPServer:
+    """
+    Creates a HTTP server that answers JSON queries against the log.
+    Supported endpoints:
+
+    - /status?date=YYYY-MM-DD
+    - /report?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD
+    - /tasks
+    - /tasks/<identifier>?fuzzy=1
+    """
+    logger = logger or logging.getLogger(wc.DEFAULT_LOGGER_NAME)
+    cache = QueryCache(log)
+
+    def status(params: Dict[str, str]):
+        query_date = _parse_date(params["date"]).date() if "date" in params else None
+        result = log.get_status(
+            hours_target, hours_max, query_date=query_date or date.today()
+        )
+        return result._asdict()
+
+    def report(params: Dict[str, str]):
+        result = log.get_report(
+            _parse_date(params["date_from"]), _parse_date(params["date_to"])
+        )
+        return result._asdict()
+
+    def tasks(params: Dict[str, str]):
+        return log.get_task_counts()
+
+    def task(params: Dict[str, str], task_id: str):
+        if params.get("fuzzy", "") in ("1", "true"):
+            task_id = log.resolve_task_id(task_id)
+        result = log.get_task_report(task_id)
+        return result._asdict()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            parts = [unquote(p) for p in url.path.strip("/").split("/", 1)]
+
+            if parts == ["status"]:
+                fn: Callable = status
+            elif parts == ["report"]:
+                fn = report
+            elif parts == ["tasks"]:
+                fn = tasks
+            elif len(parts) == 2 and parts[0] == "tasks":
+                fn = lambda params: task(params, parts[1])  # noqa: E731
+            else:
+                return self._respond(404, {"error": "Unknown endpoint"})
+
+            # The status of the current day depends on the current time.
+            cacheable = fn is not status or params.get("date", "") not in (
+                "",
+                date.today().isoformat(),
+            )
+            try:
+                body = cache.get(url.path, params, lambda: fn(params), cacheable)
+            except WorklogError as err:
+                return self._respond(404, {"error": str(err)})
+            except (KeyError, ValueError) as err:
+                return self._respond(400, {"error": f"Invalid parameter: {err}"})
+            self._send(200, body)
+
+        def _respond(self, code: int, payload: Dict[str, Any]):
+            self._send(code, json.dumps(payload).encode())
+
+        def _send(self, code: int, body: bytes):
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return _Server((HOST, port), Handler)
+
+
+def serve(log: Log, port: int, hours_target: float, hours_max: float) -> None:
+    """Run the query server until it is interrupted."""
+    server = create_server(log, port, hours_target, hours_max)
+    log.logger.info(f"Serving worklog on http://{HOST}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
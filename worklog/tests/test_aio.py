@@ -0,0 +1,144 @@
+import unittest
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+from worklog.aio import AsyncLog
+from worklog.errors import ActiveTasksError
+import worklog.constants as wc
+
+
+class TestAsyncLog(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog").as_posix()
+
+    def tearDown(self):
+        self.loop.close()
+        self.tmpdir.cleanup()
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_log_not_loaded(self):
+        alog = AsyncLog(self.fp)
+        with self.assertRaises(RuntimeError):
+            alog.log
+
+    def test_load_reads_logfile(self):
+        Path(self.fp).write_text(
+            "2020-01-01 08:00:00+00:00|2020-01-01 08:00:00+00:00|session|start|\n"
+        )
+
+        async def main():
+            alog = AsyncLog(self.fp)
+            await alog.load()
+            return alog.log._df
+
+        df = self._run(main())
+        self.assertIsNotNone(df)
+        self.assertEqual(df.shape[0], 1)
+
+    def test_commit_and_report(self):
+        async def main():
+            alog = AsyncLog(self.fp)
+            await alog.load()
+            await alog.commit(
+                wc.TOKEN_SESSION,
+                wc.TOKEN_START,
+                datetime(2020, 1, 1, 8, tzinfo=timezone.utc),
+            )
+            await alog.commit(
+                wc.TOKEN_SESSION,
+                wc.TOKEN_STOP,
+                datetime(2020, 1, 1, 9, tzinfo=timezone.utc),
+            )
+            return await alog.report(
+                datetime(2020, 1, 1, tzinfo=timezone.utc),
+                datetime(2020, 2, 1, tzinfo=timezone.utc),
+            )
+
+        result = self._run(main())
+        self.assertEqual(result.day["agg_time"].sum().total_seconds(), 3600)
+
+    def test_commit_raises(self):
+        async def main():
+            alog = AsyncLog(self.fp)
+            await alog.load()
+            dt = datetime(2020, 1, 1, 8, tzinfo=timezone.utc)
+            await alog.commit(wc.TOKEN_SESSION, wc.TOKEN_START, dt)
+            await alog.commit(wc.TOKEN_TASK, wc.TOKEN_START, dt, identifier="t1")
+            await alog.commit(wc.TOKEN_SESSION, wc.TOKEN_STOP, dt)
+
+        with self.assertRaises(ActiveTasksError):
+            self._run(main())
+
+    def test_follow_and_refresh(self):
+        async def main():
+            alog = AsyncLog(self.fp)
+            other = AsyncLog(self.fp)
+            await alog.load()
+            await other.load()
+
+            records = alog.follow(poll_interval=0.01, offset=0)
+            await other.commit(
+                wc.TOKEN_SESSION,
+                wc.TOKEN_START,
+                datetime(2020, 1, 1, 8, tzinfo=timezone.utc),
+            )
+            record = await records.__anext__()
+            await records.aclose()
+            new_records = await alog.refresh()
+            return record, new_records, alog.log._log_df.shape[0]
+
+        record, new_records, n = self._run(main())
+        self.assertEqual(record[wc.COL_CATEGORY], wc.TOKEN_SESSION)
+        self.assertEqual(new_records.shape[0], 1)
+        self.assertEqual(n, 1)
+
+    def test_follow_rewritten_file(self):
+        dt = datetime(2020, 1, 1, 8, tzinfo=timezone.utc)
+
+        async def main():
+            alog = AsyncLog(self.fp)
+            await alog.load()
+            await alog.commit(wc.TOKEN_SESSION, wc.TOKEN_START, dt)
+            offset = os.path.getsize(self.fp)
+            records = alog.follow(poll_interval=0.01, offset=offset)
+            await alog.commit(wc.TOKEN_SESSION, wc.TOKEN_STOP, dt)
+            first = await records.__anext__()
+            # Replaced by a file of at least the same size
+            await alog.refresh()
+            alog.log.compact()
+            second = await records.__anext__()
+            await records.aclose()
+            return first, second
+
+        first, second = self._run(main())
+        self.assertEqual(first[wc.COL_TYPE], wc.TOKEN_STOP)
+        self.assertEqual(second[wc.COL_TYPE], wc.TOKEN_START)
+
+    def test_queries_wait_for_commits(self):
+        async def main():
+            alog = AsyncLog(self.fp)
+            await alog.load()
+            dt = datetime(2020, 1, 1, 8, tzinfo=timezone.utc)
+            await alog.commit(wc.TOKEN_SESSION, wc.TOKEN_START, dt)
+            await alog.commit(wc.TOKEN_SESSION, wc.TOKEN_STOP, dt + timedelta(hours=1))
+            async with alog._lock:
+                query = asyncio.ensure_future(
+                    alog.report(
+                        datetime(2020, 1, 1, tzinfo=timezone.utc),
+                        datetime(2020, 2, 1, tzinfo=timezone.utc),
+                    )
+                )
+                await asyncio.sleep(0.05)
+                self.assertFalse(query.done())
+            return await query
+
+        result = self._run(main())
+        self.assertEqual(result.day["agg_time"].sum().total_seconds(), 3600)
@@ -1,7 +1,9 @@
 import unittest
 from datetime import timedelta
 
-from worklog.breaks import AutoBreak
+import pandas as pd
+
+from worklog.breaks import AutoBreak, parse_weekday_rules
 
 
 class TestBreaks(unittest.TestCase):
@@ -54,3 +56,54 @@ class TestBreaks(unittest.TestCase):
         actual = auto_break.get_duration(td).total_seconds() // 60
 
         self.assertEqual(expected, actual)
+
+
+class TestBreakDurations(unittest.TestCase):
+    def setUp(self):
+        minutes = [0, 5, 199, 200, 201, 359, 360, 361, 600, None]
+        self.totals = pd.Series(pd.to_timedelta(minutes, unit="m"), index=range(3, 13))
+        self.auto_break = AutoBreak(
+            [0, 200, 360], [15, 20, 45], weekday_rules={4: ([300], [10])}
+        )
+
+    def test_same_as_scalar(self):
+        actual = self.auto_break.get_durations(self.totals)
+        expected = [
+            self.auto_break.get_duration(td)
+            for td in self.totals.fillna(pd.Timedelta(0))
+        ]
+        self.assertEqual(actual.tolist(), expected)
+        self.assertEqual(actual.index.tolist(), self.totals.index.tolist())
+        self.assertEqual(actual.dtype, "m8[ns]")
+
+    def test_inactive(self):
+        actual = AutoBreak().get_durations(self.totals)
+        self.assertTrue((actual == timedelta(0)).all())
+
+    def test_weekday_rules(self):
+        weekdays = [4] * 5 + [0] * 5
+        actual = self.auto_break.get_durations(self.totals, weekdays=weekdays)
+        self.assertEqual(
+            [td.total_seconds() // 60 for td in actual],
+            [0, 0, 0, 0, 0, 20, 45, 45, 45, 15],
+        )
+        self.assertEqual(
+            self.auto_break.get_duration(self.totals.iloc[8], 4), timedelta(minutes=10)
+        )
+
+    def test_taken(self):
+        totals = pd.Series(pd.to_timedelta([400, 400, 400], unit="m"))
+        taken = pd.Series(pd.to_timedelta([0, 30, 60], unit="m"))
+        actual = AutoBreak([0, 360], [0, 45]).get_durations(totals, taken=taken)
+        self.assertEqual(
+            actual.tolist(),
+            [timedelta(minutes=45), timedelta(minutes=15), timedelta(0)],
+        )
+
+    def test_parse_weekday_rules(self):
+        rules = {"Fri": {"limits": [0], "durations": [15]}}
+        self.assertEqual(parse_weekday_rules(rules), {4: ([0], [15])})
+        with self.assertRaises(ValueError):
+            parse_weekday_rules({"friday": {"limits": [], "durations": []}})
+        with self.assertRaises(ValueError):
+            AutoBreak(weekday_rules={4: ([0, 1], [15])})
@@ -0,0 +1,77 @@
+import unittest
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from worklog.completion import get_candidates, get_script, get_task_ids
+from worklog.parser import get_arg_parser
+from worklog.utils.ids import get_ids_fp
+
+
+class TestCompletion(unittest.TestCase):
+    def setUp(self):
+        self.parser = get_arg_parser()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog").as_posix()
+        shutil.copy(
+            Path("worklog", "tests", "data", "report_with_tasks.csv").as_posix(),
+            self.fp,
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _complete(self, *words):
+        return get_candidates(self.parser, list(words), self.fp)
+
+    def test_subcommands(self):
+        self.assertIn("session", self._complete(""))
+        self.assertEqual(self._complete("ta"), ["task"])
+        self.assertEqual(self._complete("task", "st"), ["start", "stop"])
+
+    def test_options(self):
+        self.assertEqual(self._complete("task", "start", "--a"), ["--auto-stop"])
+        self.assertEqual(self._complete("status", "--fmt", "-"), [])
+
+    def test_choices(self):
+        self.assertEqual(
+            self._complete("task", "list", "--sort", ""),
+            ["name", "count", "recent", "time"],
+        )
+        self.assertEqual(self._complete("completion", "f"), ["fish"])
+
+    def test_task_ids(self):
+        self.assertEqual(self._complete("task", "start", ""), ["task2", "task1"])
+        self.assertEqual(self._complete("task", "report", "task1"), ["task1"])
+        self.assertEqual(
+            self._complete("task", "stop", "-t", "10:00", "task"), ["task2", "task1"]
+        )
+        self.assertTrue(Path(get_ids_fp(self.fp)).exists())
+
+    def test_task_ids_from_index(self):
+        get_task_ids(self.fp)
+        with patch("worklog.completion.build_index") as mock_build:
+            self.assertEqual(get_task_ids(self.fp, "task2"), ["task2"])
+        mock_build.assert_not_called()
+
+    def test_task_ids_without_logfile(self):
+        self.assertEqual(get_task_ids(Path(self.tmpdir.name, "missing").as_posix()), [])
+
+    def test_unknown_subcommand(self):
+        self.assertEqual(self._complete("foo", ""), [])
+
+    def test_no_pandas_import(self):
+        get_task_ids(self.fp)
+        code = (
+            "import sys; import worklog; from worklog.completion import get_task_ids; "
+            f"get_task_ids({self.fp!r}); sys.exit('pandas' in sys.modules)"
+        )
+        self.assertEqual(subprocess.run([sys.executable, "-c", code]).returncode, 0)
+
+    def test_scripts(self):
+        for shell in ["bash", "zsh", "fish"]:
+            script = get_script(shell)
+            self.assertIn("wl __complete", script)
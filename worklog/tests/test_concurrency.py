@@ -0,0 +1,64 @@
+import unittest
+import tempfile
+from multiprocessing import Process
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+from worklog.log import Log
+import worklog.constants as wc
+
+
+def _writer(fp: str, writer_id: int, commits: int) -> None:
+    # Same workload as benchmarks/concurrent_writers.py
+    log = Log(fp)
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    for i in range(commits):
+        identifier = f"w{writer_id}-{i}"
+        log_dt = start + timedelta(seconds=i)
+        log.append(wc.TOKEN_TASK, wc.TOKEN_START, log_dt, identifier=identifier)
+        log.append(wc.TOKEN_TASK, wc.TOKEN_STOP, log_dt, identifier=identifier)
+
+
+class TestConcurrentWriters(unittest.TestCase):
+    def test_no_record_lost(self):
+        writers, commits = 4, 10
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog").as_posix()
+            Path(fp).touch()
+
+            processes = [
+                Process(target=_writer, args=(fp, w, commits)) for w in range(writers)
+            ]
+            for p in processes:
+                p.start()
+            for p in processes:
+                p.join()
+
+            with open(fp, "r") as fh:
+                lines = fh.read().splitlines()
+
+            df = Log(fp)._log_df
+            state = Log(fp).get_active_state()
+
+        self.assertEqual(len(lines), writers * commits * 2)
+        self.assertTrue(all(len(line.split("|")) == 5 for line in lines))
+        self.assertEqual(df.shape[0], writers * commits * 2)
+        self.assertEqual(df[wc.COL_TASK_IDENTIFIER].nunique(), writers * commits)
+        self.assertEqual(state.tasks, {})
+
+    def test_stale_instance_revalidates(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog").as_posix()
+            log_dt = datetime(2020, 1, 1, 8, tzinfo=timezone.utc)
+
+            stale = Log(fp)
+            stale.append(wc.TOKEN_SESSION, wc.TOKEN_START, log_dt)
+            stale._log_df  # read log into memory
+
+            other = Log(fp)
+            other.append(wc.TOKEN_TASK, wc.TOKEN_START, log_dt, identifier="task1")
+
+            stale.append(wc.TOKEN_SESSION, wc.TOKEN_STOP, log_dt, force=True)
+
+            self.assertEqual(stale._log_df.shape[0], 4)
+            self.assertEqual(Log(fp)._log_df.shape[0], 4)
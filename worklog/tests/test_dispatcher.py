@@ -1,10 +1,23 @@
 import unittest
 from unittest.mock import patch
 from argparse import ArgumentError, Namespace
+from io import StringIO
 from datetime import datetime, timezone, timedelta, date
 
 import worklog.constants as wc
-from worklog.dispatcher import dispatch
+from worklog.dispatcher import dispatch, get_columns
+from worklog.errors import (
+    AmbiguousTaskError,
+    ArchiveOpenEntriesError,
+    ExportDependencyError,
+)
+from worklog.results import (
+    ArchiveResult,
+    CompactResult,
+    ExportResult,
+    MergeResult,
+    SyncResult,
+)
 
 
 @patch("configparser.ConfigParser")
@@ -87,6 +100,7 @@ class TestDispatchTask(unittest.TestCase):
             offset_minutes=0,
             time=None,
             id="foobar",
+            fuzzy=False,
         )
         dispatch(mock_log, mock_parser, ns, mock_cfg)
 
@@ -104,6 +118,7 @@ class TestDispatchTask(unittest.TestCase):
             offset_minutes=0,
             time=None,
             id="foobar",
+            fuzzy=False,
         )
         dispatch(mock_log, mock_parser, ns, mock_cfg)
 
@@ -124,6 +139,7 @@ class TestDispatchTask(unittest.TestCase):
             offset_minutes=0,
             time=None,
             id="foobar",
+            fuzzy=False,
         )
         dispatch(mock_log, mock_parser, ns, mock_cfg)
 
@@ -134,17 +150,106 @@ class TestDispatchTask(unittest.TestCase):
 
     def test_list_tasks(self, mock_log, mock_parser, mock_cfg):
         """It should be possible to list tasks."""
-        ns = Namespace(subcmd="task", type="list")
+        ns = Namespace(subcmd="task", type="list", sort="name", limit=None)
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.list_tasks.assert_called_once_with(sort="name", limit=None)
+
+    def test_list_tasks_sorted(self, mock_log, mock_parser, mock_cfg):
+        """Tasks can be listed by most recent use."""
+        ns = Namespace(subcmd="task", type="list", sort="recent", limit=5)
         dispatch(mock_log, mock_parser, ns, mock_cfg)
 
-        mock_log.list_tasks.assert_called_once()
+        mock_log.list_tasks.assert_called_once_with(sort="recent", limit=5)
+
+    def _report_ns(self, id, fuzzy=False, **kwargs):
+        args = dict(
+            regex=False, date_from=None, date_to=None, combined=False, format="text"
+        )
+        args.update(kwargs)
+        return Namespace(subcmd="task", type="report", id=id, fuzzy=fuzzy, **args)
 
     def test_report_task_by_id(self, mock_log, mock_parser, mock_cfg):
         """It should be possible to report infos about a single task id."""
-        ns = Namespace(subcmd="task", type="report", id="foobar")
+        ns = self._report_ns(["foobar"])
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.resolve_task_id.assert_not_called()
+        mock_log.task_report.assert_called_once_with(
+            ["foobar"],
+            regex=False,
+            date_from=None,
+            date_to=None,
+            combined=False,
+            fmt="text",
+        )
+
+    def test_report_tasks_by_pattern(self, mock_log, mock_parser, mock_cfg):
+        """Several task ids and patterns can be reported at once."""
+        date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        ns = self._report_ns(
+            ["foo*", "bar"], date_from=date_from, combined=True, format="json"
+        )
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.task_report.assert_called_once_with(
+            ["foo*", "bar"],
+            regex=False,
+            date_from=date_from,
+            date_to=None,
+            combined=True,
+            fmt="json",
+        )
+
+    def test_task_tree(self, mock_log, mock_parser, mock_cfg):
+        """It should be possible to show the task hierarchy."""
+        ns = Namespace(
+            subcmd="task", type="tree", date_from=None, date_to=None, depth=2
+        )
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.task_tree.assert_called_once_with(None, None, depth=2)
+
+    def test_task_overlaps(self, mock_log, mock_parser, mock_cfg):
+        """It should be possible to show tasks running in parallel."""
+        date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        ns = Namespace(
+            subcmd="task", type="overlaps", date_from=date_from, date_to=None
+        )
         dispatch(mock_log, mock_parser, ns, mock_cfg)
 
-        mock_log.task_report.assert_called_once_with("foobar")
+        mock_log.task_overlaps.assert_called_once_with(date_from, None)
+
+    def test_report_task_fuzzy(self, mock_log, mock_parser, mock_cfg):
+        """Partial task identifiers are resolved with --fuzzy."""
+        ns = self._report_ns(["foo"], fuzzy=True)
+        mock_log.resolve_task_id.return_value = "foobar"
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.resolve_task_id.assert_called_once_with("foo")
+        self.assertEqual(mock_log.task_report.call_args[0][0], ["foobar"])
+
+    def test_stop_fuzzy_ambiguous(self, mock_log, mock_parser, mock_cfg):
+        """Ambiguous task identifiers are reported on STDERR."""
+        ns = Namespace(
+            subcmd="task",
+            type="stop",
+            auto_stop=False,
+            offset_minutes=0,
+            time=None,
+            id="foo",
+            fuzzy=True,
+        )
+        mock_log.resolve_task_id.side_effect = AmbiguousTaskError(
+            "foo", ["foobar", "foobaz"]
+        )
+        with patch("sys.stderr", new_callable=StringIO) as mock_err:
+            with self.assertRaises(SystemExit) as ctx:
+                dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        self.assertEqual(ctx.exception.code, 1)
+        self.assertIn("foobar, foobaz", mock_err.getvalue())
+        mock_log.commit.assert_not_called()
 
 
 @patch("configparser.ConfigParser")
@@ -152,10 +257,10 @@ class TestDispatchTask(unittest.TestCase):
 @patch("worklog.log")
 class TestDispatchDoctor(unittest.TestCase):
     def test_doctor(self, mock_log, mock_parser, mock_cfg):
-        ns = Namespace(subcmd="doctor")
+        ns = Namespace(subcmd="doctor", full=False)
         dispatch(mock_log, mock_parser, ns, mock_cfg)
 
-        mock_log.doctor.assert_called_once()
+        mock_log.doctor.assert_called_once_with(full=False)
 
 
 @patch("configparser.ConfigParser")
@@ -165,10 +270,171 @@ class TestDispatchReport(unittest.TestCase):
     def test_report(self, mock_log, mock_parser, mock_cfg):
         date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
         date_to = datetime(2020, 1, 2, tzinfo=timezone.utc)
-        ns = Namespace(subcmd="report", date_from=date_from, date_to=date_to)
+        ns = Namespace(
+            subcmd="report",
+            date_from=date_from,
+            date_to=date_to,
+            task_depth=None,
+            logs=None,
+            processes=None,
+            format="text",
+            window=None,
+            windows=None,
+            breaks=None,
+            coverage=False,
+            split_overlap=False,
+        )
         dispatch(mock_log, mock_parser, ns, mock_cfg)
 
-        mock_log.report.assert_called_once_with(date_from, date_to)
+        mock_log.report.assert_called_once_with(
+            date_from, date_to, task_depth=None, fmt="text", coverage=False
+        )
+
+    def test_report_task_depth(self, mock_log, mock_parser, mock_cfg):
+        date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        date_to = datetime(2020, 1, 2, tzinfo=timezone.utc)
+        ns = Namespace(
+            subcmd="report",
+            date_from=date_from,
+            date_to=date_to,
+            task_depth=2,
+            logs=None,
+            processes=None,
+            format="text",
+            window=None,
+            windows=None,
+            breaks=None,
+            coverage=False,
+            split_overlap=False,
+        )
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.report.assert_called_once_with(
+            date_from, date_to, task_depth=2, fmt="text", coverage=False
+        )
+
+    def test_team_report(self, mock_log, mock_parser, mock_cfg):
+        date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        date_to = datetime(2020, 1, 2, tzinfo=timezone.utc)
+        ns = Namespace(
+            subcmd="report",
+            date_from=date_from,
+            date_to=date_to,
+            task_depth=None,
+            logs="team/",
+            processes=4,
+            format="json",
+            window=None,
+            windows=None,
+            breaks=None,
+            coverage=False,
+            split_overlap=False,
+        )
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.report.assert_not_called()
+        mock_log.team_report.assert_called_once_with(
+            "team/", date_from, date_to, task_depth=None, processes=4, fmt="json"
+        )
+
+    def test_window_report(self, mock_log, mock_parser, mock_cfg):
+        date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        windows = [(date_from, datetime(2020, 2, 1, tzinfo=timezone.utc))]
+        ns = Namespace(
+            subcmd="report",
+            date_from=None,
+            date_to=None,
+            task_depth=None,
+            logs=None,
+            processes=None,
+            format="csv",
+            window=None,
+            windows=windows,
+            breaks=None,
+            coverage=False,
+            split_overlap=False,
+        )
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.report.assert_not_called()
+        mock_log.window_report.assert_called_once_with(
+            windows, task_depth=None, fmt="csv", coverage=False
+        )
+
+    def test_report_coverage(self, mock_log, mock_parser, mock_cfg):
+        date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        date_to = datetime(2020, 1, 2, tzinfo=timezone.utc)
+        ns = Namespace(
+            subcmd="report",
+            date_from=date_from,
+            date_to=date_to,
+            task_depth=None,
+            logs=None,
+            processes=None,
+            format="text",
+            window=None,
+            windows=None,
+            breaks=None,
+            coverage=True,
+            split_overlap=False,
+        )
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.report.assert_called_once_with(
+            date_from, date_to, task_depth=None, fmt="text", coverage=True
+        )
+
+        mock_parser.error.side_effect = SystemExit(2)
+        ns.logs = "team/"
+        with self.assertRaises(SystemExit):
+            dispatch(mock_log, mock_parser, ns, mock_cfg)
+        mock_log.team_report.assert_not_called()
+
+    def test_report_split_overlap(self, mock_log, mock_parser, mock_cfg):
+        date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        date_to = datetime(2020, 1, 2, tzinfo=timezone.utc)
+        ns = Namespace(
+            subcmd="report",
+            date_from=date_from,
+            date_to=date_to,
+            task_depth=None,
+            logs=None,
+            processes=None,
+            format="text",
+            window=None,
+            windows=None,
+            breaks=None,
+            coverage=False,
+            split_overlap=True,
+        )
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        self.assertTrue(mock_log.split_overlap)
+        mock_log.report.assert_called_once()
+
+    def test_report_breaks(self, mock_log, mock_parser, mock_cfg):
+        date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        date_to = datetime(2020, 1, 2, tzinfo=timezone.utc)
+        ns = Namespace(
+            subcmd="report",
+            date_from=date_from,
+            date_to=date_to,
+            task_depth=None,
+            logs=None,
+            processes=None,
+            format="text",
+            window=None,
+            windows=None,
+            breaks="max",
+            coverage=False,
+            split_overlap=False,
+        )
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        self.assertEqual(mock_log.break_mode, "max")
+        mock_log.report.assert_called_once_with(
+            date_from, date_to, task_depth=None, fmt="text", coverage=False
+        )
 
 
 @patch("configparser.ConfigParser")
@@ -177,7 +443,14 @@ class TestDispatchReport(unittest.TestCase):
 class TestDispatchStatus(unittest.TestCase):
     def test_status(self, mock_log, mock_parser, mock_cfg):
         mock_cfg.get.side_effect = ["8.0", "10.0"]
-        ns = Namespace(subcmd="status", fmt=None, yesterday=False, date=None)
+        ns = Namespace(
+            subcmd="status",
+            fmt=None,
+            yesterday=False,
+            date=None,
+            watch=None,
+            breaks=None,
+        )
         dispatch(mock_log, mock_parser, ns, mock_cfg)
 
         expected_query_date = datetime.today().date()
@@ -188,7 +461,14 @@ class TestDispatchStatus(unittest.TestCase):
 
     def test_status_yesterday(self, mock_log, mock_parser, mock_cfg):
         mock_cfg.get.side_effect = ["8.0", "10.0"]
-        ns = Namespace(subcmd="status", fmt=None, yesterday=True, date=None)
+        ns = Namespace(
+            subcmd="status",
+            fmt=None,
+            yesterday=True,
+            date=None,
+            watch=None,
+            breaks=None,
+        )
         dispatch(mock_log, mock_parser, ns, mock_cfg)
 
         expected_query_date = datetime.today().date() - timedelta(days=1)
@@ -204,6 +484,8 @@ class TestDispatchStatus(unittest.TestCase):
             fmt=None,
             yesterday=False,
             date=datetime(2020, 1, 1, tzinfo=timezone.utc),
+            watch=None,
+            breaks=None,
         )
         dispatch(mock_log, mock_parser, ns, mock_cfg)
 
@@ -213,6 +495,38 @@ class TestDispatchStatus(unittest.TestCase):
             8.0, 10.0, fmt=None, query_date=expected_query_date
         )
 
+    def test_status_breaks(self, mock_log, mock_parser, mock_cfg):
+        mock_cfg.get.side_effect = ["8.0", "10.0"]
+        ns = Namespace(
+            subcmd="status",
+            fmt=None,
+            yesterday=False,
+            date=None,
+            watch=None,
+            breaks="actual",
+        )
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        self.assertEqual(mock_log.break_mode, "actual")
+        mock_log.status.assert_called_once()
+
+    def test_status_watch(self, mock_log, mock_parser, mock_cfg):
+        mock_cfg.get.side_effect = ["8.0", "10.0"]
+        ns = Namespace(
+            subcmd="status",
+            fmt="{total_time}",
+            yesterday=False,
+            date=None,
+            watch=2.0,
+            breaks=None,
+        )
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.status.assert_not_called()
+        mock_log.watch_status.assert_called_once_with(
+            8.0, 10.0, query_date=None, fmt="{total_time}", interval=2.0
+        )
+
 
 @patch("configparser.ConfigParser")
 @patch("argparse.ArgumentParser")
@@ -241,3 +555,128 @@ class TestDispatchLog(unittest.TestCase):
         dispatch(mock_log, mock_parser, ns, mock_cfg)
 
         mock_log.log.assert_called_once_with(20, True, None)
+
+
+@patch("configparser.ConfigParser")
+@patch("argparse.ArgumentParser")
+@patch("worklog.log")
+class TestDispatchServe(unittest.TestCase):
+    @patch("worklog.dispatcher.serve")
+    def test_serve(self, mock_serve, mock_log, mock_parser, mock_cfg):
+        mock_cfg.get.side_effect = ["8.0", "10.0"]
+        ns = Namespace(subcmd="serve", port=1234)
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_serve.assert_called_once_with(mock_log, 1234, 8.0, 10.0)
+
+
+@patch("configparser.ConfigParser")
+@patch("argparse.ArgumentParser")
+@patch("worklog.log")
+class TestDispatchCompact(unittest.TestCase):
+    def test_compact(self, mock_log, mock_parser, mock_cfg):
+        mock_log.compact.return_value = CompactResult(10, 2, True)
+        ns = Namespace(subcmd="compact")
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.compact.assert_called_once_with()
+
+
+@patch("configparser.ConfigParser")
+@patch("argparse.ArgumentParser")
+@patch("worklog.log")
+class TestDispatchArchive(unittest.TestCase):
+    def test_archive(self, mock_log, mock_parser, mock_cfg):
+        mock_log.archive.return_value = ArchiveResult([2018, 2019], 100)
+        ns = Namespace(subcmd="archive", before=2020)
+        dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.archive.assert_called_once_with(2020)
+
+    @patch("sys.stderr")
+    def test_archive_open_entries(self, mock_err, mock_log, mock_parser, mock_cfg):
+        mock_log.archive.side_effect = ArchiveOpenEntriesError(2020)
+        ns = Namespace(subcmd="archive", before=2020)
+        with self.assertRaises(SystemExit) as ctx:
+            dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        self.assertEqual(ctx.exception.code, 1)
+
+
+@patch("configparser.ConfigParser")
+@patch("argparse.ArgumentParser")
+@patch("worklog.log")
+class TestDispatchMerge(unittest.TestCase):
+    @patch("worklog.dispatcher.merge_logs")
+    def test_merge(self, mock_merge, mock_log, mock_parser, mock_cfg):
+        mock_merge.return_value = MergeResult(10, 2, ["conflict"])
+        ns = Namespace(subcmd="merge", logs=["a", "b"], output="out")
+        with patch("sys.stdout", new_callable=StringIO) as mock_out:
+            with patch("sys.stderr", new_callable=StringIO) as mock_err:
+                dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_merge.assert_called_once_with(["a", "b"], "out")
+        self.assertIn("10 entries, 2 duplicates removed", mock_out.getvalue())
+        self.assertEqual(mock_err.getvalue(), "Conflict: conflict\n")
+
+    def test_sync(self, mock_log, mock_parser, mock_cfg):
+        mock_log.sync.return_value = SyncResult(8, 4, 4, [])
+        ns = Namespace(subcmd="sync", peer="peer")
+        with patch("sys.stdout", new_callable=StringIO) as mock_out:
+            dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.sync.assert_called_once_with("peer")
+        self.assertIn("4 added, 4 duplicates skipped", mock_out.getvalue())
+
+
+
+@patch("configparser.ConfigParser")
+@patch("argparse.ArgumentParser")
+@patch("worklog.log")
+class TestDispatchExport(unittest.TestCase):
+    def _get_namespace(self, **kwargs):
+        args = dict(
+            subcmd="export",
+            output="out",
+            format="csv",
+            date_from=None,
+            date_to=None,
+            category=None,
+        )
+        args.update(kwargs)
+        return Namespace(**args)
+
+    def test_export(self, mock_log, mock_parser, mock_cfg):
+        mock_log.export.return_value = ExportResult(8, 4, ["a.csv", "b.csv"])
+        ns = self._get_namespace(category="task")
+        with patch("sys.stdout", new_callable=StringIO) as mock_out:
+            dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        mock_log.export.assert_called_once_with(
+            "out", fmt="csv", date_from=None, date_to=None, categories=["task"]
+        )
+        self.assertEqual(
+            mock_out.getvalue(), "Exported 8 entries and 4 intervals to a.csv, b.csv\n"
+        )
+
+    def test_export_missing_dependency(self, mock_log, mock_parser, mock_cfg):
+        mock_log.export.side_effect = ExportDependencyError("parquet", "pyarrow")
+        ns = self._get_namespace(format="parquet")
+        with patch("sys.stderr", new_callable=StringIO) as mock_err:
+            with self.assertRaises(SystemExit) as ctx:
+                dispatch(mock_log, mock_parser, ns, mock_cfg)
+
+        self.assertEqual(ctx.exception.code, 1)
+        self.assertIn("pyarrow", mock_err.getvalue())
+
+
+class TestGetColumns(unittest.TestCase):
+    def test_task_list(self):
+        ns = Namespace(subcmd="task", type="list")
+        self.assertEqual(
+            get_columns(ns), [wc.COL_CATEGORY, wc.COL_TASK_IDENTIFIER],
+        )
+
+    def test_all_columns(self):
+        ns = Namespace(subcmd="serve", port=1234)
+        self.assertIsNone(get_columns(ns))
@@ -1,16 +1,30 @@
+import json
 import unittest
 import pytest
 from unittest.mock import patch, Mock, call
 import tempfile
 from pathlib import Path
 import os
+import shutil
 import logging
-from datetime import datetime, timezone, date
+from datetime import datetime, timezone, date, timedelta
 import snapshottest
+import pandas as pd  # type: ignore
 
 from worklog.breaks import AutoBreak
 from worklog.log import Log
-from worklog.errors import ErrMsg
+from worklog.utils.tree import iter_tree
+from worklog.utils.lock import atomic_write
+from worklog.utils.recovery import write_journal
+from worklog.errors import (
+    ErrMsg,
+    EmptyLogError,
+    EmptyLogDateError,
+    UnknownTaskError,
+    AmbiguousTaskError,
+    ActiveTasksError,
+    ArchiveOpenEntriesError,
+)
 import worklog.constants as wc
 
 
@@ -18,6 +32,12 @@ class TestDataMixin(object):
     def _get_testdata_fp(self, name):
         return Path("worklog", "tests", "data", f"{name}.csv").absolute().as_posix()
 
+    def _copy_testdata_fp(self, name, tmpdir):
+        """Copy of a test file, for tests that create sidecar files."""
+        fp = Path(tmpdir, f"{name}.csv").as_posix()
+        shutil.copy(self._get_testdata_fp(name), fp)
+        return fp
+
 
 class CapSysMixin(object):
     @pytest.fixture(autouse=True)
@@ -209,9 +229,10 @@ class TestListTasks(unittest.TestCase, TestDataMixin):
         self._capsys = capsys
 
     def test_list_tasks(self):
-        fp = self._get_testdata_fp("tasks_multiple_nested")
-        instance = Log(fp)
-        instance.list_tasks()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = self._copy_testdata_fp("tasks_multiple_nested", tmpdir)
+            instance = Log(fp)
+            instance.list_tasks()
 
         out, err = self._capsys.readouterr()
         expected = """These tasks are listed in the log:
@@ -221,6 +242,480 @@ task3 (2)
 """
         assert out == expected
 
+    def test_list_tasks_sorted_and_limited(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = self._copy_testdata_fp("report_with_tasks", tmpdir)
+            instance = Log(fp)
+            self._capsys.readouterr()
+            instance.list_tasks(sort="recent", limit=1)
+
+        out, err = self._capsys.readouterr()
+        assert out == "These tasks are listed in the log:\ntask2 (4)\n"
+
+    def test_index_is_updated_on_append(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = self._copy_testdata_fp("tasks_multiple_nested", tmpdir)
+            instance = Log(fp)
+            instance.get_task_counts()
+            self.assertTrue(Path(f"{fp}.ids").exists())
+
+            log_dt = instance._log_df[wc.COL_LOG_DATETIME].max() + timedelta(hours=1)
+            with patch("worklog.log.build_index") as mock_build:
+                instance.append(wc.TOKEN_TASK, wc.TOKEN_START, log_dt, "task4")
+                counts = Log(fp).get_task_counts()
+            mock_build.assert_not_called()
+            self.assertEqual(counts, {"task1": 2, "task2": 2, "task3": 2, "task4": 1})
+
+
+class TestResolveTaskId(unittest.TestCase):
+    task_ids = ["PROJ-1234-refactor-xyz", "PROJ-1235-fix-login", "orga-mails"]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog")
+        lines = []
+        for i, task_id in enumerate(self.task_ids):
+            for type_, minute in [("start", 0), ("stop", 30)]:
+                log_dt = f"2020-01-01 {8 + i:02}:{minute:02}:00+00:00"
+                lines.append(f"{log_dt}|{log_dt}|task|{type_}|{task_id}")
+        self.fp.write_text("\n".join(lines) + "\n")
+        self.instance = Log(self.fp)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_known(self):
+        self.assertEqual(self.instance.resolve_task_id("orga-mails"), "orga-mails")
+        self.assertEqual(self.instance.resolve_task_id("orga"), "orga-mails")
+
+    def test_unique(self):
+        self.assertEqual(
+            self.instance.resolve_task_id("proj-1234"), "PROJ-1234-refactor-xyz"
+        )
+        self.assertEqual(self.instance.resolve_task_id("login"), "PROJ-1235-fix-login")
+        self.assertEqual(self.instance.resolve_task_id("orga-mail"), "orga-mails")
+
+    def test_ambiguous(self):
+        with self.assertRaises(AmbiguousTaskError) as ctx:
+            self.instance.resolve_task_id("PROJ-123")
+        # Most recently used first
+        self.assertEqual(
+            ctx.exception.candidates, ["PROJ-1235-fix-login", "PROJ-1234-refactor-xyz"]
+        )
+
+    def test_unknown(self):
+        with self.assertRaises(UnknownTaskError):
+            self.instance.resolve_task_id("unrelated")
+
+    def test_index_is_persisted(self):
+        self.instance.resolve_task_id("orga-mail")
+        self.assertTrue(Path(self.tmpdir.name, "worklog.trigrams").exists())
+
+        with patch("worklog.log.write_trigrams") as mock_write:
+            resolved = Log(self.fp).resolve_task_id("login")
+        mock_write.assert_not_called()
+        self.assertEqual(resolved, "PROJ-1235-fix-login")
+
+    def test_index_is_updated_on_commit(self):
+        self.instance.resolve_task_id("orga-mail")
+        self.instance.append(
+            wc.TOKEN_TASK,
+            wc.TOKEN_START,
+            datetime(2020, 1, 1, 12, tzinfo=timezone.utc),
+            "orga-meeting",
+        )
+        with patch("worklog.log.write_trigrams") as mock_write:
+            with self.assertRaises(AmbiguousTaskError):
+                Log(self.fp).resolve_task_id("orga-m")
+            self.assertEqual(Log(self.fp).resolve_task_id("meeting"), "orga-meeting")
+        mock_write.assert_not_called()
+
+    def test_index_is_rebuilt_after_external_append(self):
+        self.instance.resolve_task_id("orga-mail")
+        with open(self.fp, "a") as fh:
+            fh.write(
+                "2020-01-02 08:00:00+00:00|2020-01-02 08:00:00+00:00|"
+                "task|start|orga-meeting\n"
+            )
+        self.assertEqual(Log(self.fp).resolve_task_id("meeting"), "orga-meeting")
+
+
+class TestTaskTree(unittest.TestCase):
+    # (day, task identifier, hours)
+    entries = [
+        ("2019-12-30", "acme/web/ticket-1", 1),
+        ("2020-01-02", "acme/web/ticket-1", 2),
+        ("2020-01-02", "acme/app/ticket-2", 3),
+        ("2020-02-03", "acme/web/ticket-3", 1),
+        ("2020-02-03", "orga", 1),
+    ]
+
+    @pytest.fixture(autouse=True)
+    def capsys(self, capsys):
+        self._capsys = capsys
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog")
+        lines = []
+        for day, task_id, hours in self.entries:
+            start = f"{day} 08:00:00+00:00"
+            stop = f"{day} {8 + hours:02}:00:00+00:00"
+            lines += [
+                f"{start}|{start}|session|start|",
+                f"{start}|{start}|task|start|{task_id}",
+                f"{stop}|{stop}|task|stop|{task_id}",
+                f"{stop}|{stop}|session|stop|",
+            ]
+        self.fp.write_text("\n".join(lines) + "\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _totals(self, tree):
+        return {node.path: node.total for _, node in iter_tree(tree)}
+
+    def test_tree(self):
+        tree = Log(self.fp).get_task_tree()
+        totals = self._totals(tree)
+        self.assertEqual(tree.total, timedelta(hours=8))
+        self.assertEqual(totals["acme"], timedelta(hours=7))
+        self.assertEqual(totals["acme/web"], timedelta(hours=4))
+        self.assertEqual(totals["acme/web/ticket-1"], timedelta(hours=3))
+        self.assertEqual(totals["orga"], timedelta(hours=1))
+
+    def test_tree_window(self):
+        tree = Log(self.fp).get_task_tree(
+            date_from=datetime(2020, 1, 1, tzinfo=timezone.utc),
+            date_to=datetime(2020, 2, 1, tzinfo=timezone.utc),
+        )
+        self.assertEqual(
+            self._totals(tree),
+            {
+                "acme": timedelta(hours=5),
+                "acme/app": timedelta(hours=3),
+                "acme/app/ticket-2": timedelta(hours=3),
+                "acme/web": timedelta(hours=2),
+                "acme/web/ticket-1": timedelta(hours=2),
+            },
+        )
+
+    def test_tree_with_archive(self):
+        before = self._totals(Log(self.fp).get_task_tree())
+        Log(self.fp).archive(2020)
+        self.assertEqual(self._totals(Log(self.fp).get_task_tree()), before)
+
+    def test_report_task_depth(self):
+        result = Log(self.fp).get_report(
+            datetime(2019, 12, 1, tzinfo=timezone.utc),
+            datetime(2020, 3, 1, tzinfo=timezone.utc),
+            task_depth=2,
+        )
+        self.assertEqual(
+            result.tasks.set_index(wc.COL_TASK_IDENTIFIER)["agg_time"].to_dict(),
+            {
+                "acme/app": timedelta(hours=3),
+                "acme/web": timedelta(hours=4),
+                "orga": timedelta(hours=1),
+            },
+        )
+
+    def test_print_tree(self):
+        Log(self.fp).task_tree(depth=2)
+        out, _ = self._capsys.readouterr()
+        self.assertEqual(
+            out,
+            "Task tree:\n"
+            "----------\n"
+            "acme   07:00:00\n"
+            "  app  03:00:00\n"
+            "  web  04:00:00\n"
+            "orga   01:00:00\n",
+        )
+
+
+class TestTaskOverlaps(unittest.TestCase, TestDataMixin, CapSysMixin):
+    jan, feb, mar = [datetime(2020, m, 1, tzinfo=timezone.utc) for m in (1, 2, 3)]
+
+    def setUp(self):
+        # task1 and task2 are running in parallel on two days
+        self.fp = self._get_testdata_fp("report_with_tasks")
+
+    def test_overlaps(self):
+        result = Log(self.fp).get_task_overlaps()
+        self.assertEqual(result.max_concurrency, 2)
+        self.assertEqual(result.overlap, timedelta(hours=9, minutes=30))
+        self.assertEqual(result.periods["tasks"].tolist(), ["task1, task2"] * 2)
+
+        result = Log(self.fp).get_task_overlaps(date_from=self.feb)
+        self.assertEqual(result.periods.shape[0], 1)
+
+    def test_split_overlap(self):
+        instance = Log(self.fp)
+        instance.split_overlap = True
+        result = instance.get_report(self.jan, self.mar, coverage=True)
+        tasks = result.tasks.set_index(wc.COL_TASK_IDENTIFIER)["agg_time"]
+        self.assertEqual(
+            tasks.to_dict(),
+            {
+                "task1": timedelta(hours=5, minutes=5),
+                "task2": timedelta(hours=12, minutes=45),
+            },
+        )
+        # Parallel time is not counted twice
+        self.assertEqual(tasks.sum(), result.coverage["task_time"].sum())
+
+        results = instance.get_window_reports([(self.jan, self.feb)])
+        expected = instance.get_report(self.jan, self.feb)
+        self.assertEqual(
+            results[0].report.tasks.set_index(wc.COL_TASK_IDENTIFIER).to_dict(),
+            expected.tasks.set_index(wc.COL_TASK_IDENTIFIER).to_dict(),
+        )
+
+    def test_print(self):
+        Log(self.fp).task_overlaps()
+        out = self._capsys.readouterr().out
+        self.assertIn("Max. concurrency: 2\nOverlapping time: 09:30:00\n", out)
+        self.assertIn("Overlapping periods:", out)
+
+class TestTaskReports(unittest.TestCase, CapSysMixin):
+    # (day, task identifier, start hour, stop hour)
+    entries = [
+        ("2019-12-30", "PROJ-1201", 8, 10),
+        ("2020-01-02", "PROJ-1201", 8, 9),
+        ("2020-01-02", "PROJ-1202", 9, 12),
+        ("2020-02-03", "PROJ-1301", 8, 9),
+        ("2020-02-03", "orga", 9, 10),
+    ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog")
+        lines = []
+        for day, task_id, start_hour, stop_hour in self.entries:
+            start = f"{day} {start_hour:02}:00:00+00:00"
+            stop = f"{day} {stop_hour:02}:00:00+00:00"
+            lines += [
+                f"{start}|{start}|session|start|",
+                f"{start}|{start}|task|start|{task_id}",
+                f"{stop}|{stop}|task|stop|{task_id}",
+                f"{stop}|{stop}|session|stop|",
+            ]
+        self.fp.write_text("\n".join(lines) + "\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_glob(self):
+        result = Log(self.fp).get_task_reports(["PROJ-12*"])
+        self.assertEqual(result.task_ids, ["PROJ-1201", "PROJ-1202"])
+        self.assertEqual(result.intervals.shape[0], 3)
+        self.assertEqual(result.total, timedelta(hours=6))
+        self.assertEqual(
+            result.daily["interval"].to_dict(),
+            {
+                date(2019, 12, 30): timedelta(hours=2),
+                date(2020, 1, 2): timedelta(hours=4),
+            },
+        )
+
+        per_task = result.per_task()
+        self.assertEqual([r.total for r in per_task], [timedelta(hours=3)] * 2)
+        self.assertEqual(
+            per_task[0].intervals.columns.tolist(),
+            ["date", "start", "stop", "interval"],
+        )
+
+    def test_regex(self):
+        result = Log(self.fp).get_task_reports(["^PROJ-1[23]01$", "rg"], regex=True)
+        self.assertEqual(result.task_ids, ["PROJ-1201", "PROJ-1301", "orga"])
+
+    def test_single_task_equals_get_task_report(self):
+        instance = Log(self.fp)
+        expected = instance.get_task_report("PROJ-1201")
+        (actual,) = instance.get_task_reports(["PROJ-1201"]).per_task()
+        pd.testing.assert_frame_equal(actual.intervals, expected.intervals)
+        self.assertEqual(actual.total, expected.total)
+
+    def test_window(self):
+        result = Log(self.fp).get_task_reports(
+            ["*"],
+            date_from=datetime(2020, 1, 1, tzinfo=timezone.utc),
+            date_to=datetime(2020, 2, 1, tzinfo=timezone.utc),
+        )
+        self.assertEqual(
+            result.intervals[wc.COL_TASK_IDENTIFIER].tolist(),
+            ["PROJ-1201", "PROJ-1202"],
+        )
+        self.assertEqual(result.total, timedelta(hours=4))
+
+    def test_unknown(self):
+        instance = Log(self.fp)
+        with self.assertRaises(UnknownTaskError):
+            instance.get_task_reports(["PROJ-1201", "foobar"])
+        with self.assertRaises(UnknownTaskError):
+            instance.get_task_reports(["foo*"])
+
+    def test_archived(self):
+        instance = Log(self.fp)
+        before = instance.get_task_reports(["PROJ-*"])
+        Log(self.fp).archive(2020)
+
+        iter_segment = Log._iter_segment
+        with patch.object(
+            Log, "_iter_segment", autospec=True, side_effect=iter_segment
+        ) as mock_iter:
+            after = Log(self.fp).get_task_reports(["PROJ-*"])
+            self.assertEqual(mock_iter.call_count, 1)
+        pd.testing.assert_frame_equal(before.intervals, after.intervals)
+
+    def test_print_per_task(self):
+        Log(self.fp).task_report(["PROJ-12*"])
+        out = self._capsys.readouterr().out
+        self.assertIn("Task PROJ-1201:\n===============\nLog entries:", out)
+        self.assertIn("\nTask PROJ-1202:\n", out)
+        self.assertIn("Total: 0 days 03:00:00", out)
+
+    def test_print_combined(self):
+        Log(self.fp).task_report(["PROJ-12*"], combined=True)
+        out = self._capsys.readouterr().out
+        self.assertNotIn("Task PROJ-1201:", out)
+        self.assertIn("PROJ-1202 2020-01-02 09:00:00 12:00:00 03:00:00", out)
+        self.assertIn("Total: 0 days 06:00:00", out)
+
+    def test_csv(self):
+        Log(self.fp).task_report(["orga"], fmt="csv")
+        self.assertEqual(
+            self._capsys.readouterr().out,
+            "identifier,date,start,stop,interval\n"
+            "orga,2020-02-03,2020-02-03 09:00:00+00:00,2020-02-03 10:00:00+00:00,"
+            "3600.0\n",
+        )
+
+    def test_json(self):
+        Log(self.fp).task_report(["PROJ-12*"], fmt="json")
+        content = json.loads(self._capsys.readouterr().out)
+        self.assertEqual([r["task_id"] for r in content], ["PROJ-1201", "PROJ-1202"])
+        self.assertEqual(len(content[0]["intervals"]), 2)
+
+        Log(self.fp).task_report(["PROJ-12*"], combined=True, fmt="json")
+        content = json.loads(self._capsys.readouterr().out)
+        self.assertEqual(content["task_ids"], ["PROJ-1201", "PROJ-1202"])
+
+
+class TestTeamReport(unittest.TestCase, CapSysMixin):
+    # person -> (day, task identifier, hours)
+    entries = {
+        "alice": [("2020-01-02", "task1", 2), ("2020-01-03", "task2", 8)],
+        "bob": [("2020-01-02", "task1", 3)],
+        "carol": [("2020-01-03", "task2", 1), ("2020-02-03", "task2", 1)],
+    }
+    date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    date_to = datetime(2020, 2, 1, tzinfo=timezone.utc)
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fps = []
+        for person, entries in self.entries.items():
+            lines = []
+            for day, task_id, hours in entries:
+                start = f"{day} 08:00:00+00:00"
+                stop = f"{day} {8 + hours:02}:00:00+00:00"
+                lines += [
+                    f"{start}|{start}|session|start|",
+                    f"{start}|{start}|task|start|{task_id}",
+                    f"{stop}|{stop}|task|stop|{task_id}",
+                    f"{stop}|{stop}|session|stop|",
+                ]
+            fp = Path(self.tmpdir.name, f"{person}.csv")
+            fp.write_text("\n".join(lines) + "\n")
+            self.fps.append(fp.as_posix())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _get_team_report(self, processes=None):
+        instance = Log(Path(self.tmpdir.name, "own").as_posix())
+        instance.auto_break = AutoBreak([6 * 60], [30])
+        return instance.get_team_report(
+            self.fps, self.date_from, self.date_to, processes=processes
+        )
+
+    def test_team_report(self):
+        result = self._get_team_report(processes=2)
+        self.assertTrue(result.team.auto_break)
+        self.assertEqual(
+            result.team.day.set_index(wc.COL_LOG_DATETIME)["agg_time"].to_dict(),
+            {
+                pd.Timestamp("2020-01-02"): timedelta(hours=5),
+                pd.Timestamp("2020-01-03"): timedelta(hours=9),
+            },
+        )
+        self.assertEqual(result.team.month["break"].sum(), timedelta(minutes=30))
+        self.assertEqual(
+            result.people.set_index("person")["agg_time_bookable"].to_dict(),
+            {
+                "alice": timedelta(hours=9, minutes=30),
+                "bob": timedelta(hours=3),
+                "carol": timedelta(hours=1),
+            },
+        )
+        self.assertEqual(
+            result.team.tasks.set_index(wc.COL_TASK_IDENTIFIER)["agg_time"].to_dict(),
+            {"task1": timedelta(hours=5), "task2": timedelta(hours=9)},
+        )
+
+    def test_break_mode(self):
+        instance = Log(Path(self.tmpdir.name, "own").as_posix())
+        instance.break_mode = wc.BREAKS_ACTUAL
+        result = instance.get_team_report(self.fps, self.date_from, self.date_to)
+        self.assertEqual(result.people["break_taken"].sum(), timedelta(0))
+        self.assertFalse(result.team.auto_break)
+
+    def test_same_result_without_pool(self):
+        parallel = self._get_team_report()
+        sequential = self._get_team_report(processes=1)
+        pd.testing.assert_frame_equal(parallel.team.day, sequential.team.day)
+        pd.testing.assert_frame_equal(parallel.person_tasks, sequential.person_tasks)
+
+    def test_empty_logs_are_skipped(self):
+        empty_fp = Path(self.tmpdir.name, "dave.csv")
+        empty_fp.touch()
+        self.fps.append(empty_fp.as_posix())
+        result = self._get_team_report()
+        self.assertEqual(result.people["person"].tolist(), ["alice", "bob", "carol"])
+
+        self.fps = [empty_fp.as_posix()]
+        with self.assertRaises(EmptyLogError):
+            self._get_team_report()
+
+    def test_print(self):
+        instance = Log(Path(self.tmpdir.name, "own").as_posix())
+        instance.team_report(self.tmpdir.name, self.date_from, self.date_to)
+        out = self._capsys.readouterr().out
+        self.assertIn("Aggregated by person:", out)
+        self.assertIn("Aggregated by person and task:", out)
+
+    def test_print_json(self):
+        instance = Log(Path(self.tmpdir.name, "own").as_posix())
+        instance.team_report(
+            self.tmpdir.name, self.date_from, self.date_to, fmt="json"
+        )
+        content = json.loads(self._capsys.readouterr().out)
+        self.assertEqual(
+            content["people"][1],
+            {"person": "bob", "total": 10800.0, "break": 0.0, "bookable": 10800.0},
+        )
+        self.assertEqual(len(content["person_tasks"]), 4)
+
+    def test_no_logfiles(self):
+        instance = Log(Path(self.tmpdir.name, "own").as_posix())
+        with self.assertRaises(SystemExit):
+            instance.team_report(
+                Path(self.tmpdir.name, "x*").as_posix(), self.date_from, self.date_to
+            )
+        self.assertIn("No logfiles found", self._capsys.readouterr().err)
+
 
 class TestReport(snapshottest.TestCase, TestDataMixin, CapSysMixin):
     def test_report_with_tasks(self):
@@ -244,6 +739,224 @@ class TestReport(snapshottest.TestCase, TestDataMixin, CapSysMixin):
         out, _ = self._capsys.readouterr()
         self.assertMatchSnapshot(out)
 
+    def test_report_json(self):
+        fp = self._get_testdata_fp("report_with_tasks")
+        date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        date_to = datetime(2020, 3, 1, tzinfo=timezone.utc)
+        Log(fp).report(date_from, date_to, fmt="json")
+
+        out, _ = self._capsys.readouterr()
+        content = json.loads(out)
+        self.assertEqual(list(content), ["month", "week", "day", "tasks"])
+        self.assertEqual(
+            [row["date"] for row in content["month"]], ["2020-01", "2020-02"]
+        )
+        result = Log(fp).get_report(date_from, date_to)
+        self.assertEqual(
+            [row["total"] for row in content["day"]],
+            result.day["agg_time"].dt.total_seconds().tolist(),
+        )
+        self.assertEqual(
+            content["tasks"][0], {"task": "task1", "total": 35400.0},
+        )
+
+    def test_window_reports(self):
+        fp = self._get_testdata_fp("report_with_tasks")
+        instance = Log(fp)
+        instance.auto_break = AutoBreak(limits=[0], durations=[60])
+        jan, feb, mar = [datetime(2020, m, 1, tzinfo=timezone.utc) for m in (1, 2, 3)]
+        windows = [(jan, feb), (feb, mar), (jan, mar)]
+        with patch.object(
+            instance, "_select_window", wraps=instance._select_window
+        ) as mock_select:
+            results = instance.get_window_reports(windows)
+        mock_select.assert_called_once()
+
+        self.assertEqual([(r.date_from, r.date_to) for r in results], windows)
+        for result, (date_from, date_to) in zip(results, windows):
+            expected = instance.get_report(date_from, date_to)
+            for name in ["day", "week", "month"]:
+                pd.testing.assert_frame_equal(
+                    getattr(result.report, name), getattr(expected, name)
+                )
+            self.assertEqual(
+                result.report.tasks.set_index(wc.COL_TASK_IDENTIFIER).to_dict(),
+                expected.tasks.set_index(wc.COL_TASK_IDENTIFIER).to_dict(),
+            )
+
+    def test_window_report_json(self):
+        fp = self._get_testdata_fp("report_with_tasks")
+        jan, feb, mar = [datetime(2020, m, 1, tzinfo=timezone.utc) for m in (1, 2, 3)]
+        Log(fp).window_report([(jan, feb), (feb, mar)], fmt="json")
+
+        out, _ = self._capsys.readouterr()
+        contents = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual(
+            [(c["date_from"], c["date_to"]) for c in contents],
+            [("2020-01-01", "2020-02-01"), ("2020-02-01", "2020-03-01")],
+        )
+        self.assertEqual([row["date"] for row in contents[1]["month"]], ["2020-02"])
+
+    def test_report_coverage(self):
+        fp = self._get_testdata_fp("report_with_tasks")
+        jan, feb, mar = [datetime(2020, m, 1, tzinfo=timezone.utc) for m in (1, 2, 3)]
+        instance = Log(fp)
+        result = instance.get_report(jan, mar, coverage=True)
+        self.assertIsNone(instance.get_report(jan, mar).coverage)
+
+        df_coverage = result.coverage
+        self.assertEqual(df_coverage[wc.COL_LOG_DATETIME].dt.day.tolist(), [1, 1])
+        self.assertEqual(
+            df_coverage["session_time"].sum(), result.day["agg_time"].sum()
+        )
+        self.assertEqual(df_coverage["untracked"].tolist(), [timedelta(minutes=5)] * 2)
+        self.assertEqual(df_coverage["outside"].sum(), timedelta(0))
+
+        results = instance.get_window_reports([(jan, feb), (feb, mar)], coverage=True)
+        self.assertEqual([r.report.coverage.shape[0] for r in results], [1, 1])
+        pd.testing.assert_frame_equal(
+            results[1].report.coverage, df_coverage.iloc[1:].reset_index(drop=True)
+        )
+
+    def test_report_coverage_json(self):
+        fp = self._get_testdata_fp("report_with_tasks")
+        date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        date_to = datetime(2020, 3, 1, tzinfo=timezone.utc)
+        Log(fp).report(date_from, date_to, fmt="json", coverage=True)
+
+        content = json.loads(self._capsys.readouterr().out)
+        self.assertEqual(
+            content["coverage"][0],
+            {
+                "date": "2020-01-01",
+                "session_time": 32400.0,
+                "task_time": 32100.0,
+                "untracked": 300.0,
+                "outside": 0.0,
+            },
+        )
+
+        Log(fp).report(date_from, date_to, coverage=True)
+        out = self._capsys.readouterr().out
+        self.assertIn("Coverage of sessions by tasks:", out)
+
+    def test_report_csv(self):
+        fp = self._get_testdata_fp("report_with_tasks")
+        date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        date_to = datetime(2020, 3, 1, tzinfo=timezone.utc)
+        Log(fp).report(date_from, date_to, fmt="csv")
+
+        out, _ = self._capsys.readouterr()
+        lines = out.splitlines()
+        self.assertEqual(lines[0], "aggregation,date,task,total,break,bookable")
+        self.assertTrue(lines[1].startswith("month,2020-01,,"))
+        self.assertEqual(
+            sorted(set(line.split(",")[0] for line in lines[1:])),
+            ["day", "month", "tasks", "week"],
+        )
+
+
+class TestBreakModes(unittest.TestCase, CapSysMixin):
+    # Two sessions with a gap of 15 minutes on the first day, a single
+    # session on the second day
+    sessions = [
+        ("2020-01-02 08:00:00", "2020-01-02 12:00:00"),
+        ("2020-01-02 12:15:00", "2020-01-02 17:15:00"),
+        ("2020-01-03 08:00:00", "2020-01-03 15:00:00"),
+    ]
+    date_from = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    date_to = datetime(2020, 2, 1, tzinfo=timezone.utc)
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog.csv")
+        lines = []
+        for start, stop in self.sessions:
+            lines += [
+                f"{start}+00:00|{start}+00:00|session|start|",
+                f"{stop}+00:00|{stop}+00:00|session|stop|",
+            ]
+        self.fp.write_text("\n".join(lines) + "\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _get_log(self, break_mode):
+        instance = Log(self.fp.as_posix())
+        instance.auto_break = AutoBreak([0, 6 * 60], [0, 30])
+        instance.break_mode = break_mode
+        return instance
+
+    def _get_day(self, break_mode):
+        result = self._get_log(break_mode).get_report(self.date_from, self.date_to)
+        return result.day.set_index(result.day[wc.COL_LOG_DATETIME].dt.day)
+
+    def test_auto(self):
+        df_day = self._get_day(wc.BREAKS_AUTO)
+        self.assertNotIn("break_taken", df_day.columns)
+        self.assertEqual(
+            df_day["break"].to_dict(),
+            {2: timedelta(minutes=30), 3: timedelta(minutes=30)},
+        )
+
+    def test_max(self):
+        df_day = self._get_day(wc.BREAKS_MAX)
+        self.assertEqual(
+            df_day["break_taken"].to_dict(),
+            {2: timedelta(minutes=15), 3: timedelta(0)},
+        )
+        self.assertEqual(
+            df_day["break"].to_dict(),
+            {2: timedelta(minutes=15), 3: timedelta(minutes=30)},
+        )
+        self.assertEqual(
+            df_day["agg_time_bookable"].to_dict(),
+            {2: timedelta(hours=8, minutes=45), 3: timedelta(hours=6, minutes=30)},
+        )
+
+    def test_actual(self):
+        result = self._get_log(wc.BREAKS_ACTUAL).get_report(
+            self.date_from, self.date_to
+        )
+        self.assertFalse(result.auto_break)
+        self.assertEqual(result.month["break_taken"].sum(), timedelta(minutes=15))
+        self.assertEqual(result.month["break"].sum(), timedelta(0))
+        pd.testing.assert_series_equal(
+            result.day["agg_time_bookable"], result.day["agg_time"], check_names=False
+        )
+
+    def test_window_reports(self):
+        instance = self._get_log(wc.BREAKS_MAX)
+        results = instance.get_window_reports([(self.date_from, self.date_to)])
+        expected = instance.get_report(self.date_from, self.date_to)
+        pd.testing.assert_frame_equal(results[0].report.day, expected.day)
+
+    def test_print(self):
+        self._get_log(wc.BREAKS_MAX).report(self.date_from, self.date_to)
+        out = self._capsys.readouterr().out
+        self.assertIn("Logged breaks", out)
+
+        self._get_log(wc.BREAKS_MAX).report(self.date_from, self.date_to, fmt="csv")
+        lines = self._capsys.readouterr().out.splitlines()
+        self.assertEqual(
+            lines[0], "aggregation,date,task,total,break,bookable,logged_breaks"
+        )
+
+    def test_status(self):
+        query_date = date(2020, 1, 2)
+        result = self._get_log(wc.BREAKS_AUTO).get_status(8, 10, query_date)
+        self.assertIsNone(result.break_taken)
+        self.assertEqual(result.break_duration, timedelta(minutes=30))
+
+        result = self._get_log(wc.BREAKS_MAX).get_status(8, 10, query_date)
+        self.assertEqual(result.break_taken, timedelta(minutes=15))
+        self.assertEqual(result.break_duration, timedelta(minutes=15))
+
+        result = self._get_log(wc.BREAKS_ACTUAL).get_status(8, 10, query_date)
+        self.assertEqual(result.break_taken, timedelta(minutes=15))
+        self.assertEqual(result.break_duration, timedelta(0))
+        self.assertEqual(result.to_fmt_dict()["break_taken_short"], "00:15")
+
 
 class TestStatus(snapshottest.TestCase, TestDataMixin, CapSysMixin):
     def test_empty(self):
@@ -348,6 +1061,692 @@ class TestStatus(snapshottest.TestCase, TestDataMixin, CapSysMixin):
         self.assertEqual(err.exception.code, 0)
 
 
+class TestWatchStatus(unittest.TestCase, TestDataMixin, CapSysMixin):
+    def test_one_line_per_tick(self):
+        with patch("worklog.constants.LOCAL_TIMEZONE", new=timezone.utc):
+            instance = Log(self._get_testdata_fp("status_tracking_off"))
+            with patch("worklog.log.sleep") as mock_sleep:
+                instance.watch_status(
+                    8,
+                    10,
+                    query_date=date(2020, 1, 1),
+                    fmt="{tracking_status}",
+                    max_ticks=3,
+                )
+
+        out, _ = self._capsys.readouterr()
+        self.assertEqual(out, "off\noff\noff\n")
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_ingest_appended_records(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            instance = Log(fp)
+            other = Log(fp)
+
+            def append(_):
+                other.append(
+                    wc.TOKEN_SESSION,
+                    wc.TOKEN_START,
+                    datetime(2020, 1, 1, 8, tzinfo=timezone.utc),
+                )
+
+            with patch("worklog.constants.LOCAL_TIMEZONE", new=timezone.utc):
+                with patch("worklog.log.sleep", side_effect=append):
+                    instance.watch_status(
+                        8,
+                        10,
+                        query_date=date(2020, 1, 1),
+                        fmt="{tracking_status}",
+                        max_ticks=2,
+                    )
+
+        out, _ = self._capsys.readouterr()
+        self.assertEqual(out, ErrMsg.NA.value + "\non\n")
+
+    def test_rewritten_to_no_records(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            instance = Log(fp)
+            instance.append(
+                wc.TOKEN_SESSION,
+                wc.TOKEN_START,
+                datetime(2020, 1, 1, 8, tzinfo=timezone.utc),
+            )
+
+            def rewrite(_):
+                atomic_write(fp.as_posix(), b"")
+
+            with patch("worklog.constants.LOCAL_TIMEZONE", new=timezone.utc):
+                with patch("worklog.log.sleep", side_effect=rewrite):
+                    instance.watch_status(
+                        8,
+                        10,
+                        query_date=date(2020, 1, 1),
+                        fmt="{tracking_status}",
+                        max_ticks=2,
+                    )
+
+        out, _ = self._capsys.readouterr()
+        self.assertEqual(out, "on\n" + ErrMsg.NA.value + "\n")
+
+
+class TestActiveState(unittest.TestCase):
+    def test_commit_uses_state_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            instance = Log(fp)
+            instance.append(
+                wc.TOKEN_SESSION,
+                wc.TOKEN_START,
+                datetime(2020, 1, 1, 8, tzinfo=timezone.utc),
+            )
+            instance.append(
+                wc.TOKEN_TASK,
+                wc.TOKEN_START,
+                datetime(2020, 1, 1, 8, tzinfo=timezone.utc),
+                identifier="task1",
+            )
+
+            other = Log(fp)
+            with patch.object(Log, "_read") as mock_read:
+                other.stop_active_tasks(datetime(2020, 1, 1, 9, tzinfo=timezone.utc))
+                other.append(
+                    wc.TOKEN_SESSION,
+                    wc.TOKEN_STOP,
+                    datetime(2020, 1, 1, 9, tzinfo=timezone.utc),
+                )
+                mock_read.assert_not_called()
+
+            state = Log(fp).get_active_state()
+            self.assertIsNone(state.session)
+            self.assertEqual(state.tasks, {})
+
+    def test_state_rebuilt_if_inconsistent(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            instance = Log(fp)
+            instance.append(
+                wc.TOKEN_TASK,
+                wc.TOKEN_START,
+                datetime(2020, 1, 1, 8, tzinfo=timezone.utc),
+                identifier="task1",
+            )
+            # Modified by another program
+            with open(fp, "a") as fh:
+                fh.write(
+                    "2020-01-01 09:00:00+00:00|2020-01-01 09:00:00+00:00|"
+                    "task|stop|task1\n"
+                )
+
+            state = Log(fp).get_active_state()
+            self.assertEqual(state.tasks, {})
+
+
+class TestRecovery(unittest.TestCase):
+    record = "2020-01-01 08:00:00+00:00|2020-01-01 08:00:00+00:00|session|start|\n"
+
+    def test_torn_tail_is_quarantined(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            with open(fp, "w") as fh:
+                fh.write(self.record + self.record[:30])
+
+            instance = Log(fp)
+            self.assertEqual(instance._log_df.shape[0], 1)
+            self.assertEqual(fp.read_text(), self.record)
+            self.assertTrue(Path(tmpdir, "worklog.quarantine").exists())
+
+    def test_append_after_missing_newline(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            with open(fp, "w") as fh:
+                fh.write(self.record.rstrip("\n"))
+
+            instance = Log(fp)
+            instance.append(
+                wc.TOKEN_SESSION,
+                wc.TOKEN_STOP,
+                datetime(2020, 1, 1, 9, tzinfo=timezone.utc),
+            )
+            self.assertEqual(Log(fp)._log_df.shape[0], 2)
+
+    def test_interrupted_batch_is_completed(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            instance = Log(fp, journal=True)
+            instance.append(
+                wc.TOKEN_SESSION,
+                wc.TOKEN_START,
+                datetime(2020, 1, 1, 8, tzinfo=timezone.utc),
+            )
+            instance.append(
+                wc.TOKEN_TASK,
+                wc.TOKEN_START,
+                datetime(2020, 1, 1, 8, tzinfo=timezone.utc),
+                identifier="task1",
+            )
+            size = fp.stat().st_size
+
+            # Simulate a crash while writing the batch of a forced session stop
+            with patch("worklog.log.remove_journal"):
+                with patch("worklog.log.append_bytes") as mock_append:
+                    mock_append.side_effect = lambda fp, data: (
+                        open(fp, "ab").write(data[:20]) and size
+                    )
+                    instance.append(
+                        wc.TOKEN_SESSION,
+                        wc.TOKEN_STOP,
+                        datetime(2020, 1, 1, 9, tzinfo=timezone.utc),
+                        force=True,
+                    )
+
+            df = Log(fp)._log_df
+            self.assertEqual(df.shape[0], 4)
+            self.assertFalse(Path(tmpdir, "worklog.journal").exists())
+            self.assertEqual(Log(fp).get_active_state().tasks, {})
+
+    def test_unwritten_batch_is_discarded(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            fp.write_text(self.record)
+            write_journal(fp.as_posix(), len(self.record), self.record.encode())
+
+            self.assertEqual(Log(fp)._log_df.shape[0], 1)
+            self.assertEqual(fp.read_text(), self.record)
+            self.assertFalse(Path(tmpdir, "worklog.journal").exists())
+
+    def test_diverging_batch_is_rolled_back(self):
+        other = self.record.replace("08:00", "09:00")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            fp.write_text(self.record + other)
+            write_journal(fp.as_posix(), len(self.record), self.record.encode())
+
+            self.assertEqual(Log(fp)._log_df.shape[0], 1)
+            self.assertEqual(fp.read_text(), self.record)
+            # Nothing is lost
+            self.assertEqual(Path(tmpdir, "worklog.quarantine").read_text(), other)
+
+
+class TestCompact(unittest.TestCase):
+    lines = [
+        "2020-01-01 10:00:00+00:00|2020-01-01 10:00:00+00:00|session|stop|",
+        "2020-01-01 08:00:00+00:00|2020-01-01 08:00:00+00:00|session|start|",
+        "2020-01-01 10:00:00+00:00|2020-01-01 10:00:00+00:00|session|stop|",
+        "2020-01-01T09:00:00+0000|2020-01-01T09:00:00+0000|task|start|task1",
+    ]
+
+    def test_compact(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            fp.write_text("\n".join(self.lines) + "\n")
+
+            result = Log(fp).compact()
+            self.assertEqual(result.records, 3)
+            self.assertEqual(result.duplicates, 1)
+            self.assertTrue(result.reordered)
+
+            self.assertEqual(
+                fp.read_text().splitlines(),
+                [
+                    self.lines[1],
+                    "2020-01-01 09:00:00+00:00|2020-01-01 09:00:00+00:00|"
+                    "task|start|task1",
+                    self.lines[0],
+                ],
+            )
+            self.assertEqual(
+                list(Log(fp).get_active_state().tasks.keys()), ["task1"],
+            )
+
+    def test_sorted_file_is_not_sorted_on_read(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            fp.write_text("\n".join(self.lines[1:3]) + "\n")
+            Log(fp).compact()
+
+            with patch.object(pd.DataFrame, "sort_values") as mock_sort:
+                Log(fp)._log_df
+                mock_sort.assert_not_called()
+
+    def test_sidecars_are_rebuilt(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            fp.write_text("\n".join(self.lines) + "\n")
+            Log(fp).get_task_counts()
+            Log(fp).compact()
+
+            self.assertTrue(Path(f"{fp}.ids").exists())
+            self.assertTrue(Path(f"{fp}.trigrams").exists())
+            with patch("worklog.log.build_index") as mock_build, patch(
+                "worklog.log.write_trigrams"
+            ) as mock_write:
+                self.assertEqual(Log(fp).get_task_counts(), {"task1": 1})
+                self.assertEqual(Log(fp).resolve_task_id("tas"), "task1")
+            mock_build.assert_not_called()
+            mock_write.assert_not_called()
+
+    def test_backdated_append_after_compact(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            fp.write_text("\n".join(self.lines[:2]) + "\n")
+            Log(fp).compact()
+            Log(fp).append(
+                wc.TOKEN_TASK,
+                wc.TOKEN_START,
+                datetime(2020, 1, 1, 9, tzinfo=timezone.utc),
+                identifier="task1",
+            )
+
+            df = Log(fp)._log_df
+            self.assertTrue(df[wc.COL_LOG_DATETIME].is_monotonic_increasing)
+
+    def test_rewrite_is_detected_by_readers(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            fp.write_text("\n".join(self.lines) + "\n")
+            reader = Log(fp)
+            self.assertEqual(reader._log_df.shape[0], 4)
+
+            Log(fp).compact()
+            reader.refresh()
+            self.assertEqual(reader._log_df.shape[0], 3)
+
+
+class TestArchive(unittest.TestCase):
+    def _write_days(self, fp, days):
+        lines = []
+        for i, day in enumerate(days):
+            task_id = f"task{i % 2}"
+            lines += [
+                f"{day} 08:00:00+00:00|{day} 08:00:00+00:00|session|start|",
+                f"{day} 09:00:00+00:00|{day} 09:00:00+00:00|task|start|{task_id}",
+                f"{day} 11:00:00+00:00|{day} 11:00:00+00:00|task|stop|{task_id}",
+                f"{day} 17:00:00+00:00|{day} 17:00:00+00:00|session|stop|",
+            ]
+        fp.write_text("\n".join(lines) + "\n")
+
+    def _query(self, fp):
+        instance = Log(fp)
+        report = instance.get_report(
+            datetime(2019, 12, 1, tzinfo=timezone.utc),
+            datetime(2020, 2, 1, tzinfo=timezone.utc),
+        )
+        task_report = instance.get_task_report("task0")
+        return (
+            report.day[[wc.COL_LOG_DATETIME, "agg_time"]],
+            report.tasks,
+            task_report.intervals,
+            instance.get_task_counts(),
+        )
+
+    def test_archive(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            self._write_days(fp, ["2019-12-30", "2019-12-31", "2020-01-02"])
+            before = self._query(fp)
+
+            result = Log(fp).archive(2020)
+            self.assertEqual(result.years, [2019])
+            self.assertEqual(result.records, 8)
+            self.assertEqual(len(fp.read_text().splitlines()), 4)
+
+            after = self._query(fp)
+            pd.testing.assert_frame_equal(
+                before[0].reset_index(drop=True), after[0].reset_index(drop=True)
+            )
+            pd.testing.assert_frame_equal(before[1], after[1])
+            pd.testing.assert_frame_equal(
+                before[2].reset_index(drop=True), after[2].reset_index(drop=True)
+            )
+            self.assertEqual(before[3], after[3])
+
+    def test_task_report_mixed_offsets(self):
+        lines = []
+        for day, offset in [("2019-07-01", "+02:00"), ("2020-01-02", "+01:00")]:
+            lines += [
+                f"{day} 09:00:00{offset}|{day} 09:00:00{offset}|task|start|task0",
+                f"{day} 11:00:00{offset}|{day} 11:00:00{offset}|task|stop|task0",
+            ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            fp.write_text("\n".join(lines) + "\n")
+            Log(fp).archive(2020)
+
+            # Summer time in the segment, winter time in the logfile
+            task_report = Log(fp).get_task_report("task0")
+            multi_report = Log(fp).get_task_reports(["task*"])
+
+        self.assertEqual(task_report.total, timedelta(hours=4))
+        self.assertEqual(
+            task_report.intervals["date"].tolist(),
+            [date(2019, 7, 1), date(2020, 1, 2)],
+        )
+        self.assertEqual(multi_report.total, timedelta(hours=4))
+
+    def test_task_report_reads_segments_of_task_only(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            self._write_days(fp, ["2018-12-31", "2019-12-31", "2020-01-02"])
+            Log(fp).archive(2020)
+
+            with patch.object(Log, "_iter_segment", autospec=True) as mock_iter:
+                mock_iter.return_value = iter([])
+                Log(fp).get_task_report("task0")
+                self.assertEqual(mock_iter.call_count, 1)
+
+    def test_archive_open_session(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            self._write_days(fp, ["2019-12-31"])
+            with open(fp, "a") as fh:
+                fh.write(
+                    "2019-12-31 18:00:00+00:00|2019-12-31 18:00:00+00:00|"
+                    "session|start|\n"
+                )
+
+            with self.assertRaises(ArchiveOpenEntriesError):
+                Log(fp).archive(2020)
+            self.assertFalse(Path(tmpdir, "worklog.archive").exists())
+
+    def test_archive_twice_merges_segments(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            self._write_days(fp, ["2019-12-30", "2020-01-02"])
+            Log(fp).archive(2020)
+            # Backdated into the archived year
+            with open(fp, "a") as fh:
+                fh.write(
+                    "2019-12-31 08:00:00+00:00|2019-12-31 08:00:00+00:00|"
+                    "session|start|\n"
+                    "2019-12-31 09:00:00+00:00|2019-12-31 09:00:00+00:00|"
+                    "session|stop|\n"
+                )
+            Log(fp).archive(2020)
+
+            report = Log(fp).get_report(
+                datetime(2019, 12, 1, tzinfo=timezone.utc),
+                datetime(2020, 1, 1, tzinfo=timezone.utc),
+            )
+            self.assertEqual(report.day["agg_time"].sum(), timedelta(hours=10))
+
+    def test_doctor_full(self):
+        logger = logging.getLogger("test_logger")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            self._write_days(fp, ["2019-12-31", "2020-01-02"])
+            Log(fp).archive(2020)
+
+            with patch.object(logger, "error") as mock_logger:
+                Log(fp, logger=logger).doctor(full=True)
+                mock_logger.assert_not_called()
+
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog")
+        self.peer_fp = Path(self.tmpdir.name, "peer")
+        self.fp.write_text(self._lines("2020-01-01", "session", "task1"))
+        self.peer_fp.write_text(
+            self._lines("2020-01-01", "session", "task1")
+            + self._lines("2020-01-02", "session", "task2")
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _lines(self, day, *entries):
+        lines = []
+        for i, entry in enumerate(entries):
+            category = wc.TOKEN_SESSION if entry == "session" else wc.TOKEN_TASK
+            identifier = "" if entry == "session" else entry
+            start = f"{day} {8 + i:02}:00:00+00:00"
+            stop = f"{day} {17 - i:02}:00:00+00:00"
+            lines += [
+                f"{start}|{start}|{category}|start|{identifier}",
+                f"{stop}|{stop}|{category}|stop|{identifier}",
+            ]
+        return "\n".join(sorted(lines, key=lambda line: line[:25])) + "\n"
+
+    def test_sync(self):
+        result = Log(self.fp).sync(self.peer_fp.as_posix())
+        self.assertEqual((result.read, result.records, result.duplicates), (8, 4, 4))
+        self.assertEqual(result.conflicts, [])
+        self.assertEqual(Log(self.fp).get_task_counts(), {"task1": 2, "task2": 2})
+
+    def test_incremental(self):
+        Log(self.fp).sync(self.peer_fp.as_posix())
+        result = Log(self.fp).sync(self.peer_fp.as_posix())
+        self.assertEqual((result.read, result.records), (0, 0))
+
+        with open(self.peer_fp, "a") as fh:
+            fh.write(self._lines("2020-01-03", "session"))
+        result = Log(self.fp).sync(self.peer_fp.as_posix())
+        self.assertEqual((result.read, result.records), (2, 2))
+
+    def test_peer_rewritten(self):
+        # Compacting changes the timestamp format
+        self.peer_fp.write_text(self.peer_fp.read_text().replace(" ", "T"))
+        Log(self.fp).sync(self.peer_fp.as_posix())
+        Log(self.peer_fp).compact()
+        result = Log(self.fp).sync(self.peer_fp.as_posix())
+        self.assertEqual((result.read, result.records), (8, 0))
+
+    def test_conflict(self):
+        with open(self.peer_fp, "a") as fh:
+            fh.write(
+                "2020-01-01 12:00:00+00:00|2020-01-01 12:00:00+00:00|session|start|\n"
+            )
+        result = Log(self.fp).sync(self.peer_fp.as_posix())
+        self.assertEqual(
+            result.conflicts,
+            ["Session started at 2020-01-01 12:00:00+00:00 while a session is running"],
+        )
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog")
+        self.out_dir = Path(self.tmpdir.name, "export")
+        lines = []
+        for day in ["2020-01-01", "2020-01-02"]:
+            for time, category, type_, identifier in [
+                ("08:00:00", "session", "start", ""),
+                ("09:00:00", "task", "start", "task1"),
+                ("10:30:00", "task", "stop", "task1"),
+                ("17:00:00", "session", "stop", ""),
+            ]:
+                dt = f"{day} {time}+01:00"
+                lines.append(f"{dt}|{dt}|{category}|{type_}|{identifier}")
+        self.fp.write_text("\n".join(lines) + "\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_csv(self):
+        result = Log(self.fp).export(self.out_dir.as_posix())
+        self.assertEqual((result.events, result.intervals), (8, 4))
+        events = pd.read_csv(Path(self.out_dir, "events.csv"))
+        self.assertEqual(
+            events[wc.COL_LOG_DATETIME].iloc[0], "2020-01-01 07:00:00+00:00"
+        )
+        intervals = pd.read_csv(Path(self.out_dir, "intervals.csv"))
+        self.assertEqual(
+            intervals["duration"].tolist(), [32400.0, 5400.0, 32400.0, 5400.0]
+        )
+
+    def test_jsonl(self):
+        result = Log(self.fp).export(self.out_dir.as_posix(), fmt="jsonl")
+        self.assertEqual(
+            result.fps,
+            [
+                Path(self.out_dir, "events.jsonl").as_posix(),
+                Path(self.out_dir, "intervals.jsonl").as_posix(),
+            ],
+        )
+        with open(result.fps[1]) as fh:
+            records = [json.loads(line) for line in fh]
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[1][wc.COL_TASK_IDENTIFIER], "task1")
+
+    def test_window_and_category(self):
+        result = Log(self.fp).export(
+            self.out_dir.as_posix(),
+            date_from=datetime(2020, 1, 2, tzinfo=timezone.utc),
+            categories=[wc.TOKEN_TASK],
+        )
+        self.assertEqual((result.events, result.intervals), (2, 1))
+
+    @patch.object(Log, "_archive_chunksize", 3)
+    def test_archived(self):
+        Log(self.fp).archive(2021)
+        with open(self.fp, "a") as fh:
+            fh.write(
+                "2021-01-01 08:00:00+01:00|2021-01-01 08:00:00+01:00|session|start|\n"
+                "2021-01-01 09:00:00+01:00|2021-01-01 09:00:00+01:00|session|stop|\n"
+            )
+        result = Log(self.fp).export(self.out_dir.as_posix())
+        self.assertEqual((result.events, result.intervals), (10, 5))
+
+    @patch.object(Log, "_archive_chunksize", 3)
+    def test_logfile_is_streamed(self):
+        instance = Log(self.fp)
+        with patch.object(Log, "_read") as mock_read:
+            result = instance.export(self.out_dir.as_posix())
+        mock_read.assert_not_called()
+        self.assertEqual((result.events, result.intervals), (8, 4))
+
+    def test_torn_logfile(self):
+        with open(self.fp, "a") as fh:
+            fh.write("2020-01-03 08:00:00+01:00|2020-01-03 08:0")
+        result = Log(self.fp).export(self.out_dir.as_posix())
+        self.assertEqual((result.events, result.intervals), (8, 4))
+
+
+class TestProjection(unittest.TestCase, TestDataMixin):
+    def test_only_selected_columns_are_read(self):
+        instance = Log(self._get_testdata_fp("report_with_tasks"))
+        instance.project([wc.COL_CATEGORY, wc.COL_TASK_IDENTIFIER])
+
+        self.assertEqual(
+            list(instance._log_df.columns), [wc.COL_CATEGORY, wc.COL_TASK_IDENTIFIER]
+        )
+        self.assertEqual(instance._log_df.shape[0], 12)
+
+    def test_derived_columns_only_if_selected(self):
+        instance = Log(self._get_testdata_fp("report_with_tasks"))
+        instance.project([wc.COL_LOG_DATETIME, "date"])
+
+        self.assertEqual(list(instance._log_df.columns), [wc.COL_LOG_DATETIME, "date"])
+
+    def test_wider_projection_reads_again(self):
+        instance = Log(self._get_testdata_fp("report_with_tasks"))
+        instance.project([wc.COL_CATEGORY])
+        instance._log_df
+
+        instance.project([wc.COL_CATEGORY, wc.COL_TYPE])
+        self.assertIn(wc.COL_TYPE, instance._log_df.columns)
+        instance.project(None)
+        self.assertIn(wc.COL_COMMIT_DATETIME_UTC, instance._log_df.columns)
+
+    def test_append_with_projection(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog")
+            instance = Log(fp)
+            instance.project([wc.COL_LOG_DATETIME, wc.COL_CATEGORY, wc.COL_TYPE])
+            instance._log_df
+            instance.append(
+                wc.TOKEN_SESSION,
+                wc.TOKEN_START,
+                datetime(2020, 1, 1, 8, tzinfo=timezone.utc),
+            )
+
+            self.assertEqual(
+                list(instance._log_df.columns),
+                [wc.COL_LOG_DATETIME, wc.COL_CATEGORY, wc.COL_TYPE],
+            )
+            self.assertEqual(Log(fp)._log_df.shape, (1, 9))
+
+
+class TestQueryApi(unittest.TestCase, TestDataMixin):
+    def test_get_status_empty(self):
+        instance = Log(self._get_testdata_fp("status_empty"))
+        with self.assertRaises(EmptyLogError):
+            instance.get_status(8, 10, query_date=date(2020, 1, 1))
+
+    def test_get_status_day_with_no_content(self):
+        instance = Log(self._get_testdata_fp("status_tracking_off"))
+        with self.assertRaises(EmptyLogDateError):
+            instance.get_status(8, 10, query_date=date(2020, 1, 2))
+
+    def test_get_status(self):
+        with patch("worklog.constants.LOCAL_TIMEZONE", new=timezone.utc):
+            instance = Log(self._get_testdata_fp("status_tracking_off"))
+            result = instance.get_status(8, 10, query_date=date(2020, 1, 1))
+
+        self.assertFalse(result.is_active)
+        self.assertEqual(result.query_date, date(2020, 1, 1))
+        self.assertEqual(result.to_fmt_dict()["tracking_status"], "off")
+
+    def test_get_report(self):
+        instance = Log(self._get_testdata_fp("report_with_tasks"))
+        result = instance.get_report(
+            datetime(2020, 1, 1, tzinfo=timezone.utc),
+            datetime(2020, 3, 1, tzinfo=timezone.utc),
+        )
+
+        self.assertFalse(result.auto_break)
+        self.assertEqual(
+            result.tasks.set_index(wc.COL_TASK_IDENTIFIER)["agg_time"].to_dict(),
+            {"task1": timedelta(hours=9, minutes=50), "task2": timedelta(hours=17.5)},
+        )
+
+    def test_get_task_report(self):
+        instance = Log(self._get_testdata_fp("report_with_tasks"))
+        result = instance.get_task_report("task1")
+
+        self.assertEqual(result.intervals.shape[0], 2)
+        self.assertEqual(result.total, timedelta(hours=9, minutes=50))
+
+    def test_get_task_report_unknown(self):
+        instance = Log(self._get_testdata_fp("report_with_tasks"))
+        with self.assertRaises(UnknownTaskError):
+            instance.get_task_report("foobar")
+
+    def test_get_task_counts(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = self._copy_testdata_fp("tasks_multiple_nested", tmpdir)
+            instance = Log(fp)
+            self.assertEqual(
+                instance.get_task_counts(), {"task1": 2, "task2": 2, "task3": 2}
+            )
+
+    def test_append_with_running_task(self):
+        with tempfile.NamedTemporaryFile() as fh:
+            instance = Log(fh.name)
+            instance.append(
+                wc.TOKEN_SESSION,
+                wc.TOKEN_START,
+                datetime(2020, 1, 1, 8, tzinfo=timezone.utc),
+            )
+            instance.append(
+                wc.TOKEN_TASK,
+                wc.TOKEN_START,
+                datetime(2020, 1, 1, 8, tzinfo=timezone.utc),
+                identifier="task1",
+            )
+            with self.assertRaises(ActiveTasksError) as err:
+                instance.append(
+                    wc.TOKEN_SESSION,
+                    wc.TOKEN_STOP,
+                    datetime(2020, 1, 1, 9, tzinfo=timezone.utc),
+                )
+            self.assertEqual(err.exception.active_tasks, ["task1"])
+
+
 class TestCommit(snapshottest.TestCase, TestDataMixin, CapSysMixin):
     def test_invalid_type(self):
         with tempfile.NamedTemporaryFile() as fh:
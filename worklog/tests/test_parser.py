@@ -2,7 +2,8 @@ import unittest
 from unittest.mock import patch
 from io import StringIO
 from argparse import ArgumentParser, ArgumentError, ArgumentTypeError
-from datetime import datetime
+from datetime import datetime, timedelta
+import tempfile
 
 from worklog.constants import LOCAL_TIMEZONE
 from worklog.parser import (
@@ -12,6 +13,9 @@ from worklog.parser import (
     _year_month_day_parser,
     _year_month_parser,
     _calendar_week_parser,
+    _year_parser,
+    _window_parser,
+    _windows_file_parser,
 )
 
 
@@ -116,6 +120,161 @@ class TestParser(unittest.TestCase):
 
         self.assertEqual(cli_args.subcmd, "doctor")
 
+    def test_subcmd_doctor_full(self):
+        cli_args = self.parser.parse_args(["doctor", "--full"])
+
+        self.assertTrue(cli_args.full)
+
+    def test_subcmd_archive(self):
+        cli_args = self.parser.parse_args(["archive", "--before", "2020"])
+
+        self.assertEqual(cli_args.subcmd, "archive")
+        self.assertEqual(cli_args.before, 2020)
+
+    def test_subcmd_task_tree(self):
+        cli_args = self.parser.parse_args(["task", "tree", "--date-from", "2020-01"])
+
+        self.assertEqual(cli_args.type, "tree")
+        self.assertEqual(
+            cli_args.date_from, datetime(2020, 1, 1, tzinfo=LOCAL_TIMEZONE)
+        )
+        self.assertIsNone(cli_args.date_to)
+        self.assertIsNone(cli_args.depth)
+
+    def test_subcmd_task_report(self):
+        cli_args = self.parser.parse_args(["task", "report", "foo"])
+
+        self.assertEqual(cli_args.id, ["foo"])
+        self.assertFalse(cli_args.regex)
+        self.assertFalse(cli_args.combined)
+        self.assertEqual(cli_args.format, "text")
+        self.assertIsNone(cli_args.date_from)
+
+    def test_subcmd_task_report_patterns(self):
+        argv = ["task", "report", "PROJ-*", "orga", "--combined", "--format", "json"]
+        cli_args = self.parser.parse_args(argv)
+
+        self.assertEqual(cli_args.id, ["PROJ-*", "orga"])
+        self.assertTrue(cli_args.combined)
+        self.assertEqual(cli_args.format, "json")
+
+    def test_subcmd_report_task_depth(self):
+        cli_args = self.parser.parse_args(["report", "--task-depth", "2"])
+
+        self.assertEqual(cli_args.task_depth, 2)
+
+    def test_subcmd_report_logs(self):
+        argv = ["report", "--logs", "team/*.csv", "--processes", "4"]
+        cli_args = self.parser.parse_args(argv)
+
+        self.assertEqual(cli_args.logs, "team/*.csv")
+        self.assertEqual(cli_args.processes, 4)
+
+    def test_subcmd_report_format(self):
+        cli_args = self.parser.parse_args(["report", "--format", "csv"])
+
+        self.assertEqual(cli_args.format, "csv")
+
+    def test_subcmd_report_breaks(self):
+        cli_args = self.parser.parse_args(["report"])
+        self.assertIsNone(cli_args.breaks)
+
+        cli_args = self.parser.parse_args(["report", "--breaks", "max"])
+        self.assertEqual(cli_args.breaks, "max")
+
+        cli_args = self.parser.parse_args(["status", "--breaks", "actual"])
+        self.assertEqual(cli_args.breaks, "actual")
+
+    def test_subcmd_report_coverage(self):
+        self.assertFalse(self.parser.parse_args(["report"]).coverage)
+        self.assertTrue(self.parser.parse_args(["report", "--coverage"]).coverage)
+
+    def test_subcmd_report_split_overlap(self):
+        self.assertFalse(self.parser.parse_args(["report"]).split_overlap)
+        cli_args = self.parser.parse_args(["report", "--split-overlap"])
+        self.assertTrue(cli_args.split_overlap)
+
+    def test_subcmd_task_overlaps(self):
+        argv = ["task", "overlaps", "--date-from", "2020-01"]
+        cli_args = self.parser.parse_args(argv)
+
+        self.assertEqual(cli_args.type, "overlaps")
+        self.assertEqual(cli_args.date_from.month, 1)
+        self.assertIsNone(cli_args.date_to)
+
+    def test_subcmd_report_windows(self):
+        argv = ["report", "--window", "2020-12", "--window", "2020-01..2020-03"]
+        cli_args = self.parser.parse_args(argv)
+
+        self.assertEqual(
+            cli_args.window,
+            [
+                (
+                    datetime(2020, 12, 1, tzinfo=LOCAL_TIMEZONE),
+                    datetime(2021, 1, 1, tzinfo=LOCAL_TIMEZONE),
+                ),
+                (
+                    datetime(2020, 1, 1, tzinfo=LOCAL_TIMEZONE),
+                    datetime(2020, 3, 1, tzinfo=LOCAL_TIMEZONE),
+                ),
+            ],
+        )
+
+    @patch("sys.stderr", new_callable=StringIO)
+    def test_subcmd_report_windows_with_logs(self, mock_err):
+        with self.assertRaises(SystemExit):
+            self.parser.parse_args(["report", "--window", "2020-12", "--logs", "t/"])
+        self.assertIn("not allowed with argument", mock_err.getvalue())
+
+    def test_window_parser(self):
+        start, end = _window_parser("2020-W35")
+        self.assertEqual(end - start, timedelta(days=7))
+        start, end = _window_parser("2020-08-24")
+        self.assertEqual(end - start, timedelta(days=1))
+        with self.assertRaises(ArgumentTypeError):
+            _window_parser("2020-03..2020-01")
+
+    def test_windows_file_parser(self):
+        with tempfile.NamedTemporaryFile("w") as fh:
+            fh.write("# payroll\n2020-01\n\n2020-W02\n")
+            fh.flush()
+            windows = _windows_file_parser(fh.name)
+        self.assertEqual(len(windows), 2)
+        self.assertEqual(windows[0], _window_parser("2020-01"))
+
+        with self.assertRaises(ArgumentTypeError):
+            _windows_file_parser("/nonexistent/windows")
+
+    def test_subcmd_merge(self):
+        cli_args = self.parser.parse_args(["merge", "a", "b", "-o", "out"])
+
+        self.assertEqual(cli_args.logs, ["a", "b"])
+        self.assertEqual(cli_args.output, "out")
+
+    def test_subcmd_sync(self):
+        cli_args = self.parser.parse_args(["sync", "--with", "peer"])
+
+        self.assertEqual(cli_args.peer, "peer")
+
+    def test_subcmd_export(self):
+        argv = ["export", "-o", "out", "--format", "jsonl", "--category", "task"]
+        cli_args = self.parser.parse_args(argv)
+
+        self.assertEqual(cli_args.output, "out")
+        self.assertEqual(cli_args.format, "jsonl")
+        self.assertEqual(cli_args.category, "task")
+        self.assertIsNone(cli_args.date_from)
+
+    def test_subcmd_completion(self):
+        cli_args = self.parser.parse_args(["completion", "zsh"])
+
+        self.assertEqual(cli_args.subcmd, "completion")
+        self.assertEqual(cli_args.shell, "zsh")
+
+    def test_year_parser_invalid_value(self):
+        with self.assertRaises(ArgumentTypeError):
+            _year_parser("20")
+
     def test_subcmd_log(self):
         argv = ["log"]
         cli_args = self.parser.parse_args(argv)
@@ -0,0 +1,131 @@
+import unittest
+import json
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from urllib.request import urlopen
+from urllib.error import HTTPError
+
+from worklog.log import Log
+from worklog.server import QueryCache, _parse_date, create_server
+import worklog.constants as wc
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog").as_posix()
+        shutil.copy(
+            Path("worklog", "tests", "data", "report_with_tasks.csv").as_posix(),
+            self.fp,
+        )
+        self.log = Log(self.fp)
+        self.server = create_server(self.log, 0, 8, 10)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.tmpdir.cleanup()
+
+    def _get(self, path):
+        with urlopen(f"http://127.0.0.1:{self.port}{path}") as response:
+            return json.loads(response.read().decode())
+
+    def test_localhost_only(self):
+        self.assertEqual(self.server.server_address[0], "127.0.0.1")
+
+    def test_tasks(self):
+        self.assertEqual(self._get("/tasks"), {"task1": 4, "task2": 4})
+
+    def test_task_intervals(self):
+        actual = self._get("/tasks/task1")
+        self.assertEqual(actual["total"], 9 * 3600 + 50 * 60)
+        self.assertEqual(len(actual["intervals"]), 2)
+
+    def test_report(self):
+        actual = self._get("/report?date_from=2020-01-01&date_to=2020-03-01")
+        self.assertEqual(
+            {r["identifier"]: r["agg_time"] for r in actual["tasks"]},
+            {"task1": 9 * 3600 + 50 * 60, "task2": 17.5 * 3600},
+        )
+
+    def test_status(self):
+        with patch("worklog.constants.LOCAL_TIMEZONE", new=timezone.utc):
+            actual = self._get("/status?date=2020-01-01")
+        self.assertEqual(actual["is_active"], False)
+        self.assertEqual(actual["total_time"], 9 * 3600)
+
+    def test_task_fuzzy(self):
+        actual = self._get("/tasks/TASK1?fuzzy=1")
+        self.assertEqual(actual["task_id"], "task1")
+        with self.assertRaises(HTTPError) as err:
+            self._get("/tasks/task?fuzzy=1")
+        self.assertEqual(err.exception.code, 404)
+
+    def test_unknown_task(self):
+        with self.assertRaises(HTTPError) as err:
+            self._get("/tasks/foobar")
+        self.assertEqual(err.exception.code, 404)
+
+    def test_invalid_parameter(self):
+        with self.assertRaises(HTTPError) as err:
+            self._get("/report?date_from=2020-01-01")
+        self.assertEqual(err.exception.code, 400)
+
+    def test_cache_invalidated_on_append(self):
+        self.assertEqual(self._get("/tasks"), {"task1": 4, "task2": 4})
+
+        other = Log(self.fp)
+        other.append(
+            wc.TOKEN_TASK,
+            wc.TOKEN_START,
+            datetime(2020, 3, 1, 8, tzinfo=timezone.utc),
+            identifier="task3",
+        )
+
+        self.assertEqual(self._get("/tasks"), {"task1": 4, "task2": 4, "task3": 1})
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.log = Log(Path(self.tmpdir.name, "worklog").as_posix())
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_least_recently_used_dropped(self):
+        cache = QueryCache(self.log, max_size=2)
+        calls = []
+
+        def fn(i):
+            calls.append(i)
+            return i
+
+        cache.get("tasks", {"a": "1"}, lambda: fn(1))
+        cache.get("tasks", {"a": "2"}, lambda: fn(2))
+        cache.get("tasks", {"a": "1"}, lambda: fn(1))
+        cache.get("tasks", {"a": "3"}, lambda: fn(3))
+        self.assertEqual(len(cache._cache), 2)
+        # Parameters 2 have been used least recently
+        cache.get("tasks", {"a": "1"}, lambda: fn(1))
+        cache.get("tasks", {"a": "2"}, lambda: fn(2))
+        self.assertEqual(calls, [1, 2, 3, 2])
+
+
+class TestParseDate(unittest.TestCase):
+    def test_explicit_offset_kept(self):
+        dt = _parse_date("2020-01-01T08:00:00+02:00")
+        self.assertEqual(dt.utcoffset(), timedelta(hours=2))
+
+    def test_local_timezone(self):
+        with patch("worklog.constants.LOCAL_TIMEZONE", new=timezone.utc):
+            dt = _parse_date("2020-01-01")
+        self.assertEqual(dt, datetime(2020, 1, 1, tzinfo=timezone.utc))
@@ -0,0 +1,63 @@
+import unittest
+import tempfile
+from pathlib import Path
+from datetime import date, timedelta
+
+import worklog.constants as wc
+from worklog.tests.utils import read_log_sample
+from worklog.utils.time import extract_date_and_time
+from worklog.utils.archive import (
+    compute_rollups,
+    get_segment_fp,
+    list_segments,
+    open_segment,
+    read_rollups,
+    write_rollups,
+    write_segment,
+)
+
+
+class ReadMixin(object):
+    def _read(self, name):
+        df = read_log_sample(name)
+        return df.assign(date=extract_date_and_time(df)["date"])
+
+
+class TestRollups(unittest.TestCase, ReadMixin):
+    def test_compute_rollups(self):
+        rollups = compute_rollups(self._read("tasks_multiple_ordered"))
+
+        self.assertEqual(list(rollups[wc.COL_TASK_IDENTIFIER]), ["bar", "foo"])
+        self.assertEqual(list(rollups["duration"]), [1800.0, 3600.0])
+        self.assertEqual(list(rollups["entries"]), [2, 2])
+        self.assertEqual(list(rollups["date"]), [date(2020, 1, 1)] * 2)
+
+    def test_roundtrip(self):
+        rollups = compute_rollups(self._read("tasks_multiple_ordered"))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog").as_posix()
+            write_rollups(fp, 2020, rollups)
+            write_segment(fp, 2020, b"content")
+
+            df = read_rollups(fp)
+            self.assertEqual(df.shape[0], rollups.shape[0])
+            self.assertIsInstance(df["date"].iloc[0], date)
+            self.assertIsInstance(df["duration"].iloc[0], timedelta)
+
+            self.assertEqual(read_rollups(fp, years=[2019]).shape[0], 0)
+
+
+class TestSegments(unittest.TestCase, ReadMixin):
+    def test_write_and_read(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog").as_posix()
+            self.assertEqual(list_segments(fp), [])
+
+            rollups = compute_rollups(self._read("tasks_multiple_ordered"))
+            write_rollups(fp, 2019, rollups)
+            write_segment(fp, 2019, b"line1\nline2\n")
+
+            segments = list_segments(fp)
+            self.assertEqual(segments, [(2019, get_segment_fp(fp, 2019))])
+            with open_segment(segments[0][1]) as fh:
+                self.assertEqual(fh.read(), b"line1\nline2\n")
@@ -0,0 +1,105 @@
+import json
+import unittest
+import tempfile
+from datetime import date
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd  # type: ignore
+
+import worklog.constants as wc
+from worklog.errors import ExportDependencyError
+from worklog.utils.export import ChunkWriter, IntervalBuilder, to_export_events
+
+
+def _df(*entries):
+    return pd.DataFrame(
+        [
+            {
+                wc.COL_COMMIT_DATETIME: pd.Timestamp(dt),
+                wc.COL_LOG_DATETIME: pd.Timestamp(dt),
+                wc.COL_CATEGORY: category,
+                wc.COL_TYPE: type_,
+                wc.COL_TASK_IDENTIFIER: identifier,
+            }
+            for dt, category, type_, identifier in entries
+        ]
+    )
+
+
+ENTRIES = [
+    ("2020-01-01 08:00:00+01:00", "session", "start", None),
+    ("2020-01-01 09:00:00+01:00", "task", "start", "task1"),
+    ("2020-01-01 10:00:00+01:00", "task", "stop", "task1"),
+    ("2020-01-01 12:00:00+01:00", "task", "start", "task1"),
+    ("2020-01-01 12:30:00+01:00", "task", "stop", "task1"),
+    ("2020-01-01 17:00:00+01:00", "session", "stop", None),
+]
+
+
+class TestToExportEvents(unittest.TestCase):
+    def test_utc(self):
+        df = to_export_events(_df(*ENTRIES))
+        self.assertEqual(
+            df[wc.COL_LOG_DATETIME].iloc[0], pd.Timestamp("2020-01-01 07:00:00Z")
+        )
+
+
+class TestIntervalBuilder(unittest.TestCase):
+    def test_single_chunk(self):
+        df = IntervalBuilder().add(_df(*ENTRIES))
+        self.assertEqual(df["duration"].tolist(), [32400.0, 3600.0, 1800.0])
+        self.assertEqual(
+            df[wc.COL_TASK_IDENTIFIER].isna().tolist(), [True] + [False] * 2
+        )
+        self.assertEqual(df["start"].iloc[0], pd.Timestamp("2020-01-01 07:00:00Z"))
+        self.assertEqual(df["date"].tolist(), [date(2020, 1, 1)] * 3)
+
+    def test_chunks(self):
+        builder = IntervalBuilder()
+        dfs = [builder.add(_df(*ENTRIES[i : i + 2])) for i in range(0, 6, 2)]
+        self.assertEqual([df.shape[0] for df in dfs], [0, 1, 2])
+        self.assertEqual(
+            sorted(pd.concat(dfs)["duration"].tolist()), [1800.0, 3600.0, 32400.0]
+        )
+
+    def test_unmatched_entries_are_skipped(self):
+        df = IntervalBuilder().add(_df(ENTRIES[0], ENTRIES[2], ENTRIES[3]))
+        self.assertEqual(df.shape[0], 0)
+
+
+class TestChunkWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.intervals = IntervalBuilder().add(_df(*ENTRIES))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, fmt):
+        fp = Path(self.tmpdir.name, f"intervals.{fmt}")
+        writer = ChunkWriter(fp.as_posix(), fmt, "intervals")
+        writer.write(self.intervals.iloc[:1])
+        writer.write(self.intervals.iloc[1:])
+        writer.close()
+        self.assertEqual(writer.rows, 3)
+        return fp
+
+    def test_csv(self):
+        df = pd.read_csv(self._write("csv"))
+        self.assertEqual(df.shape[0], 3)
+        self.assertEqual(df["duration"].tolist(), [32400.0, 3600.0, 1800.0])
+
+    def test_jsonl(self):
+        lines = self._write("jsonl").read_text().splitlines()
+        self.assertEqual(len(lines), 3)
+        record = json.loads(lines[1])
+        self.assertEqual(record[wc.COL_TASK_IDENTIFIER], "task1")
+        self.assertEqual(record["start"], "2020-01-01T08:00:00Z")
+        self.assertEqual(record["date"], "2020-01-01")
+
+    @patch("worklog.utils.export.pa", None)
+    def test_missing_pyarrow(self):
+        for fmt in ["parquet", "arrow"]:
+            with self.assertRaises(ExportDependencyError):
+                ChunkWriter(Path(self.tmpdir.name, "x").as_posix(), fmt, "events")
@@ -1,9 +1,12 @@
+import json
 import unittest
 from datetime import timedelta
+from io import StringIO
 import numpy as np
 import pandas as pd
 
-from worklog.utils.formatting import format_timedelta
+import worklog.constants as wc
+from worklog.utils.formatting import ReportWriter, format_timedelta, format_timedeltas
 
 
 class TestTimeFormatting(unittest.TestCase):
@@ -55,3 +58,115 @@ class TestTimeFormatting(unittest.TestCase):
         expected = "480:00:00"
 
         self.assertEqual(actual, expected)
+
+    def test_format_timedelta_negative(self):
+        self.assertEqual(format_timedelta(timedelta(seconds=-90)), "-00:01:30")
+        self.assertEqual(format_timedelta(np.timedelta64(-90, "s")), "-00:01:30")
+
+
+class TestFormatTimedeltas(unittest.TestCase):
+    def test_column(self):
+        values = pd.to_timedelta(
+            ["0s", "100s", "1h5m30.9s", "2D", "20D", "-90s", "-22h", None]
+        )
+        self.assertEqual(
+            format_timedeltas(values).tolist(),
+            [
+                "00:00:00",
+                "00:01:40",
+                "01:05:30",
+                "48:00:00",
+                "480:00:00",
+                "-00:01:30",
+                "-22:00:00",
+                "00:00:00",
+            ],
+        )
+
+    def test_same_as_single_values(self):
+        values = pd.Series(pd.to_timedelta(np.arange(-5000, 400000, 997), unit="s"))
+        self.assertEqual(
+            format_timedeltas(values).tolist(), values.map(format_timedelta).tolist()
+        )
+
+    def test_empty(self):
+        self.assertEqual(format_timedeltas([]).tolist(), [])
+
+
+class TestReportWriter(unittest.TestCase):
+    def setUp(self):
+        self.day = pd.DataFrame(
+            {
+                wc.COL_LOG_DATETIME: pd.to_datetime(["2020-01-01", "2020-01-02"]),
+                "agg_time": pd.to_timedelta(["1h", "30min"]),
+            }
+        )
+        self.tasks = pd.DataFrame(
+            {wc.COL_TASK_IDENTIFIER: ["a,b"], "agg_time": pd.to_timedelta(["1h"])}
+        )
+
+    def _write(self, fmt):
+        fh = StringIO()
+        writer = ReportWriter(fh, fmt)
+        writer.begin()
+        writer.write("day", self.day)
+        writer.write("tasks", self.tasks)
+        writer.write("week", None)
+        writer.end()
+        return fh.getvalue()
+
+    def test_csv(self):
+        self.assertEqual(
+            self._write("csv").splitlines(),
+            [
+                "aggregation,date,task,total,break,bookable",
+                "day,2020-01-01,,3600.0,,",
+                "day,2020-01-02,,1800.0,,",
+                'tasks,,"a,b",3600.0,,',
+            ],
+        )
+
+    def test_json(self):
+        self.assertEqual(
+            json.loads(self._write("json")),
+            {
+                "day": [
+                    {"date": "2020-01-01", "total": 3600.0},
+                    {"date": "2020-01-02", "total": 1800.0},
+                ],
+                "tasks": [{"task": "a,b", "total": 3600.0}],
+                "week": [],
+            },
+        )
+
+    def test_keys(self):
+        fh = StringIO()
+        writer = ReportWriter(fh, "csv", keys=["window"])
+        for window in ["a", "b"]:
+            writer.begin(window=window)
+            writer.write("tasks", self.tasks)
+            writer.end()
+        self.assertEqual(
+            fh.getvalue().splitlines(),
+            [
+                "aggregation,window,date,task,total,break,bookable",
+                'tasks,a,,"a,b",3600.0,,',
+                'tasks,b,,"a,b",3600.0,,',
+            ],
+        )
+
+    def test_keys_json(self):
+        fh = StringIO()
+        writer = ReportWriter(fh, "json", keys=["window"])
+        for window in ["a", "b"]:
+            writer.begin(window=window)
+            writer.write("tasks", None)
+            writer.end()
+        self.assertEqual(
+            [json.loads(line) for line in fh.getvalue().splitlines()],
+            [{"window": "a", "tasks": []}, {"window": "b", "tasks": []}],
+        )
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            ReportWriter(StringIO(), "text")
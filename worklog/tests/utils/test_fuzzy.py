@@ -0,0 +1,111 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from worklog.utils.fuzzy import (
+    TrigramFile,
+    TrigramIndex,
+    add_trigrams,
+    get_trigrams_fp,
+    read_trigram_count,
+    trigrams,
+    write_trigrams,
+)
+
+
+class TestTrigrams(unittest.TestCase):
+    def test_padded(self):
+        self.assertEqual(trigrams("Ab"), {"  a", " ab", "ab "})
+
+    def test_unpadded(self):
+        self.assertEqual(trigrams("abcd", pad=False), {"abc", "bcd"})
+        self.assertEqual(trigrams("ab", pad=False), set())
+
+
+class TestTrigramIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TrigramIndex(
+            [
+                "PROJ-1234-refactor-xyz",
+                "PROJ-1235-fix-login",
+                "PROJ-2000-refactor-abc",
+                "orga-mails",
+            ]
+        )
+
+    def test_add(self):
+        self.assertEqual(len(self.index), 4)
+        self.index.add("orga-mails")
+        self.assertEqual(len(self.index), 4)
+        self.index.add("orga-meeting")
+        self.assertIn("orga-meeting", self.index)
+        self.assertEqual(self.index.search("orga-me"), ["orga-meeting"])
+
+    def test_prefix(self):
+        self.assertEqual(self.index.search("proj-1234"), ["PROJ-1234-refactor-xyz"])
+        self.assertEqual(
+            sorted(self.index.search("PROJ-123")),
+            ["PROJ-1234-refactor-xyz", "PROJ-1235-fix-login"],
+        )
+
+    def test_short_prefix(self):
+        self.assertEqual(self.index.search("or"), ["orga-mails"])
+
+    def test_substring(self):
+        self.assertEqual(self.index.search("login"), ["PROJ-1235-fix-login"])
+        self.assertEqual(
+            sorted(self.index.search("refactor")),
+            ["PROJ-1234-refactor-xyz", "PROJ-2000-refactor-abc"],
+        )
+
+    def test_prefix_before_substring(self):
+        self.index.add("mails")
+        self.assertEqual(self.index.search("mail"), ["mails"])
+
+    def test_similar(self):
+        self.assertEqual(self.index.search("orga-mail"), ["orga-mails"])
+        self.assertEqual(self.index.search("orag-mails"), ["orga-mails"])
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search("unrelated"), [])
+
+
+class TestTrigramFile(unittest.TestCase):
+    task_ids = [f"PROJ-{i}-ticket" for i in range(200)] + ["orga-mails", "Ümlaut"]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog").as_posix()
+        write_trigrams(self.fp, self.task_ids)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _file(self):
+        return TrigramFile(self.fp, lambda: list(self.task_ids))
+
+    def test_same_results_as_in_memory(self):
+        index = TrigramIndex(self.task_ids)
+        for query in ["PROJ-0-", "proj-19", "-199-", "orga", "orag-mails", "ümla", "o"]:
+            self.assertEqual(
+                sorted(self._file().search(query)), sorted(index.search(query))
+            )
+        self.assertEqual(read_trigram_count(self.fp), len(self.task_ids))
+
+    def test_all_trigrams(self):
+        index = TrigramIndex(self.task_ids)
+        trigram_file = self._file()
+        for trigram, task_ids in index._postings.items():
+            self.assertEqual(trigram_file._get_postings(trigram), task_ids)
+            self.assertEqual(trigram_file._count_postings(trigram), len(task_ids))
+        self.assertEqual(trigram_file._get_postings("zzz"), set())
+        self.assertTrue(Path(get_trigrams_fp(self.fp)).exists())
+
+    def test_add(self):
+        add_trigrams(self.fp, ["orga-meeting"], len(self.task_ids) + 1)
+        self.assertEqual(self._file().search("meeting"), ["orga-meeting"])
+        self.assertEqual(read_trigram_count(self.fp), len(self.task_ids) + 1)
+
+    def test_add_mismatch_removes_file(self):
+        add_trigrams(self.fp, ["orga-meeting"], len(self.task_ids) + 2)
+        self.assertIsNone(read_trigram_count(self.fp))
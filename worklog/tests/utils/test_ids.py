@@ -0,0 +1,225 @@
+import unittest
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from worklog.utils.ids import (
+    TaskStats,
+    build_index,
+    get_ids_fp,
+    rank_ids,
+    read_index,
+    read_ranked_ids,
+    sort_index,
+    update_index,
+    write_index,
+    write_task_list,
+)
+from worklog.utils.recovery import get_tail
+
+LOG = (
+    "2020-01-01T08:00:00+00:00|2020-01-01T08:00:00+00:00|session|start|\n"
+    "2020-01-01T08:00:00+00:00|2020-01-01T08:00:00+00:00|task|start|task1\n"
+    "2020-01-01T08:00:00+00:00|2020-01-01T08:30:00+00:00|task|stop|task1\n"
+    "2020-01-01T08:00:00+00:00|2020-01-01T09:00:00+00:00|task|start|task2\n"
+    "2020-01-01T08:00:00+00:00|2020-01-01T10:00:00+00:00|task|stop|task2\n"
+    "2020-01-01T08:00:00+00:00|2020-01-01T10:30:00+00:00|task|start|task1\n"
+    "2020-01-01T08:00:00+00:00|2020-01-01T10:45:00+00:00|task|stop|task1\n"
+    "2020-01-01T08:00:00+00:00|2020-01-01T17:00:00+00:00|session|stop|\n"
+)
+
+
+def _dt(value: str) -> datetime:
+    return datetime.fromisoformat(f"2020-01-01T{value}+00:00")
+
+
+class TestIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog").as_posix()
+        with open(self.fp, "w") as fh:
+            fh.write(LOG)
+        self.size = len(LOG)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_build(self):
+        index = build_index(self.fp, self.size)
+        self.assertEqual(set(index), {"task1", "task2"})
+        self.assertEqual(
+            index["task1"],
+            TaskStats(
+                4, _dt("08:00:00"), _dt("10:45:00"), timedelta(minutes=45), "stop"
+            ),
+        )
+        self.assertEqual(index["task2"].duration, timedelta(hours=1))
+
+    def test_build_ignores_bytes_beyond_size(self):
+        with open(self.fp, "a") as fh:
+            fh.write(
+                "2020-01-01T08:00:00+00:00|2020-01-01T18:00:00+00:00|task|start|task3\n"
+            )
+        self.assertNotIn("task3", build_index(self.fp, self.size))
+
+    def test_build_mixed_timestamp_formats(self):
+        with open(self.fp, "a") as fh:
+            fh.write(
+                "2020-01-01T08:00:00Z|2020-01-01T18:00:00Z|task|start|task3\n"
+                "2020-01-01T08:00:00Z|2020-01-01 20:00:00+0100|task|stop|task3\n"
+                "2020-01-01T08:00:00Z|yesterday|task|start|task4\n"
+            )
+        with self.assertLogs("worklog", level="WARNING"):
+            index = build_index(self.fp, len(LOG) + 1000)
+        self.assertNotIn("task4", index)
+        self.assertEqual(index["task3"].duration, timedelta(hours=1))
+        self.assertEqual(index["task3"].last_seen.utcoffset(), timedelta(0))
+        self.assertEqual(rank_ids(index)[0], "task1")
+
+    def test_build_from_rollups(self):
+        rollup_fp = Path(self.tmpdir.name, "2019.rollup.csv").as_posix()
+        with open(rollup_fp, "w") as fh:
+            fh.write(
+                "category|date|log_dt|identifier|duration|entries\n"
+                "session|2019-12-31|2019-12-31 17:00:00+00:00||28800.0|2\n"
+                "task|2019-12-31|2019-12-31 12:00:00+00:00|task1|3600.0|2\n"
+                "task|2019-12-31|2019-12-31 15:00:00+00:00|task3|600.0|2\n"
+            )
+        index = build_index(self.fp, self.size, rollup_fps=[rollup_fp])
+        self.assertEqual(index["task1"].count, 6)
+        self.assertEqual(index["task1"].duration, timedelta(minutes=105))
+        self.assertEqual(index["task1"].last_seen, _dt("10:45:00"))
+        self.assertEqual(index["task3"].count, 2)
+        self.assertEqual(index["task3"].last_type, "stop")
+
+    def test_update(self):
+        index = build_index(self.fp, self.size)
+        updated = update_index(
+            index,
+            [
+                (_dt("11:00:00"), "task", "start", "task2"),
+                (_dt("11:30:00"), "task", "stop", "task2"),
+                (_dt("12:00:00"), "task", "start", "task3"),
+                (_dt("12:00:00"), "session", "start", None),
+            ],
+        )
+        self.assertEqual(updated["task2"].count, 4)
+        self.assertEqual(updated["task2"].duration, timedelta(minutes=90))
+        self.assertEqual(updated["task3"].count, 1)
+        self.assertEqual(updated["task3"].last_type, "start")
+        # The original index is left untouched
+        self.assertEqual(index["task2"].count, 2)
+
+    def test_update_out_of_order(self):
+        index = build_index(self.fp, self.size)
+        updated = update_index(index, [(_dt("09:00:00"), "task", "start", "task1")])
+        self.assertIsNone(updated)
+
+    def test_write_and_read(self):
+        index = build_index(self.fp, self.size)
+        write_index(self.fp, index, self.size, LOG[-20:].encode())
+        self.assertEqual(read_index(self.fp), index)
+
+    def test_read_outdated(self):
+        index = build_index(self.fp, self.size)
+        write_index(self.fp, index, self.size, LOG[-20:].encode())
+        with open(self.fp, "a") as fh:
+            fh.write("\n")
+        self.assertIsNone(read_index(self.fp))
+
+    def test_read_ranked_ids(self):
+        index = build_index(self.fp, self.size)
+        write_index(self.fp, index, self.size, LOG[-20:].encode())
+        self.assertEqual(read_ranked_ids(self.fp), ["task1", "task2"])
+        self.assertEqual(read_ranked_ids(self.fp, "task2"), ["task2"])
+        self.assertEqual(read_ranked_ids(self.fp, "other"), [])
+
+        with open(self.fp, "a") as fh:
+            fh.write("\n")
+        self.assertIsNone(read_ranked_ids(self.fp))
+
+    def test_read_missing_or_corrupt(self):
+        self.assertIsNone(read_index(self.fp))
+        with open(get_ids_fp(self.fp), "w") as fh:
+            fh.write("{")
+        self.assertIsNone(read_index(self.fp))
+
+
+class TestSortIndex(unittest.TestCase):
+    def setUp(self):
+        start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        self.index = {
+            "b": TaskStats(4, start, start + timedelta(hours=3), timedelta(0), "stop"),
+            "a": TaskStats(2, start, start + timedelta(hours=1), timedelta(2), "stop"),
+            "c": TaskStats(4, start, start + timedelta(hours=2), timedelta(1), "stop"),
+        }
+
+    def _sorted(self, sort, limit=None):
+        return [task for task, _ in sort_index(self.index, sort, limit)]
+
+    def test_sort(self):
+        self.assertEqual(self._sorted("name"), ["a", "b", "c"])
+        self.assertEqual(self._sorted("count"), ["b", "c", "a"])
+        self.assertEqual(self._sorted("recent"), ["b", "c", "a"])
+        self.assertEqual(self._sorted("time"), ["a", "c", "b"])
+
+    def test_rank(self):
+        # c is used as often as b, but two months before the latest entry
+        start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        self.index["c"] = self.index["c"]._replace(last_seen=start - timedelta(60))
+        self.assertEqual(rank_ids(self.index), ["b", "a", "c"])
+        self.assertEqual(rank_ids({}), [])
+
+    def test_limit(self):
+        self.assertEqual(self._sorted("name", limit=2), ["a", "b"])
+
+    def test_write_task_list(self):
+        with patch("sys.stdout", new_callable=StringIO) as mock_out:
+            write_task_list(self.index, sort="count", limit=2)
+        self.assertEqual(
+            mock_out.getvalue(), "These tasks are listed in the log:\nb (4)\nc (4)\n"
+        )
+
+
+class TestRunTaskList(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog").as_posix()
+        with open(self.fp, "w") as fh:
+            fh.write(LOG)
+        self.cfg_fp = Path(self.tmpdir.name, "config").as_posix()
+        with open(self.cfg_fp, "w") as fh:
+            fh.write(f"[worklog]\npath = {self.fp}\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _run(self):
+        code = (
+            "import sys; import worklog; import worklog.constants as wc; "
+            f"wc.CONFIG_FILES.append({self.cfg_fp!r}); "
+            "sys.argv = ['wl', 'task', 'list', '--sort', 'count']; worklog.run(); "
+            "sys.exit('pandas' in sys.modules)"
+        )
+        return subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True
+        )
+
+    def test_served_from_index_without_pandas(self):
+        index = build_index(self.fp, len(LOG))
+        write_index(self.fp, index, len(LOG), get_tail(self.fp, len(LOG)))
+        result = self._run()
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(
+            result.stdout, "These tasks are listed in the log:\ntask1 (4)\ntask2 (2)\n"
+        )
+
+    def test_rebuilds_missing_index(self):
+        result = self._run()
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("task1 (4)", result.stdout)
+        self.assertTrue(Path(get_ids_fp(self.fp)).exists())
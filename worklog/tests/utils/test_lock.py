@@ -0,0 +1,18 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from worklog.utils.lock import append_bytes, file_lock
+
+
+class TestAppendBytes(unittest.TestCase):
+    def test_returns_write_position(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog").as_posix()
+            with file_lock(fp):
+                first = append_bytes(fp, b"abc\n")
+                second = append_bytes(fp, b"defg\n")
+            content = Path(fp).read_bytes()
+
+        self.assertEqual((first, second), (0, 4))
+        self.assertEqual(content, b"abc\ndefg\n")
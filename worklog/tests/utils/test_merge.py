@@ -0,0 +1,200 @@
+import unittest
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from worklog.utils.merge import (
+    RecordMerger,
+    RecordReader,
+    merge_logs,
+    parse_record,
+    read_sync_offset,
+    sorted_records,
+    write_sync_offset,
+)
+
+
+def _line(time, category="session", type_="start", identifier="", commit=None):
+    commit = commit or time
+    return (
+        f"2020-01-01 {commit}+00:00|2020-01-01 {time}+00:00|"
+        f"{category}|{type_}|{identifier}\n"
+    )
+
+
+class TestParseRecord(unittest.TestCase):
+    def test_parse(self):
+        record = parse_record(_line("08:00:00", "task", "start", "task1").encode())
+        self.assertEqual(record.log_dt, datetime(2020, 1, 1, 8, tzinfo=timezone.utc))
+        self.assertEqual(record.identifier, "task1")
+        self.assertTrue(record.line.endswith(b"\n"))
+
+    def test_skip(self):
+        self.assertIsNone(parse_record(b"# comment\n"))
+        self.assertIsNone(parse_record(b"\n"))
+        self.assertIsNone(parse_record(_line("08:00:00").encode()[:30]))
+
+
+class TestRecordReader(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_offset(self):
+        first = _line("08:00:00")
+        self.fp.write_text(first + _line("17:00:00", type_="stop"))
+        reader = RecordReader(self.fp.as_posix(), offset=len(first))
+        self.assertEqual([r.type for r in reader], ["stop"])
+        self.assertEqual(reader.offset, self.fp.stat().st_size)
+
+    def test_partial_last_line(self):
+        first = _line("08:00:00")
+        self.fp.write_text(first + _line("17:00:00")[:30])
+        reader = RecordReader(self.fp.as_posix())
+        self.assertEqual(len(list(reader)), 1)
+        self.assertEqual(reader.offset, len(first))
+
+    def test_sorted_records(self):
+        self.fp.write_text(_line("09:00:00") + _line("08:00:00"))
+        records = list(sorted_records(self.fp.as_posix()))
+        self.assertEqual([r.log_dt.hour for r in records], [8, 9])
+
+
+class TestRecordMerger(unittest.TestCase):
+    def _records(self, *lines):
+        return [parse_record(line.encode()) for line in lines]
+
+    def test_deduplicate(self):
+        a = self._records(_line("08:00:00"), _line("09:00:00", "task", "start", "t"))
+        b = self._records(
+            _line("08:00:00", "task", "start", "t"), _line("08:00:00"),
+        )
+        merger = RecordMerger()
+        merged = list(merger.merge([a, b]))
+        self.assertEqual(len(merged), 3)
+        self.assertEqual(merger.duplicates, 1)
+        self.assertEqual(merger.conflicts, [])
+
+    def test_same_entry_committed_twice(self):
+        """Records with different commit times are not duplicates."""
+        a = self._records(_line("08:00:00", commit="08:00:00"))
+        b = self._records(_line("08:00:00", commit="08:01:00"))
+        merger = RecordMerger()
+        self.assertEqual(len(list(merger.merge([a, b]))), 2)
+        self.assertEqual(len(merger.conflicts), 1)
+
+    def test_conflicts(self):
+        a = self._records(_line("08:00:00"), _line("12:00:00", type_="stop"))
+        b = self._records(_line("10:00:00"), _line("17:00:00", type_="stop"))
+        merger = RecordMerger()
+        list(merger.merge([a, b]))
+        self.assertEqual(
+            merger.conflicts,
+            [
+                "Session started at 2020-01-01 10:00:00+00:00 while a session "
+                "is running",
+                "Session stopped at 2020-01-01 17:00:00+00:00 while no session "
+                "is running",
+            ],
+        )
+
+
+class TestMergeLogs(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_merge(self):
+        (self.dir / "a").write_text(_line("08:00:00") + _line("12:00:00", type_="stop"))
+        (self.dir / "b").write_text(
+            _line("13:00:00") + _line("08:00:00") + _line("17:00:00", type_="stop")
+        )
+        out = self.dir / "out"
+        result = merge_logs([(self.dir / n).as_posix() for n in "ab"], out.as_posix())
+
+        self.assertEqual(result.records, 4)
+        self.assertEqual(result.duplicates, 1)
+        self.assertEqual(result.conflicts, [])
+        self.assertEqual(
+            out.read_text(),
+            _line("08:00:00")
+            + _line("12:00:00", type_="stop")
+            + _line("13:00:00")
+            + _line("17:00:00", type_="stop"),
+        )
+
+    def test_merge_mixed_timestamp_formats(self):
+        a = (
+            "2020-01-01T08:00:00Z|2020-01-01T08:00:00Z|session|start|\n"
+            "2020-01-01T12:00:00Z|2020-01-01T12:00:00Z|session|stop|\n"
+        )
+        b = (
+            "2020-01-01 09:00:00+0100|2020-01-01 09:00:00+0100|session|start|\n"
+            "2020-01-01 14:00:00+01|2020-01-01 14:00:00+01|session|start|\n"
+            "2020-01-01 11:00:00-0600|2020-01-01 11:00:00-0600|session|stop|\n"
+        )
+        (self.dir / "a").write_text(a)
+        (self.dir / "b").write_text(b)
+        out = self.dir / "out"
+        result = merge_logs([(self.dir / n).as_posix() for n in "ab"], out.as_posix())
+
+        self.assertEqual(result.records, 4)
+        self.assertEqual(result.duplicates, 1)
+        self.assertEqual(result.conflicts, [])
+        lines = out.read_text().splitlines()
+        self.assertEqual(
+            [line.split("|")[1] for line in lines],
+            [
+                "2020-01-01T08:00:00Z",
+                "2020-01-01T12:00:00Z",
+                "2020-01-01 14:00:00+01",
+                "2020-01-01 11:00:00-0600",
+            ],
+        )
+
+    def test_merge_naive_and_aware(self):
+        naive = datetime(2020, 1, 1, 8).astimezone(timezone.utc)
+        (self.dir / "a").write_text(
+            "2020-01-01T08:00:00|2020-01-01T08:00:00|session|start|\n"
+        )
+        (self.dir / "b").write_text(
+            f"{naive.isoformat()}|{naive.isoformat()}|session|start|\n"
+            "2020-01-01T00:00:00Z|2020-01-01T00:00:00Z|session|stop|\n"
+        )
+        out = self.dir / "out"
+        result = merge_logs([(self.dir / n).as_posix() for n in "ab"], out.as_posix())
+
+        self.assertEqual(result.records, 2)
+        self.assertEqual(result.duplicates, 1)
+
+
+class TestSyncOffset(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog").as_posix()
+        self.peer = Path(self.tmpdir.name, "peer")
+        self.peer.write_text(_line("08:00:00"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_unknown_peer(self):
+        self.assertEqual(read_sync_offset(self.fp, self.peer.as_posix()), 0)
+
+    def test_roundtrip(self):
+        size = self.peer.stat().st_size
+        write_sync_offset(self.fp, self.peer.as_posix(), size)
+        with open(self.peer, "a") as fh:
+            fh.write(_line("17:00:00", type_="stop"))
+        self.assertEqual(read_sync_offset(self.fp, self.peer.as_posix()), size)
+
+    def test_rewritten_peer(self):
+        write_sync_offset(self.fp, self.peer.as_posix(), self.peer.stat().st_size)
+        self.peer.write_text(_line("09:00:00"))
+        self.assertEqual(read_sync_offset(self.fp, self.peer.as_posix()), 0)
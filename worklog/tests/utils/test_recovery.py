@@ -0,0 +1,118 @@
+import unittest
+import tempfile
+from pathlib import Path
+
+from worklog.utils.recovery import (
+    find_last_line,
+    has_torn_tail,
+    is_complete_record,
+    open_prefix,
+    quarantine_from,
+    quarantine_tail,
+    get_quarantine_fp,
+    read_tail,
+    read_journal,
+    remove_journal,
+    write_journal,
+)
+
+RECORD = b"2020-01-01 08:00:00+00:00|2020-01-01 08:00:00+00:00|task|start|task1"
+
+
+class TestCompleteRecord(unittest.TestCase):
+    def test_complete(self):
+        self.assertTrue(is_complete_record(RECORD))
+        self.assertTrue(is_complete_record(RECORD + b"\n"))
+
+    def test_session_without_identifier(self):
+        record = b"2020-01-01 08:00:00+00:00|2020-01-01 08:00:00+00:00|session|start|"
+        self.assertTrue(is_complete_record(record))
+
+    def test_timestamp_formats_of_reader(self):
+        record = b"2020/01/01 08:00:00+00:00|2020-01-01T08:00:00Z|session|start|"
+        self.assertTrue(is_complete_record(record))
+
+    def test_partial(self):
+        self.assertFalse(is_complete_record(RECORD[:-5]))
+        self.assertFalse(is_complete_record(RECORD[:20]))
+        self.assertFalse(is_complete_record(b""))
+
+
+class TestTornTail(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog").as_posix()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, data: bytes):
+        with open(self.fp, "wb") as fh:
+            fh.write(data)
+
+    def test_find_last_line(self):
+        self._write(RECORD + b"\n" + RECORD + b"\n")
+        self.assertEqual(find_last_line(self.fp, 2 * len(RECORD) + 2), len(RECORD) + 1)
+        self.assertEqual(
+            find_last_line(self.fp, 2 * len(RECORD) + 2, chunk_size=3),
+            len(RECORD) + 1,
+        )
+
+    def test_find_last_line_single(self):
+        self._write(RECORD)
+        self.assertEqual(find_last_line(self.fp, len(RECORD)), 0)
+
+    def test_read_tail(self):
+        self._write(RECORD + b"\n" + RECORD + b"\n")
+        self.assertEqual(read_tail(self.fp, len(RECORD) + 1, 5), b"ask1\n")
+        # Never reads beyond the given size
+        self.assertEqual(read_tail(self.fp, 3, 256), RECORD[:3])
+
+    def test_open_prefix(self):
+        self._write(RECORD + b"\n" + RECORD + b"\n")
+        with open_prefix(self.fp, len(RECORD) + 1) as fh:
+            self.assertEqual(fh.readlines(), [RECORD + b"\n"])
+        with open_prefix(self.fp, 5) as fh:
+            self.assertEqual(fh.read(3) + fh.read(), RECORD[:5])
+
+    def test_not_torn(self):
+        self._write(RECORD + b"\n")
+        self.assertFalse(has_torn_tail(self.fp))
+        # A complete record w/o trailing newline is fine as well
+        self._write(RECORD)
+        self.assertFalse(has_torn_tail(self.fp))
+
+    def test_torn(self):
+        self._write(RECORD + b"\n" + RECORD[:30])
+        self.assertTrue(has_torn_tail(self.fp))
+
+    def test_quarantine(self):
+        self._write(RECORD + b"\n" + RECORD[:30])
+        tail = quarantine_tail(self.fp)
+
+        self.assertEqual(tail, RECORD[:30])
+        with open(self.fp, "rb") as fh:
+            self.assertEqual(fh.read(), RECORD + b"\n")
+        with open(get_quarantine_fp(self.fp), "rb") as fh:
+            self.assertEqual(fh.read(), RECORD[:30] + b"\n")
+
+    def test_quarantine_from(self):
+        self._write(RECORD + b"\n" + RECORD + b"\n")
+        tail = quarantine_from(self.fp, len(RECORD) + 1)
+
+        self.assertEqual(tail, RECORD + b"\n")
+        with open(self.fp, "rb") as fh:
+            self.assertEqual(fh.read(), RECORD + b"\n")
+        with open(get_quarantine_fp(self.fp), "rb") as fh:
+            self.assertEqual(fh.read(), RECORD + b"\n")
+
+
+class TestJournal(unittest.TestCase):
+    def test_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            fp = Path(tmpdir, "worklog").as_posix()
+            self.assertIsNone(read_journal(fp))
+            write_journal(fp, 10, RECORD)
+            self.assertEqual(read_journal(fp), (10, RECORD))
+            remove_journal(fp)
+            self.assertIsNone(read_journal(fp))
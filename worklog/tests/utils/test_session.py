@@ -1,7 +1,8 @@
 import unittest
 from unittest.mock import patch
 import logging
-from datetime import datetime, date, timezone
+from datetime import datetime, date, timedelta, timezone
+import pandas as pd  # type: ignore
 
 from worklog.utils.schema import empty_df_from_schema
 import worklog.constants as wc
@@ -9,6 +10,7 @@ from worklog.utils.session import (
     check_order_session,
     sentinel_datetime,
     is_active_session,
+    session_gaps,
 )
 from worklog.errors import ErrMsg
 from worklog.tests.utils import read_log_sample
@@ -128,3 +130,51 @@ class TestSessionActivity(unittest.TestCase):
         actual = is_active_session(df)
 
         self.assertTrue(actual)
+
+
+class TestSessionGaps(unittest.TestCase):
+    def _df(self, entries):
+        log_dts = pd.to_datetime([log_dt for log_dt, _ in entries], utc=True)
+        return pd.DataFrame(
+            {
+                wc.COL_LOG_DATETIME: log_dts,
+                wc.COL_TYPE: [type_ for _, type_ in entries],
+                "date": log_dts.date,
+            }
+        )
+
+    def test_gaps_per_day(self):
+        df = self._df(
+            [
+                ("2020-01-01 08:00", "start"),
+                ("2020-01-01 12:00", "stop"),
+                ("2020-01-01 12:30", "start"),
+                ("2020-01-01 15:00", "stop"),
+                ("2020-01-01 15:15", "start"),
+                ("2020-01-01 17:00", "stop"),
+                ("2020-01-02 08:00", "start"),
+                ("2020-01-02 16:00", "stop"),
+                ("2020-01-03 08:00", "start"),
+                ("2020-01-03 09:00", "stop"),
+            ]
+        )
+        # The order of the entries does not matter
+        actual = session_gaps(df.sample(frac=1, random_state=0))
+        self.assertEqual(
+            actual.to_dict(), {date(2020, 1, 1): timedelta(minutes=45)},
+        )
+
+    def test_no_gaps(self):
+        df = self._df([("2020-01-01 08:00", "start"), ("2020-01-01 12:00", "stop")])
+        self.assertEqual(len(session_gaps(df)), 0)
+        self.assertEqual(len(session_gaps(df.iloc[:0])), 0)
+
+    def test_open_session(self):
+        df = self._df(
+            [
+                ("2020-01-01 08:00", "start"),
+                ("2020-01-01 12:00", "stop"),
+                ("2020-01-01 13:00", "start"),
+            ]
+        )
+        self.assertEqual(len(session_gaps(df)), 0)
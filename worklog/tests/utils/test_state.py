@@ -0,0 +1,93 @@
+import unittest
+import tempfile
+from pathlib import Path
+from datetime import datetime, timezone
+
+import worklog.constants as wc
+from worklog.tests.utils import read_log_sample
+from worklog.utils.recovery import get_tail
+from worklog.utils.state import (
+    ActiveState,
+    read_state,
+    state_from_df,
+    update_state,
+    write_state,
+)
+
+
+def _dt(hour: int) -> datetime:
+    return datetime(2020, 1, 1, hour, tzinfo=timezone.utc)
+
+
+class TestStateFromDf(unittest.TestCase):
+    def test_tasks_started(self):
+        df = read_log_sample("tasks_multiple_started")
+        state = state_from_df(df)
+        self.assertEqual(sorted(state.tasks.keys()), ["task1", "task3"])
+
+    def test_session_open(self):
+        df = read_log_sample("session_simple_open")
+        state = state_from_df(df)
+        self.assertIsNotNone(state.session)
+
+    def test_session_closed(self):
+        df = read_log_sample("session_simple")
+        state = state_from_df(df)
+        self.assertIsNone(state.session)
+
+
+class TestUpdateState(unittest.TestCase):
+    def test_update(self):
+        state = ActiveState(None, {}, None)
+        state = update_state(
+            state,
+            [
+                (_dt(8), wc.TOKEN_SESSION, wc.TOKEN_START, None),
+                (_dt(9), wc.TOKEN_TASK, wc.TOKEN_START, "task1"),
+                (_dt(10), wc.TOKEN_TASK, wc.TOKEN_START, "task2"),
+                (_dt(11), wc.TOKEN_TASK, wc.TOKEN_STOP, "task1"),
+            ],
+        )
+        self.assertEqual(state, ActiveState(_dt(8), {"task2": _dt(10)}, _dt(11)))
+
+    def test_backdated_record(self):
+        state = ActiveState(_dt(8), {}, _dt(8))
+        actual = update_state(state, [(_dt(7), wc.TOKEN_TASK, wc.TOKEN_START, "t")])
+        self.assertIsNone(actual)
+
+
+class TestStateFile(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fp = Path(self.tmpdir.name, "worklog").as_posix()
+        with open(self.fp, "wb") as fh:
+            fh.write(b"line1\nline2\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_roundtrip(self):
+        state = ActiveState(_dt(8), {"task1": _dt(9)}, _dt(9))
+        write_state(self.fp, state, 12, get_tail(self.fp, 12))
+        self.assertEqual(read_state(self.fp), state)
+
+    def test_missing(self):
+        self.assertIsNone(read_state(self.fp))
+
+    def test_inconsistent_size(self):
+        state = ActiveState(None, {}, None)
+        write_state(self.fp, state, 12, get_tail(self.fp, 12))
+        with open(self.fp, "ab") as fh:
+            fh.write(b"line3\n")
+        self.assertIsNone(read_state(self.fp))
+
+    def test_inconsistent_tail(self):
+        state = ActiveState(None, {}, None)
+        write_state(self.fp, state, 12, get_tail(self.fp, 12))
+        with open(self.fp, "wb") as fh:
+            fh.write(b"line1\nline3\n")
+        self.assertIsNone(read_state(self.fp))
+
+    def test_get_tail(self):
+        self.assertEqual(get_tail(self.fp, 12), b"line2\n")
+        self.assertEqual(get_tail(self.fp, 12, n=3), b"e2\n")
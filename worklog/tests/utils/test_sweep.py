@@ -0,0 +1,155 @@
+import unittest
+from datetime import timedelta, timezone
+
+import pandas as pd  # type: ignore
+
+import worklog.constants as wc
+from worklog.utils.sweep import calc_coverage, find_overlaps, split_overlaps, sweep
+
+
+def _intervals(*intervals):
+    return pd.DataFrame(
+        {
+            "start": pd.to_datetime([start for start, _ in intervals], utc=True),
+            "stop": pd.to_datetime([stop for _, stop in intervals], utc=True),
+        }
+    )
+
+
+def _tasks(*tasks):
+    df = _intervals(*[(start, stop) for _, start, stop in tasks])
+    df[wc.COL_TASK_IDENTIFIER] = [task_id for task_id, _, _ in tasks]
+    return df
+
+
+TASKS = _tasks(
+    ("task1", "2020-01-01 08:00", "2020-01-01 10:00"),
+    ("task2", "2020-01-01 09:00", "2020-01-01 11:00"),
+    ("task3", "2020-01-01 09:30", "2020-01-01 10:00"),
+    ("task1", "2020-01-01 12:00", "2020-01-01 13:00"),
+    ("task2", "2020-01-01 13:00", "2020-01-01 14:00"),
+)
+
+
+class TestSweep(unittest.TestCase):
+    def test_counts(self):
+        df = sweep(
+            [
+                _intervals(
+                    ("2020-01-01 08:00", "2020-01-01 10:00"),
+                    ("2020-01-01 09:00", "2020-01-01 11:00"),
+                )
+            ],
+            timezone.utc,
+        )
+        # Segments before the first endpoint start at midnight
+        self.assertEqual(df["count_0"].tolist(), [0, 1, 2, 1])
+        self.assertEqual(
+            df["duration"].tolist(),
+            [
+                timedelta(hours=8),
+                timedelta(hours=1),
+                timedelta(hours=1),
+                timedelta(hours=1),
+            ],
+        )
+
+    def test_split_at_midnight(self):
+        df = sweep([_intervals(("2020-01-01 22:00", "2020-01-02 02:00"))], timezone.utc)
+        df = df[df["count_0"] > 0]
+        self.assertEqual(
+            df.groupby(df[wc.COL_LOG_DATETIME].dt.day)["duration"].sum().to_dict(),
+            {1: timedelta(hours=2), 2: timedelta(hours=2)},
+        )
+
+    def test_empty(self):
+        df = sweep([_intervals(), _intervals()], timezone.utc)
+        self.assertEqual(df.shape[0], 0)
+        self.assertIn("count_1", df.columns)
+
+
+class TestCoverage(unittest.TestCase):
+    def test_coverage(self):
+        sessions = _intervals(
+            ("2020-01-01 08:00", "2020-01-01 12:00"),
+            ("2020-01-01 13:00", "2020-01-01 17:00"),
+        )
+        tasks = _intervals(
+            # Overlapping tasks are counted once
+            ("2020-01-01 08:00", "2020-01-01 11:00"),
+            ("2020-01-01 10:00", "2020-01-01 11:30"),
+            # Partly outside of the sessions
+            ("2020-01-01 12:30", "2020-01-01 16:00"),
+        )
+        df = calc_coverage(sessions, tasks, timezone.utc)
+        self.assertEqual(
+            df.iloc[0].to_dict(),
+            {
+                wc.COL_LOG_DATETIME: pd.Timestamp("2020-01-01", tz="UTC"),
+                "session_time": timedelta(hours=8),
+                "task_time": timedelta(hours=7),
+                "untracked": timedelta(hours=1, minutes=30),
+                "outside": timedelta(minutes=30),
+            },
+        )
+        self.assertEqual(df.shape[0], 1)
+
+    def test_days_in_timezone(self):
+        sessions = _intervals(("2020-01-01 22:00", "2020-01-02 02:00"))
+        tz = timezone(timedelta(hours=3))
+        df = calc_coverage(sessions, _intervals(), tz)
+        # 01:00 - 05:00 in UTC+3
+        self.assertEqual(df[wc.COL_LOG_DATETIME].dt.day.tolist(), [2])
+        self.assertEqual(df["untracked"].tolist(), [timedelta(hours=4)])
+
+    def test_empty(self):
+        df = calc_coverage(_intervals(), _intervals(), timezone.utc)
+        self.assertEqual(df.shape[0], 0)
+
+
+class TestOverlaps(unittest.TestCase):
+    def test_split_overlaps(self):
+        actual = split_overlaps(TASKS)
+        self.assertEqual(
+            actual.tolist(),
+            [
+                timedelta(hours=1, minutes=25),
+                timedelta(hours=1, minutes=25),
+                timedelta(minutes=10),
+                timedelta(hours=1),
+                timedelta(hours=1),
+            ],
+        )
+        # The split durations add up to the time with any task running
+        self.assertEqual(actual.sum(), timedelta(hours=5))
+
+    def test_split_overlaps_empty(self):
+        self.assertEqual(len(split_overlaps(_tasks())), 0)
+
+    def test_find_overlaps(self):
+        df = find_overlaps(TASKS, timezone.utc)
+        # Tasks that end when others start do not overlap
+        self.assertEqual(df.shape[0], 1)
+        self.assertEqual(
+            df.iloc[0].to_dict(),
+            {
+                "start": pd.Timestamp("2020-01-01 09:00", tz="UTC"),
+                "stop": pd.Timestamp("2020-01-01 10:00", tz="UTC"),
+                "duration": timedelta(hours=1),
+                "concurrency": 3,
+                "tasks": "task1, task2, task3",
+            },
+        )
+
+    def test_find_overlaps_across_periods(self):
+        tasks = _tasks(
+            ("long", "2020-01-01 08:00", "2020-01-01 18:00"),
+            ("a", "2020-01-01 09:00", "2020-01-01 10:00"),
+            ("b", "2020-01-01 11:00", "2020-01-01 12:00"),
+        )
+        df = find_overlaps(tasks, timezone.utc)
+        self.assertEqual(df["tasks"].tolist(), ["a, long", "b, long"])
+        self.assertEqual(df["concurrency"].tolist(), [2, 2])
+
+    def test_find_overlaps_empty(self):
+        self.assertEqual(find_overlaps(_tasks(), timezone.utc).shape[0], 0)
@@ -12,8 +12,10 @@ from worklog.utils.tasks import (
     _calc_single_task_duration,
     calc_task_durations,
     extract_intervals,
+    extract_intervals_by_task,
     get_active_task_ids,
     get_all_task_ids_with_duration,
+    match_task_ids,
 )
 
 
@@ -128,6 +130,72 @@ class TestTaskIntervals(unittest.TestCase):
         )
 
 
+class TestTaskIntervalsByTask(unittest.TestCase):
+    samples = [
+        "tasks_simple_ordered",
+        "tasks_start_missing",
+        "tasks_open_interval",
+        "tasks_invalid_type",
+        "tasks_multiple_nested",
+    ]
+
+    def test_empty_dataframe(self):
+        actual = extract_intervals_by_task(DataFrame())
+        self.assertEqual(
+            actual.columns.tolist(),
+            [wc.COL_TASK_IDENTIFIER, "date", "start", "stop", "interval"],
+        )
+        self.assertEqual(actual.shape[0], 0)
+
+    def test_equals_extract_intervals(self):
+        """Each task yields the same intervals and errors as one at a time."""
+        for sample in self.samples:
+            with self.subTest(sample=sample):
+                df = read_log_sample(sample)
+                df = df[df[wc.COL_CATEGORY] == wc.TOKEN_TASK]
+                mock_logger = Mock(logging.Logger)
+                actual = extract_intervals_by_task(df, logger=mock_logger)
+
+                expected_logger = Mock(logging.Logger)
+                for task_id, task_df in df.groupby(wc.COL_TASK_IDENTIFIER):
+                    expected = extract_intervals(task_df, logger=expected_logger)
+                    task_actual = actual[actual[wc.COL_TASK_IDENTIFIER] == task_id]
+                    pd.testing.assert_frame_equal(
+                        task_actual.drop(columns=[wc.COL_TASK_IDENTIFIER]).reset_index(
+                            drop=True
+                        ),
+                        expected,
+                        check_dtype=False,
+                        check_index_type=False,
+                    )
+                self.assertEqual(
+                    sorted(mock_logger.error.call_args_list),
+                    sorted(expected_logger.error.call_args_list),
+                )
+
+
+class TestMatchTaskIds(unittest.TestCase):
+    task_ids = ["PROJ-1201", "PROJ-1202", "PROJ-1301", "orga"]
+
+    def test_glob(self):
+        self.assertEqual(
+            match_task_ids(self.task_ids, ["PROJ-12*", "orga"]),
+            ["PROJ-1201", "PROJ-1202", "orga"],
+        )
+        self.assertEqual(
+            match_task_ids(self.task_ids, ["PROJ-1?01"]), ["PROJ-1201", "PROJ-1301"]
+        )
+
+    def test_literal(self):
+        self.assertEqual(match_task_ids(self.task_ids, ["PROJ"]), [])
+
+    def test_regex(self):
+        self.assertEqual(
+            match_task_ids(self.task_ids, [r"-1\d01$"], regex=True),
+            ["PROJ-1201", "PROJ-1301"],
+        )
+
+
 class TestTaskDuration(unittest.TestCase):
     def test_calc_task_durations_ordered(self):
         df = read_log_sample("tasks_simple_ordered")
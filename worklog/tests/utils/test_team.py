@@ -0,0 +1,97 @@
+import unittest
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd  # type: ignore
+
+import worklog.constants as wc
+from worklog.results import ReportResult
+from worklog.utils.team import find_logs, get_person_names, merge_reports
+
+
+def _report(tz, hours, tasks):
+    log_dts = pd.to_datetime(["2020-01-01", "2020-01-02"]).tz_localize(tz)
+    agg_time = pd.Series([timedelta(hours=h) for h in hours])
+    day = pd.DataFrame(
+        {
+            wc.COL_LOG_DATETIME: log_dts,
+            "agg_time": agg_time,
+            "break": pd.Series([timedelta(0)] * 2),
+            "agg_time_bookable": agg_time,
+        }
+    )
+    df_tasks = pd.DataFrame(
+        {
+            wc.COL_TASK_IDENTIFIER: list(tasks),
+            "agg_time": [timedelta(hours=h) for h in tasks.values()],
+        }
+    )
+    return ReportResult(day=day, week=day, month=day, tasks=df_tasks, auto_break=False)
+
+
+class TestFindLogs(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmpdir.name)
+        for name in ["alice.csv", "bob.csv", "alice.csv.lock", "bob.csv.trigrams"]:
+            (self.dir / name).touch()
+        (self.dir / "alice.csv.archive").mkdir()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_directory(self):
+        self.assertEqual(
+            find_logs(self.tmpdir.name),
+            [(self.dir / "alice.csv").as_posix(), (self.dir / "bob.csv").as_posix()],
+        )
+
+    def test_glob(self):
+        self.assertEqual(
+            find_logs((self.dir / "b*").as_posix()), [(self.dir / "bob.csv").as_posix()]
+        )
+        self.assertEqual(find_logs((self.dir / "carol*").as_posix()), [])
+
+
+class TestPersonNames(unittest.TestCase):
+    def test_names(self):
+        self.assertEqual(get_person_names(["a/alice.csv", "a/.bob"]), ["alice", "bob"])
+
+    def test_duplicate_names(self):
+        fps = ["a/alice.csv", "b/alice.csv"]
+        self.assertEqual(get_person_names(fps), fps)
+
+
+class TestMergeReports(unittest.TestCase):
+    def test_merge(self):
+        result = merge_reports(
+            {
+                "alice": _report("UTC", [8, 4], {"task1": 2, "task2": 1}),
+                "bob": _report("Europe/Berlin", [6, 0], {"task1": 3}),
+            }
+        )
+        self.assertEqual(
+            result.team.day["agg_time"].tolist(),
+            [timedelta(hours=14), timedelta(hours=4)],
+        )
+        self.assertEqual(
+            result.team.day[wc.COL_LOG_DATETIME].tolist(),
+            [datetime(2020, 1, 1), datetime(2020, 1, 2)],
+        )
+        self.assertEqual(result.team.month["agg_time"].sum(), timedelta(hours=18))
+        self.assertEqual(
+            result.team.tasks.set_index(wc.COL_TASK_IDENTIFIER)["agg_time"].to_dict(),
+            {"task1": timedelta(hours=5), "task2": timedelta(hours=1)},
+        )
+        self.assertEqual(
+            result.people.set_index("person")["agg_time"].to_dict(),
+            {"alice": timedelta(hours=12), "bob": timedelta(hours=6)},
+        )
+        self.assertEqual(result.person_tasks.shape[0], 3)
+
+    def test_merge_without_tasks(self):
+        report = _report("UTC", [8, 4], {})._replace(tasks=None)
+        result = merge_reports({"alice": report})
+        self.assertIsNone(result.team.tasks)
+        self.assertIsNone(result.person_tasks)
@@ -103,3 +103,15 @@ class TestDateTimeExtraction(unittest.TestCase):
         actual = extract_date_and_time(df)
 
         pd.testing.assert_frame_equal(actual, expected)
+
+    def test_extract_date_and_time_selected_columns(self):
+        df = pd.DataFrame(
+            {
+                wc.COL_LOG_DATETIME: [datetime(2020, 1, 1, 1, tzinfo=timezone.utc)],
+                wc.COL_COMMIT_DATETIME: [datetime(2020, 1, 1, tzinfo=timezone.utc)],
+            }
+        )
+        actual = extract_date_and_time(df, ["date"])
+
+        self.assertEqual(list(actual.columns), ["date"])
+        self.assertEqual(actual["date"].iloc[0], date(2020, 1, 1))
@@ -0,0 +1,37 @@
+import unittest
+from datetime import datetime, timezone
+
+import worklog.constants as wc
+from worklog.utils.timestamps import parse_timestamp
+
+
+class TestParseTimestamp(unittest.TestCase):
+    def test_formats(self):
+        expected = datetime(2020, 1, 1, 9, 30, tzinfo=timezone.utc)
+        for value in [
+            "2020-01-01T09:30:00+00:00",
+            "2020-01-01T09:30:00Z",
+            "2020-01-01 10:30:00+0100",
+            "2020-01-01T10:30:00+01",
+            "2020-01-01T08:00:00-01:30",
+            "20200101T093000Z",
+            "2020-01-01T09:30Z",
+        ]:
+            self.assertEqual(parse_timestamp(value), expected, value)
+            self.assertEqual(parse_timestamp(value).tzinfo, timezone.utc, value)
+
+    def test_fraction(self):
+        dt = parse_timestamp("2020-01-01T09:30:00.123456789Z")
+        self.assertEqual(dt.microsecond, 123456)
+        self.assertEqual(parse_timestamp("2020-01-01T09:30:00,5Z").microsecond, 5e5)
+
+    def test_naive_is_local(self):
+        self.assertEqual(
+            parse_timestamp("2020-01-01T09:30:00"),
+            datetime(2020, 1, 1, 9, 30, tzinfo=wc.LOCAL_TIMEZONE),
+        )
+
+    def test_invalid(self):
+        for value in ["", "yesterday", "2020-01-01T09:30:00+1", "2020-13-01"]:
+            with self.assertRaises(ValueError):
+                parse_timestamp(value)
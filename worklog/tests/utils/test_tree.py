@@ -0,0 +1,73 @@
+import unittest
+from datetime import timedelta
+
+from worklog.utils.tree import build_tree, iter_tree, rollup_tree
+
+DURATIONS = [
+    ("acme/web/ticket-1", timedelta(hours=1)),
+    ("acme/web/ticket-2", timedelta(hours=2)),
+    ("acme/app/ticket-3", timedelta(hours=3)),
+    ("acme/web", timedelta(minutes=30)),
+    ("orga", timedelta(minutes=15)),
+    ("acme/web/ticket-1", timedelta(hours=1)),
+]
+
+
+class TestTree(unittest.TestCase):
+    def setUp(self):
+        self.root = build_tree(DURATIONS)
+
+    def test_totals(self):
+        self.assertEqual(self.root.total, timedelta(hours=7, minutes=45))
+        acme = self.root.children["acme"]
+        self.assertEqual(acme.total, timedelta(hours=7, minutes=30))
+        self.assertEqual(acme.own, timedelta(0))
+        web = acme.children["web"]
+        self.assertEqual(web.path, "acme/web")
+        self.assertEqual(web.total, timedelta(hours=4, minutes=30))
+        self.assertEqual(web.own, timedelta(minutes=30))
+        self.assertEqual(web.children["ticket-1"].total, timedelta(hours=2))
+
+    def test_separator(self):
+        root = build_tree([("acme.web", timedelta(hours=1))], separator=".")
+        self.assertEqual(root.children["acme"].children["web"].path, "acme.web")
+
+    def test_iter_tree(self):
+        paths = [(depth, node.path) for depth, node in iter_tree(self.root)]
+        self.assertEqual(
+            paths,
+            [
+                (1, "acme"),
+                (2, "acme/app"),
+                (3, "acme/app/ticket-3"),
+                (2, "acme/web"),
+                (3, "acme/web/ticket-1"),
+                (3, "acme/web/ticket-2"),
+                (1, "orga"),
+            ],
+        )
+
+    def test_iter_tree_max_depth(self):
+        paths = [node.path for _, node in iter_tree(self.root, max_depth=1)]
+        self.assertEqual(paths, ["acme", "orga"])
+
+    def test_rollup(self):
+        self.assertEqual(
+            rollup_tree(self.root, 1),
+            [("acme", timedelta(hours=7, minutes=30)), ("orga", timedelta(minutes=15))],
+        )
+        self.assertEqual(
+            rollup_tree(self.root, 3),
+            [
+                ("acme/app/ticket-3", timedelta(hours=3)),
+                ("acme/web", timedelta(minutes=30)),
+                ("acme/web/ticket-1", timedelta(hours=2)),
+                ("acme/web/ticket-2", timedelta(hours=2)),
+                ("orga", timedelta(minutes=15)),
+            ],
+        )
+
+    def test_empty(self):
+        root = build_tree([])
+        self.assertEqual(list(iter_tree(root)), [])
+        self.assertEqual(rollup_tree(root, 2), [])
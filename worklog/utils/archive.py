@@ -0,0 +1,157 @@
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+import gzip
+import os
+import re
+
+import pandas as pd  # type: ignore
+
+try:
+    import zstandard  # type: ignore
+except ImportError:
+    zstandard = None
+
+import worklog.constants as wc
+from worklog.errors import ArchiveCodecError
+from worklog.utils.lock import atomic_write
+
+ROLLUP_COLS = [
+    wc.COL_CATEGORY,
+    "date",
+    wc.COL_LOG_DATETIME,
+    wc.COL_TASK_IDENTIFIER,
+    "duration",
+    "entries",
+]
+
+_SEGMENT_RE = re.compile(r"^(\d{4})\.csv\.(gz|zst)$")
+
+
+def get_archive_dir(log_fp: str) -> str:
+    return str(log_fp) + ".archive"
+
+
+def get_rollup_fp(log_fp: str, year: int) -> str:
+    return os.path.join(get_archive_dir(log_fp), f"{year}.rollup.csv")
+
+
+def get_segment_fp(log_fp: str, year: int) -> str:
+    """
+    Path of the segment of a year. Segments are compressed with zstd if the
+    `zstandard` package is available, otherwise with gzip.
+    """
+    for fp in _segment_fps(log_fp, year):
+        if os.path.exists(fp):
+            return fp
+    ext = "zst" if zstandard is not None else "gz"
+    return os.path.join(get_archive_dir(log_fp), f"{year}.csv.{ext}")
+
+
+def _segment_fps(log_fp: str, year: int) -> List[str]:
+    archive_dir = get_archive_dir(log_fp)
+    return [os.path.join(archive_dir, f"{year}.csv.{ext}") for ext in ("zst", "gz")]
+
+
+def list_segments(log_fp: str) -> List[Tuple[int, str]]:
+    """Returns the years and paths of all archived segments, oldest first."""
+    archive_dir = get_archive_dir(log_fp)
+    if not os.path.isdir(archive_dir):
+        return []
+    segments = []
+    for name in os.listdir(archive_dir):
+        match = _SEGMENT_RE.match(name)
+        if match:
+            segments.append((int(match.group(1)), os.path.join(archive_dir, name)))
+    return sorted(segments)
+
+
+@contextmanager
+def open_segment(fp: str) -> Iterator[BinaryIO]:
+    """Open a segment for reading, the content is decompressed on the fly."""
+    if fp.endswith(".zst"):
+        if zstandard is None:
+            raise ArchiveCodecError(fp, "zstandard")
+        with open(fp, "rb") as raw:
+            with zstandard.ZstdDecompressor().stream_reader(raw) as fh:
+                yield fh
+    else:
+        with gzip.open(fp, "rb") as fh:
+            yield fh
+
+
+def write_segment(log_fp: str, year: int, data: bytes) -> None:
+    """Atomically write the compressed segment of a year."""
+    fp = get_segment_fp(log_fp, year)
+    if fp.endswith(".zst"):
+        compressed = zstandard.ZstdCompressor().compress(data)
+    else:
+        compressed = gzip.compress(data)
+    atomic_write(fp, compressed)
+
+
+def compute_rollups(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate records per day, category and task identifier: the worked time
+    (in seconds), the number of records and the latest log time of the day.
+    Durations are assigned to the day of the stop record, just like in the
+    reports of the full log.
+    """
+    df = df.sort_values([wc.COL_LOG_DATETIME, wc.COL_TYPE], kind="mergesort")
+    df = df.assign(**{wc.COL_TASK_IDENTIFIER: df[wc.COL_TASK_IDENTIFIER].fillna("")})
+    session_mask = df[wc.COL_CATEGORY] == wc.TOKEN_SESSION
+    task_groups = df[~session_mask].groupby(wc.COL_TASK_IDENTIFIER)
+    durations = pd.concat(
+        (
+            df[session_mask][wc.COL_LOG_DATETIME].diff(),
+            task_groups[wc.COL_LOG_DATETIME].diff(),
+        )
+    ).reindex(df.index)
+    stop_mask = df[wc.COL_TYPE] == wc.TOKEN_STOP
+    seconds = durations.where(stop_mask).map(
+        lambda td: 0.0 if pd.isnull(td) else pd.Timedelta(td).total_seconds()
+    )
+
+    rollups = (
+        df.assign(duration=seconds, entries=1)
+        .groupby([wc.COL_CATEGORY, "date", wc.COL_TASK_IDENTIFIER], sort=True)
+        .agg({wc.COL_LOG_DATETIME: "max", "duration": "sum", "entries": "sum"})
+        .reset_index()
+    )
+    return rollups[ROLLUP_COLS]
+
+
+def write_rollups(log_fp: str, year: int, rollups: pd.DataFrame) -> None:
+    data = rollups[ROLLUP_COLS].to_csv(sep="|", index=False)
+    os.makedirs(get_archive_dir(log_fp), exist_ok=True)
+    atomic_write(get_rollup_fp(log_fp, year), data.encode())
+
+
+def read_rollups(log_fp: str, years: Optional[Iterable[int]] = None) -> pd.DataFrame:
+    """
+    Read the rollups of the archived years, or only of the given years.
+    Log times are returned in UTC, durations as timedeltas.
+    """
+    archived = [year for year, _ in list_segments(log_fp)]
+    if years is not None:
+        selected = set(years)
+        archived = [year for year in archived if year in selected]
+
+    dfs = [
+        pd.read_csv(
+            get_rollup_fp(log_fp, year),
+            sep="|",
+            dtype={wc.COL_TASK_IDENTIFIER: str},
+            keep_default_na=False,
+        )
+        for year in archived
+    ]
+    if len(dfs) == 0:
+        df = pd.DataFrame(columns=ROLLUP_COLS)
+    else:
+        df = pd.concat(dfs, ignore_index=True)
+
+    df[wc.COL_LOG_DATETIME] = pd.to_datetime(df[wc.COL_LOG_DATETIME], utc=True)
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    df["duration"] = pd.to_timedelta(df["duration"], unit="s")
+    df["entries"] = df["entries"].astype(int)
+    return df
@@ -0,0 +1,16 @@
+from typing import List, Tuple
+
+import pandas as pd  # type: ignore
+
+import worklog.constants as wc
+
+
+def compact_df(df: pd.DataFrame, cols: List[str]) -> Tuple[pd.DataFrame, int]:
+    """
+    Drop exact duplicates of records and sort them by log time. Records with
+    the same log time keep their order.
+    Returns the compacted records and the number of dropped duplicates.
+    """
+    deduplicated = df.drop_duplicates(subset=cols, keep="first")
+    compacted = deduplicated.sort_values(by=[wc.COL_LOG_DATETIME], kind="mergesort")
+    return compacted, df.shape[0] - deduplicated.shape[0]
@@ -0,0 +1,184 @@
+from typing import Optional
+import os
+
+import pandas as pd  # type: ignore
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.ipc  # type: ignore
+    import pyarrow.parquet  # type: ignore
+except ImportError:
+    pa = None
+
+import worklog.constants as wc
+from worklog.errors import ExportDependencyError
+
+# File extensions of the export formats, see `wc.EXPORT_FORMATS`
+EXTENSIONS = {"parquet": "parquet", "arrow": "arrow", "jsonl": "jsonl", "csv": "csv"}
+
+EVENT_COLS = [
+    wc.COL_COMMIT_DATETIME,
+    wc.COL_LOG_DATETIME,
+    wc.COL_CATEGORY,
+    wc.COL_TYPE,
+    wc.COL_TASK_IDENTIFIER,
+]
+
+# Durations are exported in seconds
+INTERVAL_COLS = [
+    wc.COL_CATEGORY,
+    wc.COL_TASK_IDENTIFIER,
+    "start",
+    "stop",
+    "duration",
+    "date",
+]
+
+
+def _to_utc(s: pd.Series) -> pd.Series:
+    # Logfiles may mix UTC offsets, e.g. because of daylight saving time.
+    # Such columns are parsed as objects, convert them to a single type.
+    return pd.to_datetime(s, utc=True)
+
+
+def to_export_events(df: pd.DataFrame) -> pd.DataFrame:
+    """Records of the logfile with timezone-aware timestamps in UTC."""
+    df = df[EVENT_COLS].copy()
+    for col in [wc.COL_COMMIT_DATETIME, wc.COL_LOG_DATETIME]:
+        df[col] = _to_utc(df[col])
+    return df.reset_index(drop=True)
+
+
+class IntervalBuilder(object):
+    """
+    Pairs start and stop entries of sessions and tasks into intervals while
+    the records are fed chunk by chunk in the order of their log time.
+    Start entries that are still open at the end of a chunk are carried
+    over to the next chunk. Like in `extract_intervals` a stop entry closes
+    the interval opened by the previous entry of the same session or task,
+    if that is a start entry; all other entries are skipped.
+    """
+
+    def __init__(self) -> None:
+        self._open: Optional[pd.DataFrame] = None
+
+    def add(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        cols = [wc.COL_CATEGORY, wc.COL_TASK_IDENTIFIER, wc.COL_TYPE]
+        df = chunk[cols + [wc.COL_LOG_DATETIME]].copy()
+        # Sessions have no identifier
+        df[wc.COL_TASK_IDENTIFIER] = df[wc.COL_TASK_IDENTIFIER].fillna("")
+        if self._open is not None:
+            df = pd.concat((self._open, df))
+        df = df.sort_values(
+            by=[wc.COL_CATEGORY, wc.COL_TASK_IDENTIFIER], kind="mergesort"
+        )
+
+        categories = df[wc.COL_CATEGORY]
+        task_ids = df[wc.COL_TASK_IDENTIFIER]
+        log_dts = df[wc.COL_LOG_DATETIME]
+        same_prev = categories.eq(categories.shift(1)) & task_ids.eq(task_ids.shift(1))
+        same_next = categories.eq(categories.shift(-1)) & task_ids.eq(
+            task_ids.shift(-1)
+        )
+        start_mask = df[wc.COL_TYPE] == wc.TOKEN_START
+        closing_mask = (
+            (df[wc.COL_TYPE] == wc.TOKEN_STOP)
+            & start_mask.shift(1, fill_value=False)
+            & same_prev
+        )
+        self._open = df[start_mask & ~same_next]
+
+        starts = log_dts.shift(1)[closing_mask]
+        stops = log_dts[closing_mask]
+        task_ids = task_ids[closing_mask]
+        df = pd.DataFrame(
+            {
+                wc.COL_CATEGORY: categories[closing_mask],
+                wc.COL_TASK_IDENTIFIER: task_ids.mask(task_ids == ""),
+                "start": _to_utc(starts),
+                "stop": _to_utc(stops),
+                "duration": pd.to_timedelta(stops - starts).dt.total_seconds(),
+                # Local date of the start, as in the reports
+                "date": starts.map(lambda x: x.date()),
+            },
+            columns=INTERVAL_COLS,
+        )
+        # Restore the order of the log, which the grouping has changed
+        return df.sort_values(by="start", kind="mergesort").reset_index(drop=True)
+
+
+def check_export_format(fmt: str) -> None:
+    """Raises `ExportDependencyError` if the format can not be written."""
+    if fmt in ["parquet", "arrow"] and pa is None:
+        raise ExportDependencyError(fmt, "pyarrow")
+
+
+class ChunkWriter(object):
+    """Writes a table chunk by chunk into a file of the given format."""
+
+    def __init__(self, fp: str, fmt: str, table: str) -> None:
+        check_export_format(fmt)
+        self.fp = fp
+        self.fmt = fmt
+        self.rows = 0
+        self._schema = _get_arrow_schema(table) if pa is not None else None
+        if fmt == "parquet":
+            self._writer = pa.parquet.ParquetWriter(fp, self._schema)
+        elif fmt == "arrow":
+            self._writer = pa.ipc.new_file(fp, self._schema)
+        else:
+            self._fh = open(fp, "w")
+            self._header = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        if df.shape[0] == 0 and self.fmt not in ["csv"]:
+            return
+        if self.fmt in ["parquet", "arrow"]:
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        elif self.fmt == "jsonl":
+            if "date" in df.columns:
+                df = df.assign(date=df["date"].map(str))
+            data = df.to_json(
+                orient="records", lines=True, date_format="iso", date_unit="s"
+            )
+            # Older versions of pandas omit the line break after the last line
+            self._fh.write(data if data.endswith("\n") else data + "\n")
+        else:
+            df.to_csv(self._fh, header=self._header, index=False)
+            self._header = False
+        self.rows += df.shape[0]
+
+    def close(self) -> None:
+        if self.fmt in ["parquet", "arrow"]:
+            self._writer.close()
+        else:
+            self._fh.close()
+
+
+def _get_arrow_schema(table: str):
+    timestamp = pa.timestamp("ns", tz="UTC")
+    if table == "events":
+        return pa.schema(
+            [
+                (wc.COL_COMMIT_DATETIME, timestamp),
+                (wc.COL_LOG_DATETIME, timestamp),
+                (wc.COL_CATEGORY, pa.string()),
+                (wc.COL_TYPE, pa.string()),
+                (wc.COL_TASK_IDENTIFIER, pa.string()),
+            ]
+        )
+    return pa.schema(
+        [
+            (wc.COL_CATEGORY, pa.string()),
+            (wc.COL_TASK_IDENTIFIER, pa.string()),
+            ("start", timestamp),
+            ("stop", timestamp),
+            ("duration", pa.float64()),
+            ("date", pa.date32()),
+        ]
+    )
+
+
+def get_export_fp(out_dir: str, table: str, fmt: str) -> str:
+    return os.path.join(out_dir, f"{table}.{EXTENSIONS[fmt]}")
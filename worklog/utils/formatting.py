@@ -1,9 +1,13 @@
-from typing import Union, Optional
-from datetime import timedelta
+from typing import Any, List, TextIO, Union, Optional
+from datetime import date, datetime, timedelta
+import csv
+import json
 import pandas as pd
 import numpy as np
 from math import floor
 
+import worklog.constants as wc
+
 
 def format_timedelta(value: Optional[Union[timedelta, np.timedelta64]]) -> str:
     if value is None or value is pd.NaT or value is np.nan:
@@ -19,21 +23,181 @@ def format_timedelta(value: Optional[Union[timedelta, np.timedelta64]]) -> str:
 def _format_timedelta_py(td: timedelta) -> str:
     try:
         total_secs = td.total_seconds()
-        hours, remainder = divmod(total_secs, 3600)
+        sign = "-" if total_secs < 0 else ""
+        hours, remainder = divmod(abs(total_secs), 3600)
         minutes, seconds = divmod(remainder, 60)
-        return "{:02}:{:02}:{:02}".format(int(hours), int(minutes), int(seconds))
+        return sign + "{:02}:{:02}:{:02}".format(
+            int(hours), int(minutes), int(seconds)
+        )
     except (AttributeError, ValueError):
         return "{:02}:{:02}:{:02}".format(0, 0, 0)
 
 
 def _format_timedelta_np(value: np.timedelta64) -> str:
     seconds = value / np.timedelta64(1, "s")
+    sign = ""
     if np.isnan(seconds):
         hours = minutes = seconds = 0
     else:
+        if seconds < 0:
+            sign, seconds = "-", -seconds
         hours = floor(seconds / 3600)
         minutes = floor((seconds - hours * 3600) / 60)
         seconds = floor(seconds % 60)
-    return "{hours:02}:{minutes:02}:{seconds:02}".format(
+    return sign + "{hours:02}:{minutes:02}:{seconds:02}".format(
         hours=hours, minutes=minutes, seconds=seconds
     )
+
+
+_TWO_DIGITS = np.array([f"{i:02}" for i in range(100)], dtype=object)
+
+
+def format_timedeltas(values: Any) -> np.ndarray:
+    """
+    Format a whole column of durations like `format_timedelta`, e.g. the
+    times of a report, in one pass with integer arithmetic. Hours are not
+    limited to 24, negative durations get a leading minus sign and
+    not-a-time values are formatted as 00:00:00.
+    """
+    ns = np.asarray(pd.to_timedelta(values), dtype="m8[ns]").view("i8")
+    ns = np.where(ns == np.iinfo(np.int64).min, 0, ns)
+    hours, remainder = np.divmod(np.abs(ns) // 1_000_000_000, 3600)
+    minutes, seconds = np.divmod(remainder, 60)
+    # Two-digit numbers are looked up instead of formatted one by one
+    hours_str = np.where(
+        hours < 100,
+        _TWO_DIGITS[np.minimum(hours, 99)],
+        hours.astype(str).astype(object),
+    )
+    sign = np.where(ns < 0, "-", "").astype(object)
+    return sign + hours_str + ":" + _TWO_DIGITS[minutes] + ":" + _TWO_DIGITS[seconds]
+
+
+def to_json(value: Any) -> Any:
+    """
+    `json.dumps` hook that converts the types used in query results.
+    Durations are represented as number of seconds.
+    """
+    if isinstance(value, pd.DataFrame):
+        df = value.reset_index(drop=value.index.name is None)
+        return df.to_dict(orient="records")
+    if isinstance(value, (timedelta, np.timedelta64)):
+        return pd.Timedelta(value).total_seconds()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is pd.NaT:
+        return None
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+# Column names of the report results and their names in CSV and JSON output
+REPORT_FIELDS = {
+    wc.COL_LOG_DATETIME: "date",
+    wc.COL_TASK_IDENTIFIER: "task",
+    "agg_time": "total",
+    "break": "break",
+    "agg_time_bookable": "bookable",
+    "break_taken": "logged_breaks",
+}
+# Logged breaks are only written if the break mode takes them into account
+REPORT_FIELD_NAMES = [
+    name for name in REPORT_FIELDS.values() if name != "logged_breaks"
+]
+
+
+class ReportWriter(object):
+    """
+    Writes the aggregations of reports as CSV or JSON, row by row.
+    CSV output is a single table, the first column names the aggregation of
+    each row. JSON output is an object with a list of rows per aggregation,
+    one line per report. Durations are written as number of seconds.
+    Each report is enclosed by `begin` and `end`. `keys` are the names of
+    values that identify a report, e.g. its time window. They are written
+    into the JSON object and into additional CSV columns.
+    """
+
+    def __init__(
+        self,
+        fh: TextIO,
+        fmt: str,
+        fields: Optional[List[str]] = None,
+        keys: Optional[List[str]] = None,
+    ) -> None:
+        if fmt not in ["csv", "json"]:
+            raise ValueError(f"Unsupported report format: {fmt}")
+        self.fmt = fmt
+        self.fields = fields if fields is not None else REPORT_FIELD_NAMES
+        self.keys = keys if keys is not None else []
+        self._fh = fh
+        self._sections = 0
+        self._key_values: List[Any] = []
+        if fmt == "csv":
+            self._csv = csv.writer(fh, lineterminator="\n")
+            self._csv.writerow(["aggregation"] + self.keys + self.fields)
+
+    def begin(self, **values: Any) -> None:
+        self._key_values = [_to_text(values[key]) for key in self.keys]
+        self._sections = 0
+        if self.fmt == "json":
+            self._fh.write("{")
+            for key, value in zip(self.keys, self._key_values):
+                self._write_json_key(key)
+                self._fh.write(json.dumps(value))
+
+    def write(
+        self, name: str, df: Optional[pd.DataFrame], date_format: str = "%Y-%m-%d"
+    ) -> None:
+        if self.fmt == "json":
+            self._write_json_key(name)
+            self._fh.write("[")
+
+        if df is not None:
+            # Renamed columns take precedence over columns of the same name
+            sources = {
+                name: col for col, name in REPORT_FIELDS.items() if col in df.columns
+            }
+            for col in df.columns:
+                sources.setdefault(col, col)
+            cols = [field for field in self.fields if field in sources]
+            df = df[[sources[field] for field in cols]].copy()
+            df.columns = cols
+            for col in cols:
+                # Conversions are vectorized, only the output is row by row
+                if pd.api.types.is_timedelta64_dtype(df[col]):
+                    df[col] = df[col].dt.total_seconds()
+                elif pd.api.types.is_datetime64_any_dtype(df[col]):
+                    df[col] = df[col].dt.strftime(date_format)
+            self._write_rows(name, cols, df)
+
+        if self.fmt == "json":
+            self._fh.write("]")
+
+    def _write_rows(self, name: str, cols: List[str], df: pd.DataFrame) -> None:
+        positions = [self.fields.index(col) for col in cols]
+        for i, row in enumerate(df.itertuples(index=False, name=None)):
+            if self.fmt == "csv":
+                values = [""] * len(self.fields)
+                for pos, value in zip(positions, row):
+                    values[pos] = value
+                self._csv.writerow([name] + self._key_values + values)
+            else:
+                sep = ", " if i > 0 else ""
+                record = json.dumps(dict(zip(cols, row)), default=to_json)
+                self._fh.write(sep + record)
+
+    def _write_json_key(self, key: str) -> None:
+        sep = ", " if self._sections > 0 else ""
+        self._fh.write(f"{sep}{json.dumps(key)}: ")
+        self._sections += 1
+
+    def end(self) -> None:
+        if self.fmt == "json":
+            self._fh.write("}\n")
+
+
+def _to_text(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
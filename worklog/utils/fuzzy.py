@@ -0,0 +1,266 @@
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import json
+import os
+import struct
+
+from worklog.utils.lock import atomic_write
+
+
+def trigrams(value: str, pad: bool = True) -> Set[str]:
+    """
+    Lowercase trigrams of a string. Padding marks the start and the end of
+    the string, so that prefixes of an identifier share more trigrams with
+    it than the same characters in the middle of it.
+    """
+    value = value.lower()
+    if pad:
+        value = f"  {value} "
+    return {value[i : i + 3] for i in range(len(value) - 2)}
+
+
+class TrigramIndex(object):
+    """
+    Maps trigrams to the task identifiers that contain them. Lookups only
+    inspect identifiers that share trigrams with the query instead of
+    scanning all known identifiers.
+    """
+
+    # Minimum Jaccard similarity of the trigrams of a fuzzy match
+    min_similarity: float = 0.3
+
+    def __init__(self, task_ids: Iterable[str] = ()) -> None:
+        self._postings: Dict[str, Set[str]] = {}
+        self._task_ids: Set[str] = set()
+        for task_id in task_ids:
+            self.add(task_id)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._task_ids
+
+    def __len__(self) -> int:
+        return len(self._task_ids)
+
+    def add(self, task_id: str) -> None:
+        if task_id in self._task_ids:
+            return
+        self._task_ids.add(task_id)
+        for trigram in trigrams(task_id):
+            self._postings.setdefault(trigram, set()).add(task_id)
+
+    def _get_postings(self, trigram: str) -> Set[str]:
+        return self._postings.get(trigram, set())
+
+    def _count_postings(self, trigram: str) -> int:
+        return len(self._get_postings(trigram))
+
+    def _get_task_ids(self) -> Iterable[str]:
+        return self._task_ids
+
+    def search(self, query: str) -> List[str]:
+        """
+        Returns the identifiers that best match `query`, ignoring case:
+        identifiers starting with it, otherwise identifiers containing it,
+        otherwise identifiers with similar trigrams, most similar first.
+        The order of identifiers within the first two groups is undefined.
+        """
+        lowered = query.lower()
+        query_trigrams = trigrams(query, pad=False)
+        if len(query_trigrams) > 0:
+            # Matches contain all trigrams of the query, it suffices to check
+            # the identifiers of the rarest one
+            rarest = min(query_trigrams, key=self._count_postings)
+            candidates = set(self._get_postings(rarest))
+        else:
+            # Queries of less than three characters have no inner trigrams
+            candidates = set(self._get_task_ids())
+
+        prefix_matches = [c for c in candidates if c.lower().startswith(lowered)]
+        if len(prefix_matches) > 0:
+            return prefix_matches
+        substring_matches = [c for c in candidates if lowered in c.lower()]
+        if len(substring_matches) > 0:
+            return substring_matches
+        return self._search_similar(query)
+
+    def _search_similar(self, query: str) -> List[str]:
+        query_trigrams = trigrams(query)
+        shared: Dict[str, int] = {}
+        for trigram in query_trigrams:
+            for task_id in self._get_postings(trigram):
+                shared[task_id] = shared.get(task_id, 0) + 1
+
+        similarities = {}
+        for task_id, count in shared.items():
+            union = len(query_trigrams) + len(trigrams(task_id)) - count
+            if count / union >= self.min_similarity:
+                similarities[task_id] = count / union
+        return sorted(similarities, key=lambda t: (-similarities[t], t))
+
+
+class TrigramFile(TrigramIndex):
+    """
+    Trigram index that has been written next to the logfile by
+    `write_trigrams`. Trigrams are looked up by a binary search in the
+    directory of the file and only their posting lists are read, such that a
+    lookup does not read all identifiers. Only queries of less than three
+    characters list all identifiers, which are provided by `get_task_ids`.
+    """
+
+    def __init__(self, log_fp: str, get_task_ids: Callable[[], List[str]]) -> None:
+        super().__init__()
+        self._log_fp = log_fp
+        self._get_all_task_ids = get_task_ids
+        self._entries: Dict[str, Optional[Tuple[int, int, int]]] = {}
+
+    def _find(self, trigram: str) -> Optional[Tuple[int, int, int]]:
+        if trigram not in self._entries:
+            with open(get_trigrams_fp(self._log_fp), "rb") as fh:
+                self._entries[trigram] = _find_entry(fh, trigram)
+        return self._entries[trigram]
+
+    def _count_postings(self, trigram: str) -> int:
+        entry = self._find(trigram)
+        return entry[2] if entry is not None else 0
+
+    def _get_postings(self, trigram: str) -> Set[str]:
+        if trigram not in self._postings:
+            entry = self._find(trigram)
+            task_ids: Set[str] = set()
+            if entry is not None:
+                offset, size, _ = entry
+                with open(get_trigrams_fp(self._log_fp), "rb") as fh:
+                    fh.seek(offset)
+                    task_ids = set(fh.read(size).decode().split("\n")[:-1])
+            self._postings[trigram] = task_ids
+        return self._postings[trigram]
+
+    def _get_task_ids(self) -> Iterable[str]:
+        return self._get_all_task_ids()
+
+
+# Directory entry of a trigram file: the trigram (UTF-8, padded with zero
+# bytes), the position and size of its posting list and the number of
+# identifiers in it
+_ENTRY = struct.Struct("<12sQII")
+
+
+def get_trigrams_fp(log_fp: str) -> str:
+    return str(log_fp) + ".trigrams"
+
+
+def _read_trigram_header(fh) -> Dict:
+    return json.loads(fh.readline())
+
+
+def _find_entry(fh, trigram: str) -> Optional[Tuple[int, int, int]]:
+    """Binary search for a trigram in the directory of a trigram file."""
+    header = _read_trigram_header(fh)
+    start = fh.tell()
+    key = trigram.encode().ljust(12, b"\0")
+    lo, hi = 0, header["trigrams"]
+    while lo < hi:
+        mid = (lo + hi) // 2
+        fh.seek(start + mid * _ENTRY.size)
+        entry = _ENTRY.unpack(fh.read(_ENTRY.size))
+        if entry[0] < key:
+            lo = mid + 1
+        elif entry[0] > key:
+            hi = mid
+        else:
+            return entry[1:]
+    return None
+
+
+def read_trigram_count(log_fp: str) -> Optional[int]:
+    """Number of identifiers in the trigram file, None if there is none."""
+    try:
+        with open(get_trigrams_fp(log_fp), "rb") as fh:
+            return _read_trigram_header(fh)["count"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _encode_postings(task_ids: Iterable[str]) -> Tuple[bytes, int]:
+    task_ids = sorted(task_ids)
+    return "".join(f"{task_id}\n" for task_id in task_ids).encode(), len(task_ids)
+
+
+def _write_postings(
+    log_fp: str, postings: Dict[str, Tuple[bytes, int]], count: int
+) -> None:
+    # Zero padding keeps the byte order of the trigrams, which is the order
+    # of their code points
+    keys = sorted(postings)
+    header = json.dumps({"count": count, "trigrams": len(keys)}).encode() + b"\n"
+    offset = len(header) + len(keys) * _ENTRY.size
+    directory, data = [], []
+    for trigram in keys:
+        chunk, n = postings[trigram]
+        directory.append(_ENTRY.pack(trigram.encode(), offset, len(chunk), n))
+        data.append(chunk)
+        offset += len(chunk)
+    atomic_write(get_trigrams_fp(log_fp), b"".join([header] + directory + data))
+
+
+def _read_postings(log_fp: str) -> Dict[str, Tuple[bytes, int]]:
+    """Encoded posting lists of all trigrams, see `_encode_postings`."""
+    with open(get_trigrams_fp(log_fp), "rb") as fh:
+        header = _read_trigram_header(fh)
+        entries = [
+            _ENTRY.unpack(fh.read(_ENTRY.size)) for _ in range(header["trigrams"])
+        ]
+        postings = {}
+        for key, offset, size, n in entries:
+            fh.seek(offset)
+            postings[key.rstrip(b"\0").decode()] = (fh.read(size), n)
+    return postings
+
+
+def write_trigrams(log_fp: str, task_ids: Iterable[str]) -> None:
+    """
+    Atomically write the trigram index of the task identifiers next to the
+    logfile: a JSON header with the number of identifiers and trigrams, a
+    directory of fixed-size entries sorted by trigram and the posting lists
+    of the trigrams, one identifier per line.
+    """
+    index = TrigramIndex(task_ids)
+    postings = {t: _encode_postings(ids) for t, ids in index._postings.items()}
+    _write_postings(log_fp, postings, len(index))
+
+
+def add_trigrams(log_fp: str, task_ids: Iterable[str], count: int) -> None:
+    """
+    Add new identifiers to the trigram file, such that it holds `count`
+    identifiers afterwards. The file is only rewritten if identifiers are
+    added. It is removed, and rebuilt by the next lookup, if it does not
+    match the identifiers it is supposed to be derived from.
+    """
+    task_ids = set(task_ids)
+    known = read_trigram_count(log_fp)
+    if known is None:
+        return
+    if known != count - len(task_ids):
+        remove_trigrams(log_fp)
+        return
+    if len(task_ids) == 0:
+        return
+
+    added: Dict[str, Set[str]] = {}
+    for task_id in task_ids:
+        for trigram in trigrams(task_id):
+            added.setdefault(trigram, set()).add(task_id)
+    # Only the posting lists of the added trigrams are decoded
+    postings = _read_postings(log_fp)
+    for trigram, new_ids in added.items():
+        chunk, _ = postings.get(trigram, (b"", 0))
+        postings[trigram] = _encode_postings(
+            set(chunk.decode().split("\n")[:-1]) | new_ids
+        )
+    _write_postings(log_fp, postings, count)
+
+
+def remove_trigrams(log_fp: str) -> None:
+    try:
+        os.unlink(get_trigrams_fp(log_fp))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,312 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import csv
+import json
+import logging
+import os
+import sys
+
+import worklog.constants as wc
+from worklog.utils.lock import atomic_write
+from worklog.utils.recovery import is_complete_record, matches_tail
+from worklog.utils.timestamps import parse_timestamp
+
+
+class TaskStats(NamedTuple):
+    """Usage of a single task identifier."""
+
+    count: int
+    first_seen: datetime
+    last_seen: datetime
+    duration: timedelta
+    # Type of the record at `last_seen`, needed to apply appended records
+    last_type: str
+
+
+# Sort orders of `wl task list`
+SORT_KEYS = {
+    "name": lambda item: item[0],
+    "count": lambda item: (-item[1].count, item[0]),
+    "recent": lambda item: (-item[1].last_seen.timestamp(), item[0]),
+    "time": lambda item: (-item[1].duration.total_seconds(), item[0]),
+}
+
+
+# Identifiers used this many days before the latest entry count half
+RANK_HALF_LIFE_DAYS = 14
+
+
+def get_ids_fp(log_fp: str) -> str:
+    return str(log_fp) + ".ids"
+
+
+def sort_index(
+    index: Dict[str, TaskStats], sort: str = "name", limit: Optional[int] = None
+) -> List[Tuple[str, TaskStats]]:
+    """Returns the entries of an index in the given sort order."""
+    items = sorted(index.items(), key=SORT_KEYS[sort])
+    return items[:limit] if limit is not None else items
+
+
+def write_task_list(
+    index: Dict[str, TaskStats], sort: str = "name", limit: Optional[int] = None
+) -> None:
+    """Write the identifiers of an index and their number of entries to STDOUT."""
+    sys.stdout.write("These tasks are listed in the log:\n")
+    for task, stats in sort_index(index, sort=sort, limit=limit):
+        sys.stdout.write(f"{task} ({stats.count})\n")
+
+
+def _stats_from_records(
+    records: List[Tuple[datetime, str]], count: int = 0, duration: float = 0.0
+) -> Dict:
+    # Same semantics as the task reports: records are ordered by log time and
+    # type, each stop record adds the time since the previous record.
+    records = sorted(records)
+    for i, (log_dt, type_) in enumerate(records):
+        if type_ == wc.TOKEN_STOP and i > 0:
+            duration += (log_dt - records[i - 1][0]).total_seconds()
+    return dict(
+        count=count + len(records),
+        first=records[0][0],
+        last=records[-1][0],
+        last_type=records[-1][1],
+        duration=duration,
+    )
+
+
+def build_index(
+    log_fp: str,
+    size: int,
+    separator: str = "|",
+    rollup_fps: Iterable[str] = (),
+) -> Dict[str, TaskStats]:
+    """
+    Build the identifier index by streaming over the first `size` bytes of
+    the logfile. Archived years are taken from their rollup files.
+    Times are kept in UTC. Records with an invalid log time are skipped.
+    """
+    logger = logging.getLogger(wc.DEFAULT_LOGGER_NAME)
+    records: Dict[str, List[Tuple[datetime, str]]] = {}
+    with open(log_fp, "rb") as fh:
+        remaining = size
+        for line in fh:
+            if len(line) > remaining:
+                # Appended after the index has been requested
+                break
+            remaining -= len(line)
+            if line.startswith(b"#") or not line.strip():
+                continue
+            if not line.endswith(b"\n") and not is_complete_record(line, separator):
+                break
+            fields = line.decode().rstrip("\r\n").split(separator)
+            if len(fields) != 5 or fields[2] != wc.TOKEN_TASK:
+                continue
+            try:
+                log_dt = parse_timestamp(fields[1])
+            except ValueError:
+                logger.warning(f"Skip record with invalid log time: {fields[1]}")
+                continue
+            records.setdefault(fields[4], []).append((log_dt, fields[3]))
+
+    archived: Dict[str, Dict] = {}
+    for rollup_fp in rollup_fps:
+        with open(rollup_fp, "r", newline="") as fh:
+            for row in csv.DictReader(fh, delimiter="|"):
+                if row[wc.COL_CATEGORY] != wc.TOKEN_TASK:
+                    continue
+                value = row[wc.COL_LOG_DATETIME]
+                try:
+                    log_dt = parse_timestamp(value)
+                except ValueError:
+                    logger.warning(f"Skip rollup with invalid log time: {value}")
+                    continue
+                entry = archived.setdefault(
+                    row[wc.COL_TASK_IDENTIFIER],
+                    dict(count=0, first=log_dt, last=log_dt, duration=0.0),
+                )
+                entry["count"] += int(row["entries"])
+                entry["duration"] += float(row["duration"])
+                entry["first"] = min(entry["first"], log_dt)
+                entry["last"] = max(entry["last"], log_dt)
+
+    index = {}
+    for task_id in set(records) | set(archived):
+        old = archived.get(task_id)
+        if task_id in records:
+            stats = _stats_from_records(
+                records[task_id],
+                count=old["count"] if old else 0,
+                duration=old["duration"] if old else 0.0,
+            )
+            if old:
+                stats["first"] = min(stats["first"], old["first"])
+        else:
+            stats = dict(old, last_type=wc.TOKEN_STOP)
+        index[task_id] = TaskStats(
+            count=stats["count"],
+            first_seen=stats["first"],
+            last_seen=stats["last"],
+            duration=timedelta(seconds=stats["duration"]),
+            last_type=stats["last_type"],
+        )
+    return index
+
+
+def update_index(
+    index: Dict[str, TaskStats],
+    records: Iterable[Tuple[datetime, str, str, Optional[str]]],
+) -> Optional[Dict[str, TaskStats]]:
+    """
+    Apply new records (log_dt, category, type, identifier) to an index.
+    Returns None if a task record is older than the latest known record of
+    the task, because then the durations can only be derived from the full
+    log.
+    """
+    index = dict(index)
+    for log_dt, category, type_, identifier in records:
+        if category != wc.TOKEN_TASK:
+            continue
+        log_dt = log_dt.astimezone(timezone.utc)
+        stats = index.get(identifier)
+        if stats is None:
+            index[identifier] = TaskStats(1, log_dt, log_dt, timedelta(0), type_)
+            continue
+        if (log_dt, type_) < (stats.last_seen, stats.last_type):
+            return None
+        duration = stats.duration
+        if type_ == wc.TOKEN_STOP:
+            duration += log_dt - stats.last_seen
+        index[identifier] = TaskStats(
+            stats.count + 1, stats.first_seen, log_dt, duration, type_
+        )
+    return index
+
+
+def _read_header(fh, log_fp: str, size: Optional[int]) -> Optional[Dict]:
+    # The first line of the index describes the logfile it belongs to
+    try:
+        header = json.loads(fh.readline())
+        if size is None:
+            size = os.path.getsize(log_fp)
+    except (OSError, ValueError):
+        return None
+    if not matches_tail(log_fp, size, header.get("size"), header.get("tail", "")):
+        return None
+    return header
+
+
+def read_index_count(log_fp: str, size: Optional[int] = None) -> Optional[int]:
+    """
+    Returns the number of identifiers of the identifier index without
+    parsing it. Returns None if the index does not exist, does not match the
+    logfile or has been written without the number.
+    """
+    try:
+        with open(get_ids_fp(log_fp), "r") as fh:
+            header = _read_header(fh, log_fp, size)
+    except OSError:
+        return None
+    return header.get("count") if header is not None else None
+
+
+def read_index(
+    log_fp: str, size: Optional[int] = None
+) -> Optional[Dict[str, TaskStats]]:
+    """
+    Read the identifier index of a logfile.
+    Returns None if the index does not exist or does not match the logfile.
+    By default the current size of the logfile is used.
+    """
+    try:
+        with open(get_ids_fp(log_fp), "r") as fh:
+            if not _read_header(fh, log_fp, size):
+                return None
+            lines = fh.read().splitlines()
+    except OSError:
+        return None
+
+    index = {}
+    try:
+        for line in lines:
+            task_id, count, first, last, duration, last_type = line.split("|")
+            index[task_id] = TaskStats(
+                count=int(count),
+                first_seen=parse_timestamp(first),
+                last_seen=parse_timestamp(last),
+                duration=timedelta(seconds=float(duration)),
+                last_type=last_type,
+            )
+    except ValueError:
+        # Written by an older version or damaged, rebuilt by the caller
+        return None
+    return index
+
+
+def read_ranked_ids(log_fp: str, prefix: str = "") -> Optional[List[str]]:
+    """
+    Returns the identifiers starting with `prefix`, most relevant first,
+    without parsing the rest of the index. Used for shell completion.
+    Returns None if the index does not exist or does not match the logfile.
+    """
+    try:
+        with open(get_ids_fp(log_fp), "r") as fh:
+            if not _read_header(fh, log_fp, None):
+                return None
+            return [
+                line.split("|", 1)[0] for line in fh if line.startswith(prefix)
+            ]
+    except OSError:
+        return None
+
+
+def rank_ids(
+    index: Dict[str, TaskStats], task_ids: Optional[Iterable[str]] = None
+) -> List[str]:
+    """
+    Rank identifiers by frequency and recency: the number of entries, halved
+    for every `RANK_HALF_LIFE_DAYS` days between the last use of a task and
+    the latest use of any task.
+    Ranks all identifiers of the index or only the given ones.
+    """
+    if len(index) == 0:
+        return []
+    latest = max(stats.last_seen for stats in index.values())
+
+    def _score(task_id: str) -> Tuple[float, str]:
+        stats = index[task_id]
+        age_days = (latest - stats.last_seen).total_seconds() / 86400
+        return (-stats.count * 0.5 ** (age_days / RANK_HALF_LIFE_DAYS), task_id)
+
+    return sorted(index if task_ids is None else task_ids, key=_score)
+
+
+def write_index(
+    log_fp: str, index: Dict[str, TaskStats], size: int, tail: bytes
+) -> None:
+    """
+    Atomically write the identifier index of a logfile.
+    `size` and `tail` must describe the logfile the index belongs to.
+    Identifiers are written in the order of `rank_ids`, one per line, so
+    that they can be completed without parsing the whole index.
+    """
+    lines = [json.dumps({"size": size, "tail": tail.hex(), "count": len(index)})]
+    for task_id in rank_ids(index):
+        stats = index[task_id]
+        fields = [
+            task_id,
+            str(stats.count),
+            stats.first_seen.isoformat(),
+            stats.last_seen.isoformat(),
+            repr(stats.duration.total_seconds()),
+            stats.last_type,
+        ]
+        lines.append("|".join(fields))
+    atomic_write(get_ids_fp(log_fp), ("\n".join(lines) + "\n").encode())
+
+
+def remove_index(log_fp: str) -> None:
+    try:
+        os.unlink(get_ids_fp(log_fp))
+    except FileNotFoundError:
+        pass
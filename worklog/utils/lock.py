@@ -0,0 +1,91 @@
+from typing import Iterable, Iterator
+from contextlib import contextmanager
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None  # type: ignore
+
+
+def get_lock_fp(log_fp: str) -> str:
+    return str(log_fp) + ".lock"
+
+
+@contextmanager
+def file_lock(log_fp: str) -> Iterator[None]:
+    """
+    Hold an exclusive advisory lock for a logfile.
+    A separate lock file is used, such that the logfile itself can be
+    replaced atomically while writers are waiting.
+    Advisory locks are not reentrant within the same process, callers must
+    make sure not to acquire the lock twice.
+    """
+    fd = os.open(get_lock_fp(log_fp), os.O_RDWR | os.O_CREAT, 0o660)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        elif msvcrt is not None:  # pragma: no cover
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        yield
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        elif msvcrt is not None:  # pragma: no cover
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+
+
+def append_bytes(fp: str, data: bytes) -> int:
+    """
+    Append data to a file with a single `O_APPEND` write, such that records
+    of concurrent writers are not interleaved. Only if the kernel writes
+    part of the data, e.g. on a full disk, the rest is appended by further
+    writes, which other writers may interleave unless `file_lock` is held.
+    Returns the position at which the data has been written. It is only
+    valid while holding `file_lock`, otherwise other writers may have
+    appended in the meantime.
+    """
+    fd = os.open(fp, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o660)
+    try:
+        written = os.write(fd, data)
+        while written < len(data):
+            # Partial writes only happen on full disks or signals, continue
+            # where the kernel stopped.
+            written += os.write(fd, data[written:])
+        return os.fstat(fd).st_size - len(data)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(fp: str, data: bytes) -> None:
+    """
+    Replace the content of a file atomically, i.e. readers either see the
+    old or the new content, even if the process is killed.
+    """
+    atomic_write_chunks(fp, [data])
+
+
+def atomic_write_chunks(fp: str, chunks: Iterable[bytes]) -> None:
+    """
+    Like `atomic_write`, but the content is written chunk by chunk, such
+    that it does not have to be held in memory at once.
+    """
+    fd, tmp_fp = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(fp)), prefix=os.path.basename(fp) + "."
+    )
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+        os.replace(tmp_fp, fp)
+    except BaseException:
+        # Also if producing the chunks failed
+        os.unlink(tmp_fp)
+        raise
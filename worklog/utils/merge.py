@@ -0,0 +1,207 @@
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from datetime import datetime
+from itertools import chain
+import heapq
+import json
+import logging
+import os
+
+import worklog.constants as wc
+from worklog.results import MergeResult
+from worklog.utils.lock import atomic_write, atomic_write_chunks, file_lock
+from worklog.utils.recovery import get_tail, is_complete_record, read_tail
+from worklog.utils.timestamps import parse_timestamp
+
+
+class Record(NamedTuple):
+    """A record of a logfile together with the line it has been read from."""
+
+    commit_dt: datetime
+    log_dt: datetime
+    category: str
+    type: str
+    identifier: str
+    # None for records that have not been read from a file
+    line: Optional[bytes] = None
+
+    @property
+    def key(self) -> Tuple[datetime, str, str, str, datetime]:
+        """Records with the same key are duplicates of each other."""
+        return (
+            self.log_dt,
+            self.category,
+            self.type,
+            self.identifier,
+            self.commit_dt,
+        )
+
+
+def parse_record(line: bytes, separator: str = "|") -> Optional[Record]:
+    """
+    Parse a line of a logfile. Times are converted to UTC, such that records
+    of logfiles with different UTC offsets can be compared.
+    Returns None for comments and broken lines.
+    """
+    if line.startswith(b"#") or not is_complete_record(line, separator):
+        return None
+    fields = line.decode().rstrip("\r\n").split(separator)
+    try:
+        commit_dt, log_dt = parse_timestamp(fields[0]), parse_timestamp(fields[1])
+    except ValueError:
+        logging.getLogger(wc.DEFAULT_LOGGER_NAME).warning(
+            f"Skip record with invalid timestamp: {line.decode().rstrip()}"
+        )
+        return None
+    return Record(
+        commit_dt=commit_dt,
+        log_dt=log_dt,
+        category=fields[2],
+        type=fields[3],
+        identifier=fields[4],
+        line=line if line.endswith(b"\n") else line + b"\n",
+    )
+
+
+class RecordReader(object):
+    """
+    Streams the records of a logfile starting at byte position `offset`.
+    A last line without line break is only read if it is a complete record,
+    otherwise it is still being written. After iterating, `offset` is the
+    position up to which the file has been consumed.
+    """
+
+    def __init__(self, fp: str, offset: int = 0, separator: str = "|") -> None:
+        self.fp = fp
+        self.offset = offset
+        self.separator = separator
+
+    def __iter__(self) -> Iterator[Record]:
+        with open(self.fp, "rb") as fh:
+            fh.seek(self.offset)
+            for line in fh:
+                if not line.endswith(b"\n") and not is_complete_record(
+                    line, self.separator
+                ):
+                    return
+                self.offset += len(line)
+                record = parse_record(line, self.separator)
+                if record is not None:
+                    yield record
+
+
+def _log_dt(record: Record) -> datetime:
+    return record.log_dt
+
+
+def sorted_records(fp: str, separator: str = "|") -> Iterator[Record]:
+    """
+    Records of a logfile ordered by log time. Logfiles that are already in
+    order, e.g. compacted ones, are streamed. Otherwise the records are
+    sorted in memory, keeping the order of records with the same log time.
+    """
+    last = None
+    for record in RecordReader(fp, separator=separator):
+        if last is not None and record.log_dt < last:
+            return iter(sorted(RecordReader(fp, separator=separator), key=_log_dt))
+        last = record.log_dt
+    return iter(RecordReader(fp, separator=separator))
+
+
+class RecordMerger(object):
+    """
+    K-way merge of record streams that are ordered by log time. Duplicates
+    are dropped, the first occurrence is kept. Session entries that do not
+    fit the session state of the merged stream, e.g. a session start while
+    a session of another stream is running, are collected as conflicts.
+    """
+
+    def __init__(self, session_active: bool = False) -> None:
+        self.records = 0
+        self.duplicates = 0
+        self.conflicts: List[str] = []
+        self._session_active = session_active
+
+    def merge(self, streams: Iterable[Iterable[Record]]) -> Iterator[Record]:
+        # Duplicates have the same log time, only keys of the current log
+        # time have to be remembered.
+        current: Optional[datetime] = None
+        seen = set()
+        for record in heapq.merge(*streams, key=_log_dt):
+            if record.log_dt != current:
+                current = record.log_dt
+                seen = set()
+            if record.key in seen:
+                self.duplicates += 1
+                continue
+            seen.add(record.key)
+            if record.category == wc.TOKEN_SESSION:
+                self._check_session(record)
+            self.records += 1
+            yield record
+
+    def _check_session(self, record: Record) -> None:
+        if record.type == wc.TOKEN_START and self._session_active:
+            self.conflicts.append(
+                f"Session started at {record.log_dt} while a session is running"
+            )
+        elif record.type == wc.TOKEN_STOP and not self._session_active:
+            self.conflicts.append(
+                f"Session stopped at {record.log_dt} while no session is running"
+            )
+        self._session_active = record.type == wc.TOKEN_START
+
+
+def merge_logs(fps: List[str], out_fp: str, separator: str = "|") -> MergeResult:
+    """
+    Merge logfiles into a new logfile that is sorted by log time. The
+    records are streamed, the output file is replaced atomically.
+    """
+    merger = RecordMerger()
+    with file_lock(out_fp):
+        streams = [sorted_records(fp, separator) for fp in fps]
+        lines = (record.line for record in merger.merge(streams))
+        atomic_write_chunks(out_fp, lines)
+    return MergeResult(
+        records=merger.records,
+        duplicates=merger.duplicates,
+        conflicts=merger.conflicts,
+    )
+
+
+def get_sync_fp(log_fp: str) -> str:
+    return str(log_fp) + ".sync"
+
+
+def _read_sync(log_fp: str) -> dict:
+    try:
+        with open(get_sync_fp(log_fp), "r") as fh:
+            return json.load(fh)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def read_sync_offset(log_fp: str, peer_fp: str) -> int:
+    """
+    Position up to which the logfile of a peer has been synced. Returns 0
+    if the peer has not been synced yet or if its logfile has been
+    rewritten since, e.g. by 'wl compact'.
+    """
+    peer = _read_sync(log_fp).get(os.path.abspath(peer_fp))
+    if peer is None:
+        return 0
+    offset, tail = peer["offset"], bytes.fromhex(peer["tail"])
+    if os.path.getsize(peer_fp) < offset:
+        return 0
+    if read_tail(peer_fp, offset, len(tail)) != tail:
+        return 0
+    return offset
+
+
+def write_sync_offset(log_fp: str, peer_fp: str, offset: int) -> None:
+    """Remember the position up to which the logfile of a peer has been synced."""
+    content = _read_sync(log_fp)
+    content[os.path.abspath(peer_fp)] = {
+        "offset": offset,
+        "tail": get_tail(peer_fp, offset).hex() if offset > 0 else "",
+    }
+    atomic_write(get_sync_fp(log_fp), json.dumps(content).encode())
@@ -0,0 +1,199 @@
+from typing import BinaryIO, Iterator, Optional, Tuple
+from contextlib import contextmanager
+import io
+import json
+import os
+
+import worklog.constants as wc
+from worklog.utils.lock import atomic_write
+
+
+def is_complete_record(line: bytes, separator: str = "|") -> bool:
+    """
+    Tests if a line of the logfile contains a complete record. Records are
+    appended field by field, so a record that has been torn within one of
+    the timestamps lacks fields. Timestamps are not parsed, such that all
+    formats the reader accepts are kept, e.g. lines written by hand.
+    """
+    try:
+        fields = line.decode().rstrip("\r\n").split(separator)
+    except ValueError:
+        return False
+    if len(fields) != 5:
+        return False
+    return (
+        fields[2] in (wc.TOKEN_SESSION, wc.TOKEN_TASK)
+        and fields[3] in (wc.TOKEN_START, wc.TOKEN_STOP)
+        and (fields[2] == wc.TOKEN_SESSION or len(fields[4]) > 0)
+    )
+
+
+def find_last_line(fp: str, size: int, chunk_size: int = 4096) -> int:
+    """
+    Returns the position at which the last line of a file starts.
+    Reads the file backwards, such that only the tail of the file is read.
+    """
+    with open(fp, "rb") as fh:
+        end = size
+        # A trailing newline terminates the last line, it does not start one.
+        if end > 0:
+            fh.seek(end - 1)
+            if fh.read(1) == b"\n":
+                end -= 1
+        pos = end
+        while pos > 0:
+            start = max(pos - chunk_size, 0)
+            fh.seek(start)
+            chunk = fh.read(pos - start)
+            idx = chunk.rfind(b"\n")
+            if idx >= 0:
+                return start + idx + 1
+            pos = start
+    return 0
+
+
+def has_torn_tail(fp: str, separator: str = "|") -> bool:
+    """
+    Tests if the logfile ends with a partial record, e.g. because the process
+    has been killed while writing. Only the tail of the file is read.
+    """
+    size = os.path.getsize(fp)
+    if size == 0:
+        return False
+    with open(fp, "rb") as fh:
+        fh.seek(size - 1)
+        if fh.read(1) == b"\n":
+            return False
+        start = find_last_line(fp, size)
+        fh.seek(start)
+        return not is_complete_record(fh.read(), separator)
+
+
+def get_quarantine_fp(log_fp: str) -> str:
+    return str(log_fp) + ".quarantine"
+
+
+def quarantine_tail(log_fp: str) -> bytes:
+    """
+    Move the last line of the logfile into the quarantine file next to the
+    logfile. Returns the quarantined bytes.
+    """
+    size = os.path.getsize(log_fp)
+    return quarantine_from(log_fp, find_last_line(log_fp, size))
+
+
+def quarantine_from(log_fp: str, offset: int) -> bytes:
+    """
+    Move the content of the logfile starting at byte position `offset` into
+    the quarantine file next to the logfile. Returns the quarantined bytes.
+    """
+    with open(log_fp, "rb") as fh:
+        fh.seek(offset)
+        tail = fh.read()
+    if len(tail) > 0:
+        with open(get_quarantine_fp(log_fp), "ab") as fh:
+            fh.write(tail.rstrip(b"\n") + b"\n")
+    os.truncate(log_fp, offset)
+    return tail
+
+
+def get_journal_fp(log_fp: str) -> str:
+    return str(log_fp) + ".journal"
+
+
+def write_journal(log_fp: str, offset: int, data: bytes) -> None:
+    """
+    Record the intent to append `data` at position `offset` of the logfile.
+    """
+    content = {"offset": offset, "data": data.hex()}
+    atomic_write(get_journal_fp(log_fp), json.dumps(content).encode())
+
+
+def read_journal(log_fp: str) -> Optional[Tuple[int, bytes]]:
+    try:
+        with open(get_journal_fp(log_fp), "r") as fh:
+            content = json.load(fh)
+        return content["offset"], bytes.fromhex(content["data"])
+    except FileNotFoundError:
+        return None
+
+
+def remove_journal(log_fp: str) -> None:
+    try:
+        os.unlink(get_journal_fp(log_fp))
+    except FileNotFoundError:
+        pass
+
+
+def read_tail(log_fp: str, size: int, n: int) -> bytes:
+    """Returns the last `n` bytes of the first `size` bytes of a file."""
+    with open(log_fp, "rb") as fh:
+        start = max(size - n, 0)
+        fh.seek(start)
+        return fh.read(size - start)
+
+
+class _PrefixReader(io.RawIOBase):
+    """Raw stream over the first `size` bytes of an open binary file."""
+
+    def __init__(self, fh: BinaryIO, size: int) -> None:
+        self._fh = fh
+        self._remaining = size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self._fh.read(min(len(b), self._remaining))
+        b[: len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+@contextmanager
+def open_prefix(fp: str, size: int) -> Iterator[BinaryIO]:
+    """
+    Open the first `size` bytes of a file for reading, such that records
+    appended while the file is being read are ignored.
+    """
+    with open(fp, "rb") as raw:
+        yield io.BufferedReader(_PrefixReader(raw, size))
+
+
+def get_tail(log_fp: str, size: int, n: int = 256) -> bytes:
+    """Returns the last line of the logfile, limited to `n` bytes."""
+    tail = read_tail(log_fp, size, n)
+    lines = tail.rstrip(b"\n").rsplit(b"\n", 1)
+    return (lines[-1] + b"\n") if tail.endswith(b"\n") else lines[-1]
+
+
+def matches_tail(
+    log_fp: str, size: int, expected_size: Optional[int], expected_tail: str
+) -> bool:
+    """
+    Tests if a sidecar file belongs to the current content of the logfile.
+    Sidecar files record the size and the hex encoded last line of the
+    logfile they have been derived from.
+    """
+    tail = bytes.fromhex(expected_tail)
+    return expected_size == size and read_tail(log_fp, size, len(tail)) == tail
+
+
+def get_file_id(fp: str) -> Tuple[int, int]:
+    """Device and inode of a file, which change if the file is replaced."""
+    stat = os.stat(fp)
+    return stat.st_dev, stat.st_ino
+
+
+def is_rewritten(
+    log_fp: str, offset: int, file_id: Optional[Tuple[int, int]], tail: bytes = b""
+) -> bool:
+    """
+    Tests if the logfile has been replaced or rewritten since its first
+    `offset` bytes have been read, e.g. by 'wl compact' or 'wl archive'.
+    `file_id` is the device and inode of the file that has been read and
+    `tail` the end of the bytes that have been read, see `get_tail`.
+    """
+    if get_file_id(log_fp) != file_id or os.path.getsize(log_fp) < offset:
+        return True
+    return read_tail(log_fp, offset, len(tail)) != tail
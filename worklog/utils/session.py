@@ -1,5 +1,5 @@
 from typing import Optional
-from pandas import DataFrame, Series
+from pandas import DataFrame, Series, Timedelta
 import numpy as np
 from datetime import datetime, date, timezone, tzinfo
 import logging
@@ -84,3 +84,50 @@ def is_active_session(df: DataFrame):
     Note: Make sure to apply this method only on a sorted DataFrame.
     """
     return df.iloc[-1][wc.COL_TYPE] == wc.TOKEN_START if df.shape[0] > 0 else False
+
+
+def extract_session_intervals(
+    df: DataFrame, col: str = wc.COL_LOG_DATETIME
+) -> DataFrame:
+    """
+    Pair the start and stop entries of sessions into intervals at once, like
+    in `Log._aggregate_base`. A stop entry closes the interval opened by the
+    previous entry if that is a start entry, all other entries are skipped.
+    The day of an interval is taken from the 'date' column of its start
+    entry. Returns the columns date, start, stop and interval like
+    `extract_intervals`.
+    """
+    df = df.sort_values([col, wc.COL_TYPE])
+    types = df[wc.COL_TYPE]
+    closing_mask = (types == wc.TOKEN_STOP) & (types.shift(1) == wc.TOKEN_START)
+    starts = df[col].shift(1)[closing_mask]
+    stops = df[col][closing_mask]
+    return DataFrame(
+        {
+            "date": df["date"].shift(1)[closing_mask],
+            "start": starts,
+            "stop": stops,
+            "interval": (stops - starts).astype("m8[ns]"),
+        },
+        columns=["date", "start", "stop", "interval"],
+    ).reset_index(drop=True)
+
+
+def session_gaps(df: DataFrame, col: str = wc.COL_LOG_DATETIME) -> Series:
+    """
+    Breaks that have actually been logged, i.e. the gaps between consecutive
+    sessions of the same day, summed up per day. Sessions are paired by
+    `extract_session_intervals` and all gaps are computed at once. Sessions
+    on different days and overlapping sessions have no gap in between. The
+    days are taken from the 'date' column, which is also the index of the
+    returned Series.
+    """
+    intervals = extract_session_intervals(df, col)
+    days = intervals["date"]
+
+    # Gap between the end of each session and the start of the next one
+    next_starts = intervals["start"].shift(-1)
+    same_day = days.eq(days.shift(-1))
+    gaps = (next_starts[same_day] - intervals["stop"][same_day]).astype("m8[ns]")
+    gaps = gaps.clip(lower=Timedelta(0))
+    return gaps.groupby(days[same_day]).sum().astype("m8[ns]")
@@ -0,0 +1,135 @@
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+from datetime import datetime
+import json
+import os
+
+from pandas import DataFrame, Timestamp  # type: ignore
+
+import worklog.constants as wc
+from worklog.utils.lock import atomic_write
+from worklog.utils.recovery import matches_tail
+
+
+class ActiveState(NamedTuple):
+    """
+    What is running right now: the start of the open session (if any), the
+    open tasks with their start times and the latest log time seen.
+    """
+
+    session: Optional[datetime]
+    tasks: Dict[str, datetime]
+    last_log_dt: Optional[datetime]
+
+
+def get_state_fp(log_fp: str) -> str:
+    return str(log_fp) + ".state"
+
+
+def state_from_df(df: DataFrame) -> ActiveState:
+    """
+    Derive the active state from a log DataFrame.
+    Note: Make sure to apply this method only on a sorted DataFrame.
+    """
+    if df.shape[0] == 0:
+        return ActiveState(None, {}, None)
+
+    session_df = df[df[wc.COL_CATEGORY] == wc.TOKEN_SESSION]
+    session = None
+    if session_df.shape[0] > 0:
+        last = session_df.iloc[-1]
+        if last[wc.COL_TYPE] == wc.TOKEN_START:
+            session = Timestamp(last[wc.COL_LOG_DATETIME]).to_pydatetime()
+
+    task_df = df[df[wc.COL_CATEGORY] == wc.TOKEN_TASK]
+    task_df = task_df.groupby(wc.COL_TASK_IDENTIFIER).tail(1)
+    task_df = task_df[task_df[wc.COL_TYPE] == wc.TOKEN_START]
+    tasks = {
+        identifier: Timestamp(log_dt).to_pydatetime()
+        for identifier, log_dt in zip(
+            task_df[wc.COL_TASK_IDENTIFIER], task_df[wc.COL_LOG_DATETIME]
+        )
+    }
+
+    last_log_dt = Timestamp(df[wc.COL_LOG_DATETIME].max()).to_pydatetime()
+    return ActiveState(session, tasks, last_log_dt)
+
+
+def update_state(
+    state: ActiveState, records: Iterable[Tuple[datetime, str, str, Optional[str]]]
+) -> Optional[ActiveState]:
+    """
+    Apply new records (log_dt, category, type, identifier) to a state.
+    Returns None if a record is older than the latest known record, because
+    then the state can only be derived from the full log.
+    """
+    session = state.session
+    tasks = dict(state.tasks)
+    last_log_dt = state.last_log_dt
+
+    for log_dt, category, type_, identifier in records:
+        if last_log_dt is not None and log_dt < last_log_dt:
+            return None
+        last_log_dt = log_dt
+        if category == wc.TOKEN_SESSION:
+            session = log_dt if type_ == wc.TOKEN_START else None
+        elif type_ == wc.TOKEN_START:
+            tasks[identifier] = log_dt
+        else:
+            tasks.pop(identifier, None)
+
+    return ActiveState(session, tasks, last_log_dt)
+
+
+def read_state(log_fp: str, size: Optional[int] = None) -> Optional[ActiveState]:
+    """
+    Read the state file of a logfile.
+    Returns None if the state file does not exist or if it does not match
+    the size and the last bytes of the logfile, e.g. because the logfile
+    has been modified by another program. By default the current size of
+    the logfile is used.
+    """
+    try:
+        with open(get_state_fp(log_fp), "r") as fh:
+            content = json.load(fh)
+        if size is None:
+            size = os.path.getsize(log_fp)
+    except (OSError, ValueError):
+        return None
+
+    if not matches_tail(log_fp, size, content.get("size"), content.get("tail", "")):
+        return None
+
+    def _parse(value: Optional[str]) -> Optional[datetime]:
+        return datetime.fromisoformat(value) if value is not None else None
+
+    return ActiveState(
+        session=_parse(content["session"]),
+        tasks={k: _parse(v) for k, v in content["tasks"].items()},
+        last_log_dt=_parse(content["last_log_dt"]),
+    )
+
+
+def write_state(log_fp: str, state: ActiveState, size: int, tail: bytes) -> None:
+    """
+    Atomically write the state file of a logfile.
+    `size` and `tail` must describe the logfile the state belongs to.
+    """
+
+    def _format(value: Optional[datetime]) -> Optional[str]:
+        return value.isoformat() if value is not None else None
+
+    content = {
+        "size": size,
+        "tail": tail.hex(),
+        "session": _format(state.session),
+        "tasks": {k: _format(v) for k, v in state.tasks.items()},
+        "last_log_dt": _format(state.last_log_dt),
+    }
+    atomic_write(get_state_fp(log_fp), json.dumps(content).encode())
+
+
+def remove_state(log_fp: str) -> None:
+    try:
+        os.unlink(get_state_fp(log_fp))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,204 @@
+from typing import List, Optional, Tuple
+from datetime import tzinfo
+
+import numpy as np
+import pandas as pd  # type: ignore
+
+import worklog.constants as wc
+
+COVERAGE_COLS = ["session_time", "task_time", "untracked", "outside"]
+
+
+def _to_ns(s: pd.Series) -> np.ndarray:
+    # Logfiles may mix UTC offsets, convert them to a single type first
+    return pd.to_datetime(s, utc=True).to_numpy(dtype="datetime64[ns]").view("i8")
+
+
+def _midnights(first: int, last: int, tz: tzinfo) -> np.ndarray:
+    """Midnights in timezone `tz` between two points in time, in ns."""
+    first_day = pd.Timestamp(first, tz="UTC").tz_convert(tz).normalize()
+    last_dt = pd.Timestamp(last, tz="UTC").tz_convert(tz)
+    days = pd.date_range(first_day, last_dt, freq="D")
+    return days.tz_convert(None).to_numpy(dtype="datetime64[ns]").view("i8")
+
+
+def _sweep_endpoints(
+    interval_sets: List[pd.DataFrame], extra: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sorted endpoints of several sets of intervals in ns and the number of
+    open intervals of each set after each endpoint, one column per set.
+    `extra` are additional endpoints that neither open nor close intervals.
+    Intervals that stop before they start are skipped.
+    """
+    times, deltas = [], []
+    for i, df in enumerate(interval_sets):
+        starts, stops = _to_ns(df["start"]), _to_ns(df["stop"])
+        valid = stops >= starts
+        starts, stops = starts[valid], stops[valid]
+        delta = np.zeros((2 * len(starts), len(interval_sets)), dtype=np.int64)
+        delta[: len(starts), i] = 1
+        delta[len(starts) :, i] = -1
+        times.append(np.concatenate([starts, stops]))
+        deltas.append(delta)
+    if extra is not None:
+        times.append(extra)
+        deltas.append(np.zeros((len(extra), len(interval_sets)), dtype=np.int64))
+
+    all_times = np.concatenate(times) if len(times) > 0 else np.array([], "i8")
+    if len(all_times) == 0:
+        return all_times, np.zeros((0, len(interval_sets)), dtype=np.int64)
+    order = np.argsort(all_times, kind="mergesort")
+    return all_times[order], np.cumsum(np.concatenate(deltas)[order], axis=0)
+
+
+def sweep(interval_sets: List[pd.DataFrame], tz: tzinfo) -> pd.DataFrame:
+    """
+    Sweep-line over several sets of intervals, each a DataFrame with the
+    columns start and stop. The endpoints of all intervals are sorted once,
+    afterwards the number of open intervals of each set is known between any
+    two consecutive endpoints. Returns these segments with their start,
+    duration and the number of open intervals per set ('count_0',
+    'count_1', ...). Segments are also split at midnight in timezone `tz`,
+    the day of each segment is in the log time column. Takes O(n log n) for
+    n intervals.
+    """
+    count_cols = [f"count_{i}" for i in range(len(interval_sets))]
+    times, _ = _sweep_endpoints(interval_sets)
+    if len(times) == 0:
+        return pd.DataFrame(
+            columns=[wc.COL_LOG_DATETIME, "start", "duration"] + count_cols
+        )
+
+    midnights = _midnights(times[0], times[-1], tz)
+    times, counts = _sweep_endpoints(interval_sets, extra=midnights)
+    counts = counts[:-1]
+    durations = np.diff(times)
+    # Endpoints at the same time enclose empty segments
+    keep = durations > 0
+
+    starts = pd.Series(pd.to_datetime(times[:-1][keep], utc=True))
+    starts = starts.dt.tz_convert(tz)
+    df = pd.DataFrame(
+        {
+            wc.COL_LOG_DATETIME: starts.dt.normalize(),
+            "start": starts,
+            "duration": pd.to_timedelta(durations[keep]),
+        }
+    )
+    for i, col in enumerate(count_cols):
+        df[col] = counts[keep, i]
+    return df
+
+
+def split_overlaps(intervals: pd.DataFrame) -> pd.Series:
+    """
+    Durations of intervals whose overlapping time is divided equally between
+    all intervals that are open at the same time, e.g. an hour of two tasks
+    in parallel counts half an hour for each of them. The durations add up
+    to the time in which any interval is open. Returns a Series of timedelta64
+    values with the index of `intervals`. Takes O(n log n) for n intervals.
+    """
+    times, counts = _sweep_endpoints([intervals])
+    if len(times) == 0:
+        return pd.Series([], index=intervals.index, dtype="m8[ns]")
+
+    # Share of each interval that is open between two consecutive endpoints
+    open_intervals = counts[:-1, 0]
+    shares = np.diff(times) // np.maximum(open_intervals, 1)
+    shares[open_intervals == 0] = 0
+    cumulative = np.concatenate([[0], np.cumsum(shares)])
+
+    starts = np.searchsorted(times, _to_ns(intervals["start"]))
+    stops = np.searchsorted(times, _to_ns(intervals["stop"]))
+    split = np.maximum(cumulative[stops] - cumulative[starts], 0)
+    return pd.Series(pd.to_timedelta(split), index=intervals.index)
+
+
+def find_overlaps(intervals: pd.DataFrame, tz: tzinfo) -> pd.DataFrame:
+    """
+    Periods in which several intervals are open at the same time, e.g. tasks
+    that are running in parallel. Returns the start and stop of each period
+    in timezone `tz`, its duration, the maximum number of open intervals
+    ('concurrency') and the identifiers of the involved tasks ('tasks').
+    Takes O(n log n) for n intervals.
+    """
+    cols = ["start", "stop", "duration", "concurrency", "tasks"]
+    times, counts = _sweep_endpoints([intervals])
+    durations = np.diff(times)
+    keep = durations > 0
+    seg_starts, seg_stops = times[:-1][keep], times[1:][keep]
+    open_intervals = counts[:-1, 0][keep]
+
+    # Consecutive segments with several open intervals form a period
+    overlapping = (open_intervals >= 2).astype(np.int64)
+    edges = np.diff(np.concatenate([[0], overlapping, [0]]))
+    first_segs = np.flatnonzero(edges == 1)
+    last_segs = np.flatnonzero(edges == -1) - 1
+    if len(first_segs) == 0:
+        return pd.DataFrame(columns=cols)
+    starts, stops = seg_starts[first_segs], seg_stops[last_segs]
+    concurrency = np.maximum.reduceat(open_intervals * overlapping, first_segs)
+
+    # Intervals that intersect each period, periods are sorted and disjoint
+    interval_starts = _to_ns(intervals["start"])
+    interval_stops = _to_ns(intervals["stop"])
+    first = np.searchsorted(stops, interval_starts, side="right")
+    n = np.maximum(np.searchsorted(starts, interval_stops, side="left") - first, 0)
+    offsets = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    involved = pd.DataFrame(
+        {
+            "period": np.repeat(first, n) + offsets,
+            "task": np.repeat(intervals[wc.COL_TASK_IDENTIFIER].to_numpy(), n),
+        }
+    ).drop_duplicates()
+    involved = involved.sort_values(["period", "task"])
+    # Joined by one concatenation per period, grouping strings is slow
+    periods = involved["period"].to_numpy()
+    first_rows = np.flatnonzero(np.diff(np.concatenate([[-1], periods])))
+    names = (involved["task"] + ", ").to_numpy(dtype=object)
+    tasks = np.full(len(starts), "", dtype=object)
+    tasks[periods[first_rows]] = [
+        joined[: -len(", ")] for joined in np.add.reduceat(names, first_rows)
+    ]
+
+    return pd.DataFrame(
+        {
+            "start": pd.to_datetime(starts, utc=True).tz_convert(tz),
+            "stop": pd.to_datetime(stops, utc=True).tz_convert(tz),
+            "duration": pd.to_timedelta(stops - starts),
+            "concurrency": concurrency,
+            "tasks": tasks,
+        }
+    )
+
+
+def calc_coverage(
+    sessions: pd.DataFrame, tasks: pd.DataFrame, tz: tzinfo
+) -> pd.DataFrame:
+    """
+    Coverage of sessions by tasks per day in timezone `tz`. 'session_time'
+    is the time in any session, 'task_time' the time with any task running,
+    'untracked' the session time without a running task and 'outside' the
+    task time outside of all sessions. Overlapping intervals are counted
+    once. Only days with session or task time are returned.
+    """
+    segments = sweep([sessions, tasks], tz)
+    if segments.shape[0] == 0:
+        return pd.DataFrame(columns=[wc.COL_LOG_DATETIME] + COVERAGE_COLS)
+    in_session = segments["count_0"] > 0
+    in_task = segments["count_1"] > 0
+    durations = segments["duration"].astype("m8[ns]")
+    zero = pd.Timedelta(0)
+
+    df = pd.DataFrame(
+        {
+            wc.COL_LOG_DATETIME: segments[wc.COL_LOG_DATETIME],
+            "session_time": durations.where(in_session, zero),
+            "task_time": durations.where(in_task, zero),
+            "untracked": durations.where(in_session & ~in_task, zero),
+            "outside": durations.where(in_task & ~in_session, zero),
+        }
+    )
+    df = df[in_session | in_task]
+    return df.groupby(wc.COL_LOG_DATETIME)[COVERAGE_COLS].sum().reset_index()
@@ -1,7 +1,9 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from pandas import DataFrame
 from datetime import datetime
+import fnmatch
 import logging
+import re
 
 import worklog.constants as wc
 
@@ -100,3 +102,78 @@ def extract_intervals(
         log_error(f"Start entry at {last_start} has no stop entry. Skip entry.")
 
     return DataFrame(intervals, columns=["date", "start", "stop", "interval"])
+
+
+def extract_intervals_by_task(
+    df: DataFrame, logger: Optional[logging.Logger] = None,
+) -> DataFrame:
+    """
+    Extract the intervals of all tasks in a DataFrame at once. Start and
+    stop entries are paired like in `extract_intervals`, but without
+    iterating over the entries of each task.
+    Returns the columns identifier, date, start, stop and interval.
+    """
+    cols = [wc.COL_TASK_IDENTIFIER, "date", "start", "stop", "interval"]
+
+    def log_error(msg):
+        if logger:
+            logger.error(msg)
+
+    if df.shape[0] == 0:
+        return DataFrame(columns=cols)
+
+    known_mask = df[wc.COL_TYPE].isin([wc.TOKEN_START, wc.TOKEN_STOP])
+    for type_ in df[~known_mask][wc.COL_TYPE]:
+        log_error(f"Found unknown type '{type_}'. Skip entry.")
+    df = df[known_mask].sort_values(
+        by=[wc.COL_TASK_IDENTIFIER, wc.COL_LOG_DATETIME], kind="mergesort"
+    )
+
+    task_ids = df[wc.COL_TASK_IDENTIFIER]
+    types = df[wc.COL_TYPE]
+    log_dts = df[wc.COL_LOG_DATETIME]
+    # A stop entry closes the interval opened by the previous entry of the
+    # same task, if that is a start entry.
+    start_mask = types == wc.TOKEN_START
+    stop_mask = types == wc.TOKEN_STOP
+    after_start = start_mask.shift(1, fill_value=False) & task_ids.eq(
+        task_ids.shift(1)
+    )
+    before_stop = stop_mask.shift(-1, fill_value=False) & task_ids.eq(
+        task_ids.shift(-1)
+    )
+    closing_mask = stop_mask & after_start
+
+    for log_dt in log_dts[start_mask & ~before_stop]:
+        log_error(f"Start entry at {log_dt} has no stop entry. Skip entry.")
+    for _ in range((stop_mask & ~after_start).sum()):
+        log_error("No start entry found. Skip entry.")
+
+    starts = log_dts.shift(1)[closing_mask]
+    stops = log_dts[closing_mask]
+    return DataFrame(
+        {
+            wc.COL_TASK_IDENTIFIER: task_ids[closing_mask],
+            "date": starts.dt.date,
+            "start": starts,
+            "stop": stops,
+            "interval": stops - starts,
+        },
+        columns=cols,
+    ).reset_index(drop=True)
+
+
+def match_task_ids(
+    task_ids: Iterable[str], patterns: Iterable[str], regex: bool = False
+) -> List[str]:
+    """
+    Returns the task identifiers that match any of the patterns, sorted.
+    Patterns are glob patterns, e.g. 'PROJ-12*', or regular expressions that
+    are searched within the identifiers if `regex` is set. Patterns without
+    wildcards only match themselves.
+    """
+    if regex:
+        matchers = [re.compile(pattern).search for pattern in patterns]
+    else:
+        matchers = [re.compile(fnmatch.translate(p)).match for p in patterns]
+    return sorted(t for t in task_ids if any(match(t) for match in matchers))
@@ -0,0 +1,114 @@
+from typing import Dict, List
+import glob
+import os
+from pathlib import Path
+
+import pandas as pd  # type: ignore
+
+import worklog.constants as wc
+from worklog.results import ReportResult, TeamReportResult
+from worklog.utils.archive import get_archive_dir
+from worklog.utils.fuzzy import get_trigrams_fp
+from worklog.utils.ids import get_ids_fp
+from worklog.utils.lock import get_lock_fp
+from worklog.utils.merge import get_sync_fp
+from worklog.utils.recovery import get_journal_fp, get_quarantine_fp
+from worklog.utils.state import get_state_fp
+
+COL_PERSON = "person"
+
+# Logged breaks are only part of the reports in some break modes
+_TIME_COLS = ["agg_time", "break_taken", "break", "agg_time_bookable"]
+
+
+def _sidecar_fps(log_fp: str) -> List[str]:
+    return [
+        get_archive_dir(log_fp),
+        get_ids_fp(log_fp),
+        get_journal_fp(log_fp),
+        get_lock_fp(log_fp),
+        get_quarantine_fp(log_fp),
+        get_state_fp(log_fp),
+        get_sync_fp(log_fp),
+        get_trigrams_fp(log_fp),
+    ]
+
+
+def find_logs(pattern: str) -> List[str]:
+    """
+    Returns the logfiles in a directory or matching a glob pattern, sorted.
+    Directories and the sidecar files of the logfiles, such as the lock and
+    state files, are skipped.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*")
+    fps = [fp for fp in glob.glob(pattern) if os.path.isfile(fp)]
+    sidecars = set(sidecar for fp in fps for sidecar in _sidecar_fps(fp))
+    return sorted(fp for fp in fps if fp not in sidecars)
+
+
+def get_person_names(fps: List[str]) -> List[str]:
+    """
+    Names of the persons of the logfiles, i.e. the file names without
+    extension. The paths are used if the names are not unique.
+    """
+    names = [Path(fp).stem.lstrip(".") or Path(fp).name for fp in fps]
+    if len(set(names)) < len(names):
+        return list(fps)
+    return names
+
+
+def merge_reports(reports: Dict[str, ReportResult]) -> TeamReportResult:
+    """
+    Merge the reports of several persons into one team view. Working times
+    are summed up per day of the local time of each logfile, so that logs
+    in different timezones share the same days.
+    """
+    time_cols = [
+        col
+        for col in _TIME_COLS
+        if all(col in report.day.columns for report in reports.values())
+    ]
+    days, tasks = [], []
+    for person, report in reports.items():
+        day = report.day[[wc.COL_LOG_DATETIME] + time_cols].copy()
+        log_dts = day[wc.COL_LOG_DATETIME]
+        if getattr(log_dts.dtype, "tz", None) is not None:
+            day[wc.COL_LOG_DATETIME] = log_dts.dt.tz_localize(None)
+        days.append(day.assign(**{COL_PERSON: person}))
+        if report.tasks is not None:
+            tasks.append(report.tasks.assign(**{COL_PERSON: person}))
+
+    df_days = pd.concat(days, ignore_index=True)
+    df_day = df_days.groupby(wc.COL_LOG_DATETIME)[time_cols].sum().reset_index()
+    df_week = df_day.set_index(wc.COL_LOG_DATETIME).resample("W").sum().reset_index()
+    df_month = df_day.set_index(wc.COL_LOG_DATETIME).resample("M").sum().reset_index()
+    df_people = (
+        df_days.groupby(COL_PERSON, sort=False)[time_cols]
+        .sum()
+        .reindex(list(reports))
+        .reset_index()
+    )
+
+    df_tasks, df_person_tasks = None, None
+    if len(tasks) > 0:
+        df_person_tasks = pd.concat(tasks, ignore_index=True)[
+            [COL_PERSON, wc.COL_TASK_IDENTIFIER, "agg_time"]
+        ]
+        df_tasks = (
+            df_person_tasks.groupby(wc.COL_TASK_IDENTIFIER)[["agg_time"]]
+            .sum()
+            .reset_index()
+        )
+
+    return TeamReportResult(
+        team=ReportResult(
+            day=df_day,
+            week=df_week,
+            month=df_month,
+            tasks=df_tasks,
+            auto_break=any(report.auto_break for report in reports.values()),
+        ),
+        people=df_people,
+        person_tasks=df_person_tasks,
+    )
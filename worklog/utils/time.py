@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Iterable, Optional
 from datetime import datetime, timedelta, timezone
 import pandas as pd
 
@@ -36,28 +36,41 @@ def calc_log_time(offset_min: int = 0, time: Optional[str] = None) -> datetime:
     return my_date
 
 
-def extract_date_and_time(df: pd.DataFrame) -> pd.DataFrame:
+# Columns that are derived from the schema columns, mapped to their source
+DERIVED_COLS: Dict[str, str] = {
+    "date": wc.COL_LOG_DATETIME,
+    "time": wc.COL_LOG_DATETIME,
+    wc.COL_LOG_DATETIME_UTC: wc.COL_LOG_DATETIME,
+    wc.COL_COMMIT_DATETIME_UTC: wc.COL_COMMIT_DATETIME,
+}
+
+
+def extract_date_and_time(
+    df: pd.DataFrame, columns: Optional[Iterable[str]] = None
+) -> pd.DataFrame:
     """
     Extracts date and time information from a given pandas DataFrame.
     By default the source column is `log_dt`.
+    Only the derived columns listed in `columns` are extracted, all of them
+    if `columns` is not set.
     """
-    log_dt: pd.Series = df[wc.COL_LOG_DATETIME].apply(
-        lambda x: x.astimezone(timezone.utc)
-    )
-    commit_dt: pd.Series = df[wc.COL_COMMIT_DATETIME].apply(
-        lambda x: x.astimezone(timezone.utc)
-    )
-    date: pd.Series = df[wc.COL_LOG_DATETIME].apply(lambda x: x.date())
-    time: pd.Series = df[wc.COL_LOG_DATETIME].apply(lambda x: x.timetz())
-
-    return pd.DataFrame(
-        {
-            "date": date,
-            "time": time,
-            wc.COL_LOG_DATETIME_UTC: log_dt,
-            wc.COL_COMMIT_DATETIME_UTC: commit_dt,
-        }
-    )
+    columns = list(DERIVED_COLS) if columns is None else list(columns)
+    result: Dict[str, pd.Series] = {}
+
+    if "date" in columns:
+        result["date"] = df[wc.COL_LOG_DATETIME].apply(lambda x: x.date())
+    if "time" in columns:
+        result["time"] = df[wc.COL_LOG_DATETIME].apply(lambda x: x.timetz())
+    if wc.COL_LOG_DATETIME_UTC in columns:
+        result[wc.COL_LOG_DATETIME_UTC] = df[wc.COL_LOG_DATETIME].apply(
+            lambda x: x.astimezone(timezone.utc)
+        )
+    if wc.COL_COMMIT_DATETIME_UTC in columns:
+        result[wc.COL_COMMIT_DATETIME_UTC] = df[wc.COL_COMMIT_DATETIME].apply(
+            lambda x: x.astimezone(timezone.utc)
+        )
+
+    return pd.DataFrame(result, index=df.index)
 
 
 def now_localtz() -> datetime:
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import re
+
+import worklog.constants as wc
+
+# ISO 8601 timestamps in the variants the pandas reader of the logfile
+# accepts, in extended and basic format. The offset may be given as `Z`, with
+# or without colon or in hours only.
+_TIMESTAMP = re.compile(
+    r"^(\d{4})-?(\d{2})-?(\d{2})"
+    r"(?:[T ](\d{2}):?(\d{2})(?::?(\d{2})(?:[.,](\d+))?)?)?"
+    r"\s*(Z|[+-]\d{2}(?::?\d{2})?)?$"
+)
+
+
+@lru_cache(maxsize=None)
+def _parse_offset(value: str) -> timezone:
+    if value == "Z":
+        return timezone.utc
+    digits = value[1:].replace(":", "")
+    offset = timedelta(hours=int(digits[:2]), minutes=int(digits[2:] or 0))
+    return timezone(-offset if value[0] == "-" else offset)
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse a timestamp of the logfile without pandas and return it as aware
+    datetime in UTC. Timestamps without UTC offset are taken as local time.
+    Fractions below a microsecond are dropped.
+    Raises `ValueError` if the value is not a timestamp the reader accepts.
+    """
+    try:
+        # Fast path for the format written by worklog
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return _parse_timestamp(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=wc.LOCAL_TIMEZONE)
+    return dt.astimezone(timezone.utc)
+
+
+def _parse_timestamp(value: str) -> datetime:
+    match = _TIMESTAMP.match(value.strip())
+    if match is None:
+        raise ValueError(f"Invalid timestamp: '{value}'")
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+    dt = datetime(
+        int(year),
+        int(month),
+        int(day),
+        int(hour or 0),
+        int(minute or 0),
+        int(second or 0),
+        int((fraction or "0")[:6].ljust(6, "0")),
+    )
+    tz = _parse_offset(offset) if offset is not None else wc.LOCAL_TIMEZONE
+    return dt.replace(tzinfo=tz).astimezone(timezone.utc)
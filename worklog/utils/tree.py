@@ -0,0 +1,81 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import timedelta
+
+
+class TaskNode(object):
+    """
+    Node of a task hierarchy. Task identifiers are split into their path
+    components, e.g. 'client/project/ticket'. `total` is the time of the node
+    and all its descendants, `own` the time booked on the node itself.
+    """
+
+    def __init__(self, name: str = "", path: str = "") -> None:
+        self.name = name
+        self.path = path
+        self.total = timedelta(0)
+        self.own = timedelta(0)
+        self.children: Dict[str, "TaskNode"] = {}
+
+    def __repr__(self) -> str:
+        return f"TaskNode({self.path!r}, total={self.total})"
+
+
+def build_tree(
+    durations: Iterable[Tuple[str, timedelta]], separator: str = "/"
+) -> TaskNode:
+    """
+    Build the task hierarchy from (identifier, duration) pairs in a single
+    pass. Each duration is added to all nodes on the path of its identifier,
+    so that the totals of all levels are known afterwards.
+    Identifiers may occur more than once.
+    """
+    root = TaskNode()
+    for task_id, duration in durations:
+        node = root
+        node.total += duration
+        for part in task_id.split(separator):
+            child = node.children.get(part)
+            if child is None:
+                path = f"{node.path}{separator}{part}" if node.path else part
+                child = node.children[part] = TaskNode(part, path)
+            node = child
+            node.total += duration
+        node.own += duration
+    return root
+
+
+def iter_tree(
+    root: TaskNode, max_depth: Optional[int] = None
+) -> Iterator[Tuple[int, TaskNode]]:
+    """
+    Depth-first iteration with the depth of each node, sorted by name.
+    Nodes below `max_depth` are skipped.
+    """
+    stack = [(1, child) for child in sorted(root.children.values(), key=_name)]
+    stack.reverse()
+    while len(stack) > 0:
+        depth, node = stack.pop()
+        yield depth, node
+        if max_depth is not None and depth >= max_depth:
+            continue
+        children = sorted(node.children.values(), key=_name, reverse=True)
+        stack.extend((depth + 1, child) for child in children)
+
+
+def rollup_tree(root: TaskNode, depth: int) -> List[Tuple[str, timedelta]]:
+    """
+    Totals of the nodes at the given depth. Tasks with fewer levels keep
+    their own path, e.g. 'client/project' for depth 3.
+    """
+    rollups = []
+    for node_depth, node in iter_tree(root, max_depth=depth):
+        if node_depth == depth or len(node.children) == 0:
+            rollups.append((node.path, node.total))
+        elif node.own > timedelta(0):
+            # Time booked on an inner node is not part of any node below
+            rollups.append((node.path, node.own))
+    return rollups
+
+
+def _name(node: TaskNode) -> str:
+    return node.name